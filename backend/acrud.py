@@ -0,0 +1,137 @@
+import functools
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, raiseload, selectinload
+from starlette.concurrency import run_in_threadpool
+
+from . import crud, models
+
+# The crud functions as the API routes call them: coroutines taking the session from
+# database.get_read_session.
+#
+# With an AsyncSession (DB_ASYNC=1) reads run on the async driver and use the statements crud
+# builds, so both paths share one query definition; the reads with control flow of their own are
+# crud's read plans, which run() carries out here, so both paths share that too. Relationships the routes read are loaded
+# explicitly (selectinload) and every other one raises (raiseload), so a missed eager load fails
+# loudly instead of doing IO behind the event loop's back. Scoring and catalog lookups are CPU work
+# and still go to the threadpool.
+#
+# With a sync Session (DB_ASYNC=0, the default) each call runs the crud function in the threadpool.
+# There are no async writes: the write routes stay sync on the single-writer session (FastAPI runs
+# them in the threadpool), since most of a write's cost is the neighbour refresh and index upkeep,
+# CPU that would stall the event loop.
+
+_NO_LAZY = raiseload("*")
+
+
+def _loading(fn, *paths):
+    """fn, also loading the dotted attribute paths of its result before returning (in the worker thread)."""
+    if not paths:
+        return fn
+
+    @functools.wraps(fn)
+    def run(db: Session, *args, **kwargs):
+        obj = fn(db, *args, **kwargs)
+        if obj:
+            for path in paths:
+                target = obj
+                for name in path.split("."):
+                    target = getattr(target, name)
+        return obj
+    return run
+
+
+def _sync_fallback(sync_fn, *paths):
+    """Run sync_fn in the threadpool instead of the decorated coroutine when given a sync Session."""
+    threaded = _loading(sync_fn, *paths)
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def run(db, *args, **kwargs):
+            if isinstance(db, AsyncSession):
+                return await fn(db, *args, **kwargs)
+            return await run_in_threadpool(threaded, db, *args, **kwargs)
+        return run
+    return decorate
+
+
+async def _step(db: AsyncSession, step):
+    if isinstance(step, crud.Compute):
+        return await run_in_threadpool(step.fn, *step.args, **step.kwargs)
+    if isinstance(step, crud.Get):
+        options = [selectinload(getattr(step.model, name)) for name in step.load]
+        return await db.get(step.model, step.ident, options=options + [_NO_LAZY])
+    if isinstance(step, crud.Scalars):
+        return (await db.scalars(step.stmt.options(_NO_LAZY))).all()
+    return (await db.execute(step.stmt.options(_NO_LAZY))).all()
+
+
+async def run(db: AsyncSession, plan):
+    """Carry out one of crud's read plans on an AsyncSession (crud.run is the sync counterpart)."""
+    result = None
+    try:
+        while True:
+            result = await _step(db, plan.send(result))
+    except StopIteration as done:
+        return done.value
+
+
+async def close(db):
+    # hand the pooled connection back early, e.g. before awaiting a model; loaded attributes stay readable
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        db.close()
+
+
+# ----- reads -----
+
+
+@_sync_fallback(crud.list_subjects)
+async def list_subjects(db: AsyncSession, limit: Optional[int] = None, after_id: Optional[int] = None):
+    return (await db.scalars(crud.page_statement(models.Subject, limit, after_id))).all()
+
+
+@_sync_fallback(crud.list_students)
+async def list_students(db: AsyncSession, limit: Optional[int] = None, after_id: Optional[int] = None):
+    return (await db.scalars(crud.page_statement(models.Student, limit, after_id))).all()
+
+
+@_sync_fallback(crud.get_student, "subjects")
+async def get_student(db: AsyncSession, student_id: int):
+    return await db.get(models.Student, student_id, options=[selectinload(models.Student.subjects), _NO_LAZY])
+
+
+@_sync_fallback(crud.get_tutor)
+async def get_tutor(db: AsyncSession, tutor_id: int, with_relations: bool = False):
+    options = [selectinload(models.Tutor.subjects), _NO_LAZY] if with_relations else [_NO_LAZY]
+    return await db.get(models.Tutor, tutor_id, options=options)
+
+
+@_sync_fallback(crud.latest_reviews)
+async def latest_reviews(db: AsyncSession, tutor_id: int, limit: int, before: Optional[tuple] = None):
+    return (await db.scalars(crud.latest_reviews_statement(tutor_id, limit, before).options(_NO_LAZY))).all()
+
+
+@_sync_fallback(crud.search_tutors)
+async def search_tutors(db: AsyncSession, *, lat: Optional[float] = None, lon: Optional[float] = None, **filters):
+    """crud.search_tutors; filters are its other keyword arguments."""
+    return await run(db, crud.search_plan(origin=crud.resolve_origin(lat, lon), **filters))
+
+
+@_sync_fallback(crud.text_search_tutors)
+async def text_search_tutors(db: AsyncSession, q: str, subject_name: Optional[str] = None, city: Optional[str] = None,
+                             max_hourly_rate: Optional[float] = None, min_rating: Optional[float] = None,
+                             teaching_mode: Optional[str] = None, limit: int = 20):
+    return await run(db, crud.text_search_plan(q, subject_name, city, max_hourly_rate, min_rating, teaching_mode, limit))
+
+
+@_sync_fallback(crud.get_similar_tutors)
+async def get_similar_tutors(db: AsyncSession, tutor_id: int, limit: int = 6):
+    return await run(db, crud.similar_plan(tutor_id, limit))
+
+
+@_sync_fallback(crud.recommend_for_student)
+async def recommend_for_student(db: AsyncSession, student_id: int, limit: int = 8):
+    return await run(db, crud.recommend_plan(student_id, limit))
@@ -1,23 +1,139 @@
 import os
 import json
+import asyncio
+import logging
+import time
+from collections import deque
 from typing import List
-from urllib import request, error
 
-def _call_hf_chat(prompt: str) -> str:
+from . import explaincache, metrics
+
+# httpx provides the pooled async client; without it provider calls fail and every
+# explanation falls back to the deterministic template.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderHTTPError(RuntimeError):
+    def __init__(self, status: int, reason: str, body: str):
+        super().__init__(f"{status} {reason}")
+        self.status = status
+        self.reason = reason
+        self.body = body
+
+
+class ProviderClient:
+    """
+    Shared asyncio HTTP client for the model providers: one keep-alive connection pool, at most
+    AI_MAX_CONCURRENCY calls in flight, and a deadline per call that includes waiting for a slot.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._slots = None
+        self._loop = None
+        self.limit = 0
+        self.in_flight = 0  # calls holding a slot
+        self.waiting = 0  # calls queued for a slot
+        self.peak_in_flight = 0
+        self.peak_waiting = 0
+
+    def _ensure(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # the pool and the semaphore belong to the event loop that created them
+            if httpx is None:
+                raise RuntimeError("httpx is not installed")
+            if self._client is not None:
+                self._retire(self._client, self._loop)
+            limit = int(os.environ.get("AI_MAX_CONCURRENCY", "8"))
+            self._client = httpx.AsyncClient(limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit))
+            self._slots = asyncio.Semaphore(limit)
+            self._loop = loop
+            self.limit = limit
+        return self._client, self._slots
+
+    @staticmethod
+    def _retire(client, loop):
+        """Close the pool of a client whose event loop is no longer the running one."""
+        logger.info("event loop changed; closing the previous provider HTTP client")
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        # aclose() would need the old loop: close the pooled sockets directly instead
+        pool = getattr(client._transport, "_pool", None)
+        for conn in list(getattr(pool, "connections", ())):
+            stream = getattr(getattr(conn, "_connection", None), "_network_stream", None)
+            sock = stream.get_extra_info("socket") if stream is not None else None
+            if sock is not None:
+                getattr(sock, "_sock", sock).close()  # asyncio hands out a TransportSocket wrapper
+
+    async def post_json(self, url: str, headers: dict, body: dict, deadline: float):
+        client, slots = self._ensure()
+
+        async def call():
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                with metrics.span("ai.slot_wait"):
+                    await slots.acquire()
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                resp = await client.post(url, json=body, headers=headers, timeout=deadline)
+                if resp.status_code >= 400:
+                    raise ProviderHTTPError(resp.status_code, resp.reason_phrase, resp.text)
+                return resp.json()
+            finally:
+                self.in_flight -= 1
+                slots.release()
+
+        return await asyncio.wait_for(call(), deadline)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "in_flight": self.in_flight, "waiting": self.waiting,
+                "peak_in_flight": self.peak_in_flight, "peak_waiting": self.peak_waiting}
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+provider = ProviderClient()
+
+# Part of every explanation cache key; bump when the prompt or its parsing changes so answers
+# produced by the old prompt are no longer served.
+PROMPT_VERSION = 1
+
+
+def _deadline(env_name: str, default: float) -> float:
+    return float(os.environ.get(env_name, default))
+
+
+async def _call_hf_chat(prompt: str) -> str:
     """
     Call a HuggingFace Inference API text generation model.
 
     Requires:
       - HF_API_TOKEN
       - HF_MODEL_ID (e.g. mistralai/Mistral-7B-Instruct-v0.3)
+    Optional HF_API_BASE points at another compatible endpoint.
     """
     api_token = os.environ.get("HF_API_TOKEN")
-    model_id = os.environ.get("HF_MODEL_ID", "mistralai/Mistral-7B-Instruct-v0.3")
+    model_id = _hf_model_id()
 
     if not api_token:
         raise RuntimeError("HF_API_TOKEN not set")
 
-    url = f"https://api-inference.huggingface.co/models/{model_id}"
+    base_url = os.environ.get("HF_API_BASE", "https://api-inference.huggingface.co/models")
+    url = f"{base_url.rstrip('/')}/{model_id}"
 
     headers = {
         "Authorization": f"Bearer {api_token}",
@@ -36,30 +152,22 @@ def _call_hf_chat(prompt: str) -> str:
         },
     }
 
-    data = json.dumps(body).encode("utf-8")
-    req = request.Request(url, data=data, headers=headers, method="POST")
-
     try:
-        with request.urlopen(req, timeout=30) as resp:
-            raw = resp.read().decode("utf-8")
-            j = json.loads(raw)
-
-            # HF often returns a list of { "generated_text": ... }
-            if isinstance(j, list) and len(j) > 0 and "generated_text" in j[0]:
-                return j[0]["generated_text"]
-
-            # Some models respond differently; try a fallback
-            if isinstance(j, dict) and "generated_text" in j:
-                return j["generated_text"]
-
-            raise RuntimeError(f"Unexpected HF response format: {j}")
-    except error.HTTPError as e:
-        raise RuntimeError(
-            f"HF HTTP error: {e.code} {e.reason} - "
-            f"{e.read().decode('utf-8', errors='ignore')}"
-        )
+        j = await provider.post_json(url, headers, body, _deadline("HF_TIMEOUT_SECONDS", 30))
+
+        # HF often returns a list of { "generated_text": ... }
+        if isinstance(j, list) and len(j) > 0 and "generated_text" in j[0]:
+            return j[0]["generated_text"]
+
+        # Some models respond differently; try a fallback
+        if isinstance(j, dict) and "generated_text" in j:
+            return j["generated_text"]
+
+        raise RuntimeError(f"Unexpected HF response format: {j}")
+    except ProviderHTTPError as e:
+        raise RuntimeError(f"HF HTTP error: {e.status} {e.reason} - {e.body}")
     except Exception as e:
-        raise RuntimeError(f"HuggingFace call failed: {e}")
+        raise RuntimeError(f"HuggingFace call failed: {e!r}")
 
 
 def _read_prompt_template():
@@ -77,7 +185,7 @@ def _read_prompt_template():
         )
 
 
-def _call_azure_openai_chat(prompt: str) -> str:
+async def _call_azure_openai_chat(prompt: str) -> str:
     """
     Call Azure OpenAI Chat Completions API (chat/completions). Expects the following env vars to be set:
       - AZURE_OPENAI_ENDPOINT (e.g. https://your-resource.openai.azure.com)
@@ -110,36 +218,31 @@ def _call_azure_openai_chat(prompt: str) -> str:
         "temperature": 0.6,
     }
 
-    data = json.dumps(body).encode("utf-8")
-    req = request.Request(url, data=data, headers=headers, method="POST")
     try:
-        with request.urlopen(req, timeout=20) as resp:
-            raw = resp.read().decode("utf-8")
-            j = json.loads(raw)
-            # Azure chat response contains choices[0].message.content
-            if "choices" in j and len(j["choices"]) > 0:
-                msg = j["choices"][0].get("message")
-                if msg and "content" in msg:
-                    return msg["content"]
-                # older deployments may place text in 'text'
-                return j["choices"][0].get("text", "")
-            raise RuntimeError("No choices in OpenAI response")
-    except error.HTTPError as e:
-        raise RuntimeError(f"Azure OpenAI HTTP error: {e.code} {e.reason} - {e.read().decode('utf-8', errors='ignore')}")
+        j = await provider.post_json(url, headers, body, _deadline("AZURE_OPENAI_TIMEOUT_SECONDS", 20))
+        # Azure chat response contains choices[0].message.content
+        if "choices" in j and len(j["choices"]) > 0:
+            msg = j["choices"][0].get("message")
+            if msg and "content" in msg:
+                return msg["content"]
+            # older deployments may place text in 'text'
+            return j["choices"][0].get("text", "")
+        raise RuntimeError("No choices in OpenAI response")
+    except ProviderHTTPError as e:
+        raise RuntimeError(f"Azure OpenAI HTTP error: {e.status} {e.reason} - {e.body}")
     except Exception as e:
-        raise RuntimeError(f"Azure OpenAI call failed: {e}")
+        raise RuntimeError(f"Azure OpenAI call failed: {e!r}")
 
 
 def _deterministic_explanation(student, tutor) -> str:
     # compute match reasons
     reasons = []
-    try:
-        prefs = [s.strip() for s in (student.preferred_subjects or "").split(",") if s.strip()]
-    except Exception:
-        prefs = []
+    linked = getattr(student, "subjects", None) or []
+    prefs = [s.name for s in linked]
+    pref_ids = {s.id for s in linked}
 
     tutor_subjects = [s.name for s in getattr(tutor, "subjects", [])]
-    overlap = list(set(prefs) & set(tutor_subjects)) if prefs else []
+    overlap = [s.name for s in getattr(tutor, "subjects", []) if s.id in pref_ids]
     if overlap:
         reasons.append(f"Matches your subjects: {', '.join(overlap)}")
     if getattr(student, "city", None) and getattr(tutor, "city", None) and student.city.lower() == tutor.city.lower():
@@ -175,73 +278,353 @@ def _deterministic_explanation(student, tutor) -> str:
 
     return filled.strip()
 
-def explain_recommendations(student, tutors: List) -> List[str]:
+def _hf_model_id() -> str:
+    return os.environ.get("HF_MODEL_ID", "mistralai/Mistral-7B-Instruct-v0.3")
+
+
+def _azure_model_id() -> str:
+    return "azure:" + os.environ.get("AZURE_OPENAI_DEPLOYMENT", "")
+
+
+def _hf_configured() -> bool:
+    return bool(os.environ.get("HF_API_TOKEN"))
+
+
+def _azure_configured() -> bool:
+    return all(os.environ.get(v) for v in ("AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_KEY", "AZURE_OPENAI_DEPLOYMENT"))
+
+
+class CircuitBreaker:
     """
-    Try to use a hosted open-source model via HuggingFace to generate
-    short explanations for each tutor. If anything fails, fall back to
-    the deterministic explanation for each tutor.
+    Stops calling a provider after AI_BREAKER_FAILURES consecutive failures (default 3). While open,
+    calls are skipped for AI_BREAKER_COOLDOWN_SECONDS (default 30); the first call after that is a
+    trial that closes the breaker on success and reopens it on failure.
     """
-    if not tutors:
-        return []
 
-    # Build a compact JSON description for the prompt
-    try:
-        rows = []
-        for t in tutors:
-            rows.append({
-                "tutor_id": getattr(t, "id", None),
-                "name": getattr(t, "name", None),
-                "subjects": [s.name for s in getattr(t, "subjects", [])],
-                "hourly_rate": getattr(t, "hourly_rate", None),
-                "rating": getattr(t, "overall_rating", None),
-            })
-
-        student_info = {
-            "id": getattr(student, "id", None),
-            "name": getattr(student, "name", None),
-            "preferences": getattr(student, "preferred_subjects", None),
-            "city": getattr(student, "city", None),
-            "max_hourly_rate": getattr(student, "max_hourly_rate", None),
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self._trial or self._cooled_down() else "open"
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self.opened_at >= _deadline("AI_BREAKER_COOLDOWN_SECONDS", 30)
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self._trial or not self._cooled_down():
+            return False
+        self._trial = True
+        return True
+
+    def record(self, ok: bool):
+        self._trial = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= int(os.environ.get("AI_BREAKER_FAILURES", "3")):
+            self.opened_at = time.monotonic()
+
+
+class Provider:
+    """One model endpoint in the fallback chain, with its breaker and call metrics."""
+
+    def __init__(self, name: str, call, model_id, configured):
+        self.name = name
+        self.call = call
+        self.model_id = model_id
+        self.configured = configured
+        self.breaker = CircuitBreaker()
+        self.calls = 0
+        self.errors = 0
+        self.short_circuits = 0  # calls skipped because the breaker was open
+        self.last_error = None
+        self._latencies = deque(maxlen=512)  # seconds, most recent calls
+
+    def record(self, ok: bool, seconds: float, error: Exception = None):
+        self.calls += 1
+        self._latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+            self.last_error = str(error)[:200]
+        self.breaker.record(ok)
+
+    def stats(self) -> dict:
+        lat = sorted(self._latencies)
+
+        def pct(q):
+            return round(lat[min(len(lat) - 1, int(q * len(lat)))] * 1000, 1) if lat else None
+
+        return {
+            "name": self.name,
+            "configured": self.configured(),
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.calls, 4) if self.calls else None,
+            "short_circuits": self.short_circuits,
+            "latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "max": pct(1.0)},
+            "last_error": self.last_error,
         }
 
-        prompt_lines = [
-            "You will receive a student and a list of tutors.",
-            "Return a JSON array. Each element must have:",
-            "- tutor_id (matching the tutor_id from input)",
-            "- explanation (2 short sentences, friendly, explaining why this tutor fits the student).",
-            "Do NOT include anything other than the JSON array.\n",
-            "Student:",
-            json.dumps(student_info),
-            "Tutors:",
-            json.dumps([{"tutor_id": r["tutor_id"], **r} for r in rows]),
-        ]
-        prompt = "\n".join(prompt_lines)
 
-        # Try HF
+# tried in order; a provider is skipped when unconfigured or while its breaker is open
+PROVIDERS = [
+    Provider("huggingface", _call_hf_chat, _hf_model_id, _hf_configured),
+    Provider("azure_openai", _call_azure_openai_chat, _azure_model_id, _azure_configured),
+]
+
+_budget_exceeded = 0
+_background = set()  # model calls still running after their request answered
+
+
+def latency_budget() -> float:
+    """Seconds a request waits for the model before answering with deterministic text (0 waits)."""
+    return _deadline("AI_LATENCY_BUDGET_SECONDS", 0.8)
+
+
+def provider_stats() -> dict:
+    return {
+        "latency_budget_seconds": latency_budget(),
+        "budget_exceeded": _budget_exceeded,
+        "background_pending": len(_background),
+        "client": provider.stats(),
+        "providers": [p.stats() for p in PROVIDERS],
+    }
+
+
+async def _generate_explanations(call, student_info: dict, rows: List[dict]) -> dict:
+    """Ask one provider about the given tutors; returns {tutor_id: explanation} for those it answered."""
+    prompt_lines = [
+        "You will receive a student and a list of tutors.",
+        "Return a JSON array. Each element must have:",
+        "- tutor_id (matching the tutor_id from input)",
+        "- explanation (2 short sentences, friendly, explaining why this tutor fits the student).",
+        "Do NOT include anything other than the JSON array.\n",
+        "Student:",
+        json.dumps(student_info),
+        "Tutors:",
+        json.dumps([{"tutor_id": r["tutor_id"], **r} for r in rows]),
+    ]
+    prompt = "\n".join(prompt_lines)
+
+    text = await call(prompt)
+    cleaned = text.strip()
+    # try to find first '[' in case model added some prefix
+    idx = cleaned.find("[")
+    if idx != -1:
+        cleaned = cleaned[idx:]
+    parsed = json.loads(cleaned)
+
+    asked = {r["tutor_id"] for r in rows}
+    id_to_ex = {}
+    for item in parsed:
+        tid = item.get("tutor_id")
+        ex = item.get("explanation")
+        if tid is not None and ex and int(tid) in asked:
+            id_to_ex[int(tid)] = ex
+    if not id_to_ex:
+        raise RuntimeError("model response contained no usable explanations")
+    return id_to_ex
+
+
+async def _run_chain(providers: List[Provider], student_info: dict, missing: List[tuple]) -> dict:
+    """
+    Try each provider in turn for the (row, {provider name: cache key}) pairs in missing and store
+    the first answer in the explanation cache. Returns {tutor_id: explanation}, empty if all failed.
+    """
+    rows = [r for r, _ in missing]
+    for p in providers:
+        if not p.breaker.allow():
+            p.short_circuits += 1
+            continue
+        started = time.perf_counter()
+        generated, error = None, None
+        try:
+            with metrics.span(f"ai.{p.name}"):
+                generated = await _generate_explanations(p.call, student_info, rows)
+        except Exception as e:
+            error = e
+        finally:
+            # also runs on cancellation, so a half-open trial is never left hanging
+            p.record(generated is not None, time.perf_counter() - started, error)
+        if generated is None:
+            continue
+        fresh = {keys[p.name]: generated[r["tutor_id"]] for r, keys in missing if r["tutor_id"] in generated}
         try:
-            text = _call_hf_chat(prompt)
-            cleaned = text.strip()
-            # try to find first '[' in case model added some prefix
-            idx = cleaned.find("[")
-            if idx != -1:
-                cleaned = cleaned[idx:]
-            parsed = json.loads(cleaned)
-
-            id_to_ex = {}
-            for item in parsed:
-                tid = item.get("tutor_id")
-                ex = item.get("explanation")
-                if tid is not None and ex:
-                    id_to_ex[int(tid)] = ex
-
-            return [
-                id_to_ex.get(getattr(t, "id", None), _deterministic_explanation(student, t))
-                for t in tutors
-            ]
+            with metrics.span("ai.cache_store"):
+                await asyncio.to_thread(explaincache.cache.put_many, p.model_id(), fresh)
         except Exception:
-            # any failure -> deterministic fallback
-            return [_deterministic_explanation(student, t) for t in tutors]
+            pass  # the cache is best effort; the answer is still returned
+        return generated
+    return {}
+
+
+def _prepare(student, tutors: List):
+    """Prompt inputs and explanation cache keys: (providers, student_info, rows, keys)."""
+    # Build a compact JSON description for the prompt
+    rows = []
+    for t in tutors:
+        rows.append({
+            "tutor_id": getattr(t, "id", None),
+            "name": getattr(t, "name", None),
+            "subjects": [s.name for s in getattr(t, "subjects", [])],
+            "hourly_rate": getattr(t, "hourly_rate", None),
+            "rating": getattr(t, "overall_rating", None),
+        })
+
+    student_info = {
+        "id": getattr(student, "id", None),
+        "name": getattr(student, "name", None),
+        "preferences": [s.name for s in getattr(student, "subjects", None) or []],
+        "city": getattr(student, "city", None),
+        "max_hourly_rate": getattr(student, "max_hourly_rate", None),
+    }
+
+    providers = [p for p in PROVIDERS if p.configured()]
+    keys = [{p.name: explaincache.key(p.model_id(), PROMPT_VERSION, student_info, r) for p in providers}
+            for r in rows]
+    return providers, student_info, rows, keys
+
+
+def _split(providers: List[Provider], rows: List[dict], keys: List[dict], found: dict):
+    """(cached {tutor_id: explanation}, missing [(row, {provider name: cache key})])."""
+    # an answer cached from any provider in the chain is good; earlier providers win
+    cached = {}
+    for r, ks in zip(rows, keys):
+        hit = next((found[ks[p.name]] for p in providers if ks[p.name] in found), None)
+        if hit is not None:
+            cached[r["tutor_id"]] = hit
+    missing = [(r, ks) for r, ks in zip(rows, keys) if r["tutor_id"] not in cached]
+    return cached, missing
+
+
+def _all_keys(keys: List[dict]) -> List[str]:
+    return [k for ks in keys for k in ks.values()]
+
+
+async def _lookup(student, tutors: List):
+    """
+    Build the prompt inputs and read the explanation cache. Returns (providers, student_info,
+    cached {tutor_id: explanation}, missing [(row, {provider name: cache key})]).
+    """
+    providers, student_info, rows, keys = _prepare(student, tutors)
+    if not providers:
+        return providers, student_info, {}, []
+    try:
+        with metrics.span("ai.cache_lookup"):
+            found = await asyncio.to_thread(explaincache.cache.get_many, _all_keys(keys))
+    except Exception:
+        found = {}
+    cached, missing = _split(providers, rows, keys, found)
+    return providers, student_info, cached, missing
+
+
+def providers_configured() -> bool:
+    return any(p.configured() for p in PROVIDERS)
+
+
+def ready_explanations(student, tutors: List) -> List[str]:
+    """Cached model explanations where available, deterministic ones otherwise; never calls a model."""
+    out = [_deterministic_explanation(student, t) for t in tutors]
+    try:
+        providers, _, rows, keys = _prepare(student, tutors)
+        if providers and tutors:
+            cached, _ = _split(providers, rows, keys, explaincache.cache.get_many(_all_keys(keys)))
+            out = [cached.get(t.id) or ex for t, ex in zip(tutors, out)]
+    except Exception:
+        pass
+    return out
+
+
+async def precompute_explanations(student, tutors: List) -> bool:
+    """
+    Make sure the explanation cache holds model answers for these tutors. Returns False when no
+    provider produced any of the missing explanations, so the caller can retry later.
+    """
+    providers, student_info, _, missing = await _lookup(student, tutors)
+    if not missing:
+        return True
+    return bool(await _run_chain(providers, student_info, missing))
+
+
+def _keep_running(task):
+    # the request no longer waits for this model call; let it finish and fill the cache
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def explain_recommendations(student, tutors: List) -> List[str]:
+    """
+    Explain each tutor with the first model provider that answers (HuggingFace, then Azure
+    OpenAI), falling back to the deterministic explanation for each tutor.
+
+    Model answers are kept in the persistent explanation cache, one entry per tutor; only tutors
+    without a fresh entry are sent to a model, and fallbacks are never cached. If the model has not
+    answered within the latency budget the request gets deterministic text and the call carries on
+    in the background to warm the cache.
+    """
+    global _budget_exceeded
+    if not tutors:
+        return []
+
+    try:
+        providers, student_info, cached, missing = await _lookup(student, tutors)
+
+        generated = {}
+        if missing:
+            task = asyncio.ensure_future(_run_chain(providers, student_info, missing))
+            budget = latency_budget()
+            try:
+                # how long the request itself waited for the model, at most the budget
+                with metrics.span("ai.model_wait"):
+                    generated = await (asyncio.wait_for(asyncio.shield(task), budget) if budget > 0 else task)
+            except asyncio.TimeoutError:
+                _budget_exceeded += 1
+                _keep_running(task)
+
+        return [
+            cached.get(t.id) or generated.get(t.id) or _deterministic_explanation(student, t)
+            for t in tutors
+        ]
 
     except Exception:
         # final safety net
         return [_deterministic_explanation(student, t) for t in tutors]
+
+
+async def stream_explanations(student, tutors: List):
+    """
+    Yield (tutor_id, explanation) for model-written explanations as they become available: cached
+    ones straight away, then the provider chain's answers. No latency budget applies; tutors no
+    provider could explain are simply not yielded, so callers keep the deterministic text.
+    """
+    if not tutors:
+        return
+    try:
+        providers, student_info, cached, missing = await _lookup(student, tutors)
+    except Exception:
+        return
+    for t in tutors:
+        if t.id in cached:
+            yield t.id, cached[t.id]
+    if not missing:
+        return
+    task = asyncio.ensure_future(_run_chain(providers, student_info, missing))
+    try:
+        generated = await asyncio.shield(task)
+    except asyncio.CancelledError:
+        # the client went away; the answer still warms the cache
+        _keep_running(task)
+        raise
+    for r, _ in missing:
+        if r["tutor_id"] in generated:
+            yield r["tutor_id"], generated[r["tutor_id"]]
@@ -0,0 +1,122 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+
+# In-memory prefix indexes behind /api/autocomplete and /api/cities, so keystroke-rate
+# lookups never reach the database. Built once at startup with two GROUP BY queries and
+# then adjusted incrementally by crud's tutor and subject write functions.
+
+CACHE_SIZE = 256  # (prefix, limit) results kept per index; short prefixes are the costly, common ones
+
+class PrefixIndex:
+    """Sorted lower-cased keys with a display name and a tutor count per key."""
+
+    def __init__(self, keep_empty: bool):
+        self.keep_empty = keep_empty  # subjects stay listed with 0 tutors; cities disappear
+        self._keys: List[str] = []
+        self._entries: Dict[str, list] = {}  # key -> [display, count]
+        self._cache: "OrderedDict[tuple, List[dict]]" = OrderedDict()  # least recently used first
+
+    def load(self, rows: Iterable):
+        self._keys, self._entries = [], {}
+        self._cache.clear()
+        for display, count in rows:
+            self.adjust(display, count or 0)
+
+    def adjust(self, display: Optional[str], delta: int):
+        key = _key(display)
+        if key is None:
+            return
+        entry = self._entries.get(key)
+        if entry is None:
+            if delta <= 0 and not self.keep_empty:
+                return
+            entry = self._entries[key] = [display.strip(), 0]
+            insort(self._keys, key)
+        entry[1] = max(entry[1] + delta, 0)
+        if entry[1] == 0 and not self.keep_empty:
+            del self._entries[key]
+            del self._keys[bisect_left(self._keys, key)]
+        self._cache.clear()
+
+    def lookup(self, prefix: str, limit: int) -> List[dict]:
+        prefix = (prefix or "").strip().lower()
+        cached = self._cache.get((prefix, limit))
+        if cached is not None:
+            self._cache.move_to_end((prefix, limit))
+            return cached
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\uffff")
+        best = heapq.nsmallest(limit, self._keys[lo:hi], key=lambda k: (-self._entries[k][1], k))
+        out = [{"name": self._entries[k][0], "tutors": self._entries[k][1]} for k in best]
+        self._cache[(prefix, limit)] = out
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return out
+
+    def names(self) -> List[str]:
+        return [self._entries[k][0] for k in self._keys]
+
+
+def _key(display: Optional[str]) -> Optional[str]:
+    return models.normalize_city(display)
+
+
+class Autocomplete:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.subjects = PrefixIndex(keep_empty=True)
+        self.cities = PrefixIndex(keep_empty=False)
+
+    def rebuild(self, db: Session):
+        subject_rows = db.query(models.Subject.name, func.count(models.TutorSubject.tutor_id)) \
+            .outerjoin(models.TutorSubject, models.TutorSubject.subject_id == models.Subject.id) \
+            .group_by(models.Subject.id, models.Subject.name).all()
+        city_rows = db.query(models.Tutor.city, func.count(models.Tutor.id)) \
+            .filter(models.Tutor.city.isnot(None)).group_by(models.Tutor.city).all()
+        with self._lock:
+            self.subjects.load(subject_rows)
+            self.cities.load(city_rows)
+
+    def lookup(self, field: str, prefix: str, limit: int = 10) -> List[dict]:
+        with self._lock:
+            index = self.subjects if field == "subject" else self.cities
+            return index.lookup(prefix, limit)
+
+    def city_names(self) -> List[str]:
+        with self._lock:
+            return self.cities.names()
+
+    def subject_added(self, name: str):
+        with self._lock:
+            self.subjects.adjust(name, 0)
+
+    def tutors_added(self, cities: Dict[str, int], subjects: Dict[str, int]):
+        """Count many new tutors at once: {city: tutors}, {subject name: tutors} (bulk imports)."""
+        with self._lock:
+            for city, n in cities.items():
+                self.cities.adjust(city, n)
+            for name, n in subjects.items():
+                self.subjects.adjust(name, n)
+
+    def tutor_changed(self, old_city=None, old_subjects=(), new_city=None, new_subjects=()):
+        """Move one tutor's contribution from its old city/subjects to the new ones."""
+        with self._lock:
+            if old_city != new_city:
+                self.cities.adjust(old_city, -1)
+                self.cities.adjust(new_city, 1)
+            old, new = set(old_subjects), set(new_subjects)
+            for name in old - new:
+                self.subjects.adjust(name, -1)
+            for name in new - old:
+                self.subjects.adjust(name, 1)
+
+
+autocomplete = Autocomplete()
@@ -0,0 +1,315 @@
+# Bulk tutor import from CSV or JSON Lines.
+#
+# POST /api/tutors/import and `python -m backend.bulkimport` read a roster record by record and
+# validate each one on its own: rows that fail are reported by line number and skipped, the rest
+# are imported. Subject names resolve against a name -> id map loaded in one query (unknown names
+# are created together, once per import), and tutors, tutor_subjects and the full-text rows go in
+# with one executemany per batch and one commit per batch. The similar-tutor lists of the new
+# tutors are computed once at the end; tutors without reviews sit below neighbors.MIN_RATING, so no
+# existing list changes.
+#
+# CSV needs a header row; columns are the POST /api/tutors fields, with subjects separated by
+# ";", "," or "|". JSONL has one object per line with the same keys (subjects as a list or string).
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from email_validator import EmailNotValidError, validate_email as _validate_address
+from pydantic import BaseModel, ValidationError, confloat, constr, validator
+from pydantic.networks import validate_email
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+
+from . import crud, geo, models, neighbors, precompute
+from .autocomplete import autocomplete
+from .catalog import catalog
+from .reccache import cache as rec_cache
+from .textsearch import text_search
+
+FORMATS = ("csv", "jsonl")
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000  # the failed count stays exact; only the listed errors are capped
+_CHUNK = 500  # ids per IN list, as elsewhere
+
+_subject_separators = re.compile(r"[;,|]")
+# a dot-atom local part at an ASCII domain with a TLD: the shape of nearly every roster address.
+# Those only need their domain checked, once per domain; the rest get EmailStr's full check.
+_atext = r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]"
+_plain_email = re.compile(rf"({_atext}+(?:\.{_atext}+)*)@((?:[A-Za-z0-9](?:[A-Za-z0-9-]{{0,61}}[A-Za-z0-9])?\.)+[A-Za-z]{{2,63}})")
+
+
+@lru_cache(maxsize=4096)
+def _email_domain(domain: str) -> str:
+    return _validate_address(f"x@{domain}", check_deliverability=False).domain
+
+
+class TutorRow(BaseModel):
+    name: constr(strip_whitespace=True, min_length=1)
+    email: str
+    phone: Optional[str] = None
+    city: Optional[str] = None
+    address: Optional[str] = None
+    latitude: Optional[confloat(ge=-90, le=90)] = None
+    longitude: Optional[confloat(ge=-180, le=180)] = None
+    hourly_rate: confloat(ge=0) = 0.0
+    teaching_mode: models.TeachingModeEnum = models.TeachingModeEnum.online
+    bio: Optional[str] = None
+    subjects: List[str] = []
+
+    @validator("email")
+    def check_email(cls, v):
+        v = v.strip()
+        m = _plain_email.fullmatch(v)
+        if m and len(m.group(1)) <= 64:
+            try:
+                return f"{m.group(1)}@{_email_domain(m.group(2))}"
+            except EmailNotValidError:
+                pass
+        return validate_email(v)[1]
+
+    @validator("subjects", pre=True)
+    def split_subjects(cls, v):
+        parts = _subject_separators.split(v) if isinstance(v, str) else v
+        names, seen = [], set()
+        for name in parts or []:
+            name = str(name).strip()
+            if name and name.lower() not in seen:
+                seen.add(name.lower())
+                names.append(name)
+        return names
+
+
+def format_for(content_type: Optional[str] = None, filename: Optional[str] = None) -> Optional[str]:
+    """Guess csv or jsonl from a Content-Type header or a file name."""
+    ct = (content_type or "").split(";")[0].strip().lower()
+    if ct in ("text/csv", "application/csv"):
+        return "csv"
+    if ct in ("application/x-ndjson", "application/jsonl", "application/jsonlines", "application/x-jsonlines"):
+        return "jsonl"
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Union[dict, str]]]:
+    """(line number, field dict) per record, or (line number, error message) for unreadable ones."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        if reader.fieldnames is None:
+            return
+        reader.fieldnames = [(f or "").strip().lower() for f in reader.fieldnames]
+        for row in reader:
+            if None in row:
+                yield reader.line_num, f"{len(reader.fieldnames) + len(row[None])} fields, the header has {len(reader.fieldnames)}"
+                continue
+            # blank cells mean "not given", so field defaults apply
+            yield reader.line_num, {k: v for k, v in row.items() if k and v is not None and v.strip() != ""}
+    elif fmt == "jsonl":
+        for n, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                yield n, f"invalid JSON: {e}"
+                continue
+            if not isinstance(obj, dict):
+                yield n, "expected a JSON object"
+                continue
+            yield n, {k: v for k, v in obj.items() if v is not None and v != ""}
+    else:
+        raise ValueError(f"unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+def _messages(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.subjects_created: List[str] = []
+        self.started = time.perf_counter()
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        seconds = time.perf_counter() - self.started
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "subjects_created": self.subjects_created,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round((self.imported + self.failed) / seconds, 1) if seconds else None,
+        }
+
+
+def _subject_map(db: Session) -> Dict[str, Tuple[int, str]]:
+    # lower-cased name -> (id, name); matches create_or_get_subject's case-insensitive lookup
+    out = {}
+    for sid, name in db.query(models.Subject.id, models.Subject.name).order_by(models.Subject.id):
+        out.setdefault(name.lower(), (sid, name))
+    return out
+
+
+def _insert_returning_ids(db: Session, table, rows: List[dict]) -> List[int]:
+    """
+    executemany INSERT ... RETURNING id, batched into multi-row VALUES statements. Those return rows
+    in no guaranteed order (asking SQLAlchemy to keep parameter order makes SQLite insert row by
+    row), so ids are matched back on (name, email); the few rows repeating a pair within the batch
+    are inserted in order.
+    """
+    index = defaultdict(list)
+    for i, row in enumerate(rows):
+        index[(row["name"], row["email"])].append(i)
+    unique = [i for i in range(len(rows)) if len(index[(rows[i]["name"], rows[i]["email"])]) == 1]
+    repeated = [i for i in range(len(rows)) if len(index[(rows[i]["name"], rows[i]["email"])]) > 1]
+    ids = [None] * len(rows)
+    if unique:
+        stmt = insert(table).returning(table.c.id, table.c.name, table.c.email)
+        for rid, name, email in db.execute(stmt, [rows[i] for i in unique]):
+            ids[index[(name, email)][0]] = rid
+    if repeated:
+        stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        for i, rid in zip(repeated, db.execute(stmt, [rows[i] for i in repeated]).scalars()):
+            ids[i] = rid
+    return ids
+
+
+class _Importer:
+    def __init__(self, db: Session, report: ImportReport):
+        self.db = db
+        self.report = report
+        self.subjects = _subject_map(db)
+        self.new_ids: List[int] = []
+        self.touched_subjects = set()
+
+    def resolve_subjects(self, batch: List[Tuple[int, TutorRow]]):
+        missing = {}
+        for _, row in batch:
+            for name in row.subjects:
+                if name.lower() not in self.subjects:
+                    missing.setdefault(name.lower(), name)
+        if not missing:
+            return
+        try:
+            created = crud.create_subjects(self.db, list(missing.values()))
+        except IntegrityError:
+            # another writer created some of them since the map was loaded
+            self.db.rollback()
+            self.subjects = _subject_map(self.db)
+            created = crud.create_subjects(self.db, [n for k, n in missing.items() if k not in self.subjects])
+        for s in created:
+            self.subjects[s.name.lower()] = (s.id, s.name)
+            self.report.subjects_created.append(s.name)
+
+    def write(self, batch: List[Tuple[int, TutorRow]]):
+        if not batch:
+            return
+        db = self.db
+        self.resolve_subjects(batch)
+        T, TS = models.Tutor.__table__, models.TutorSubject.__table__
+        rows = [{"name": r.name, "email": r.email, "phone": r.phone, "city": r.city,
+                 "city_normalized": models.normalize_city(r.city), "address": r.address,
+                 "latitude": r.latitude, "longitude": r.longitude, "geohash": geo.encode_or_none(r.latitude, r.longitude),
+                 "hourly_rate": r.hourly_rate, "teaching_mode": r.teaching_mode, "bio": r.bio} for _, r in batch]
+        try:
+            ids = _insert_returning_ids(db, T, rows)
+            links, docs = [], []
+            for tid, (_, r) in zip(ids, batch):
+                subs = [self.subjects[n.lower()] for n in r.subjects]
+                links.extend({"tutor_id": tid, "subject_id": sid} for sid, _ in subs)
+                docs.append((tid, r.name, r.bio or "", " ".join(name for _, name in subs)))
+                self.touched_subjects.update(sid for sid, _ in subs)
+            if links:
+                db.execute(insert(TS), links)
+            text_search.index_new(db, docs)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for line, _ in batch:
+                self.report.error(line, f"batch write failed: {e.__class__.__name__}: {e}")
+            return
+        self.new_ids.extend(ids)
+        self.report.imported += len(ids)
+        autocomplete.tutors_added(Counter(r.city for _, r in batch),
+                                  Counter(self.subjects[n.lower()][1] for _, r in batch for n in r.subjects))
+        if catalog.ready:
+            for i in range(0, len(ids), _CHUNK):
+                for t in db.query(models.Tutor).options(selectinload(models.Tutor.subjects)) \
+                        .filter(models.Tutor.id.in_(ids[i:i + _CHUNK])):
+                    catalog.upsert(t)
+            db.expunge_all()
+
+    def finish(self):
+        if not self.new_ids:
+            return
+        neighbors.fill(self.db, self.new_ids)
+        audience = precompute.students_for_subjects(self.db, self.touched_subjects)
+        self.db.commit()
+        rec_cache.catalog_changed()
+        precompute.enqueue_students(audience)
+
+
+def import_tutors(db: Session, lines: Iterable[str], fmt: str, batch_size: int = BATCH_SIZE) -> dict:
+    """Import tutors from CSV or JSONL lines; returns the report (counts, per-line errors, timing)."""
+    report = ImportReport()
+    importer = _Importer(db, report)
+    batch: List[Tuple[int, TutorRow]] = []
+    for line, record in read_records(lines, fmt):
+        if isinstance(record, str):
+            report.error(line, record)
+            continue
+        try:
+            batch.append((line, TutorRow.parse_obj(record)))
+        except ValidationError as e:
+            report.error(line, _messages(e))
+            continue
+        if len(batch) >= batch_size:
+            importer.write(batch)
+            batch = []
+    importer.write(batch)
+    importer.finish()
+    return report.as_dict()
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    p = argparse.ArgumentParser(description="Import tutors from a CSV or JSONL file into DATABASE_URL.")
+    p.add_argument("path", help="roster file, or - for stdin")
+    p.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = p.parse_args()
+    fmt = args.format or format_for(filename=args.path)
+    if fmt is None:
+        sys.exit("cannot tell the format from the file name; pass --format csv or --format jsonl")
+    if args.path == "-":
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig", errors="replace", newline="")
+    else:
+        source = open(args.path, encoding="utf-8-sig", errors="replace", newline="")
+    with source, SessionLocal() as db:
+        text_search.init(db)  # finds the FTS5 table; the API rebuilds an in-memory index at startup
+        result = import_tutors(db, source, fmt, args.batch_size)
+    for e in result["errors"]:
+        print(f"line {e['line']}: {e['error']}", file=sys.stderr)
+    print(json.dumps({k: v for k, v in result.items() if k != "errors"}))
+    sys.exit(1 if result["failed"] else 0)
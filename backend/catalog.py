@@ -0,0 +1,236 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from . import models, scoring, pagination
+
+# Optional in-process copy of the tutor catalog. When TUTOR_CATALOG=1 it is built at startup
+# and the read paths in crud (search, similar, recommendations) answer from memory; the tutor
+# write functions in crud push every change through upsert()/remove() after committing.
+def enabled() -> bool:
+    return os.getenv("TUTOR_CATALOG", "0").lower() in ("1", "true", "yes")
+
+
+class SubjectRecord:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+
+
+class TutorRecord:
+    """Read-only snapshot of a Tutor row exposing the attributes the API serializers use."""
+    __slots__ = ("id", "name", "email", "city", "city_normalized", "hourly_rate", "teaching_mode", "overall_rating",
+                 "number_of_reviews", "latitude", "longitude", "subjects", "subject_ids")
+
+    def __init__(self, t, subjects):
+        self.id = t.id
+        self.name = t.name
+        self.email = t.email
+        self.city = t.city
+        self.city_normalized = models.normalize_city(t.city)
+        self.hourly_rate = t.hourly_rate
+        self.teaching_mode = models.TeachingModeEnum(t.teaching_mode) if t.teaching_mode else None
+        self.overall_rating = t.overall_rating
+        self.number_of_reviews = t.number_of_reviews
+        self.latitude = t.latitude
+        self.longitude = t.longitude
+        self.subjects = tuple(subjects)
+        self.subject_ids = frozenset(s.id for s in self.subjects)
+
+    def as_tuple(self):
+        return tuple(getattr(self, f) for f in self.__slots__ if f != "subjects")
+
+
+class TutorCatalog:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tutors: Dict[int, TutorRecord] = {}
+        self._subjects: Dict[int, SubjectRecord] = {}
+        self._by_subject: Dict[int, Set[int]] = {}
+        self.ready = False
+        self.rebuild_seconds: Optional[float] = None
+        self.built_at: Optional[datetime] = None
+
+    # ----- maintenance -----
+
+    def rebuild(self, db: Session):
+        start = time.perf_counter()
+        subjects = {s.id: SubjectRecord(s.id, s.name) for s in db.query(models.Subject).all()}
+        members: Dict[int, List[SubjectRecord]] = {}
+        for tid, sid in db.query(models.TutorSubject.tutor_id, models.TutorSubject.subject_id) \
+                .order_by(models.TutorSubject.id):
+            if sid in subjects:
+                members.setdefault(tid, []).append(subjects[sid])
+        tutors = {}
+        by_subject: Dict[int, Set[int]] = {}
+        for t in db.query(models.Tutor).order_by(models.Tutor.id):
+            rec = TutorRecord(t, {s.id: s for s in members.get(t.id, [])}.values())
+            tutors[t.id] = rec
+            for sid in rec.subject_ids:
+                by_subject.setdefault(sid, set()).add(t.id)
+        with self._lock:
+            self._subjects = subjects
+            self._tutors = tutors
+            self._by_subject = by_subject
+            self.ready = True
+            self.rebuild_seconds = time.perf_counter() - start
+            self.built_at = datetime.utcnow()
+
+    def upsert(self, t):
+        if not self.ready:
+            return
+        with self._lock:
+            subs = []
+            for s in t.subjects:
+                rec = self._subjects.get(s.id)
+                if rec is None or rec.name != s.name:
+                    rec = self._subjects[s.id] = SubjectRecord(s.id, s.name)
+                subs.append(rec)
+            self._unindex(t.id)
+            rec = TutorRecord(t, {s.id: s for s in subs}.values())
+            self._tutors[t.id] = rec
+            for sid in rec.subject_ids:
+                self._by_subject.setdefault(sid, set()).add(t.id)
+
+    def remove(self, tutor_id: int):
+        if not self.ready:
+            return
+        with self._lock:
+            self._unindex(tutor_id)
+            self._tutors.pop(tutor_id, None)
+
+    def _unindex(self, tutor_id: int):
+        old = self._tutors.get(tutor_id)
+        if old is None:
+            return
+        for sid in old.subject_ids:
+            ids = self._by_subject.get(sid)
+            if ids is not None:
+                ids.discard(tutor_id)
+
+    def verify(self, db: Session) -> dict:
+        """Compare the catalog with the database; returns ids that are missing, stale or extra."""
+        fresh = TutorCatalog()
+        fresh.rebuild(db)
+        with self._lock:
+            mine = dict(self._tutors)
+        missing = sorted(set(fresh._tutors) - set(mine))
+        extra = sorted(set(mine) - set(fresh._tutors))
+        stale = sorted(i for i in set(mine) & set(fresh._tutors)
+                       if mine[i].as_tuple() != fresh._tutors[i].as_tuple()
+                       or [s.name for s in mine[i].subjects] != [s.name for s in fresh._tutors[i].subjects])
+        return {"consistent": not (missing or extra or stale), "missing": missing, "extra": extra, "stale": stale}
+
+    def stats(self) -> dict:
+        with self._lock:
+            tutors = list(self._tutors.values())
+            size = sys.getsizeof(self._tutors) + sys.getsizeof(self._subjects) + sys.getsizeof(self._by_subject)
+            for rec in tutors:
+                size += sys.getsizeof(rec) + sys.getsizeof(rec.subjects) + sys.getsizeof(rec.subject_ids)
+                size += sum(sys.getsizeof(getattr(rec, f)) for f in ("name", "email", "city") if getattr(rec, f))
+            for s in self._subjects.values():
+                size += sys.getsizeof(s) + sys.getsizeof(s.name)
+            for ids in self._by_subject.values():
+                size += sys.getsizeof(ids)
+            return {
+                "enabled": enabled(),
+                "ready": self.ready,
+                "tutors": len(tutors),
+                "subjects": len(self._subjects),
+                "memory_bytes": size,
+                "rebuild_seconds": round(self.rebuild_seconds, 4) if self.rebuild_seconds is not None else None,
+                "built_at": self.built_at.isoformat() if self.built_at else None,
+            }
+
+    # ----- queries (mirror crud.search_tutors / get_similar_tutors / recommend_for_student) -----
+
+    def _with_subjects(self, subject_ids) -> Set[int]:
+        ids: Set[int] = set()
+        for sid in subject_ids:
+            ids |= self._by_subject.get(sid, set())
+        return ids
+
+    def search(self, subject_name=None, city=None, max_hourly_rate=None, min_rating=None,
+               teaching_mode=None, origin=None, radius_km=None, sort_by=None, limit=None, after=None):
+        with self._lock:
+            if subject_name:
+                needle = subject_name.lower()
+                sids = [s.id for s in self._subjects.values() if needle in s.name.lower()]
+                pool = [self._tutors[i] for i in self._with_subjects(sids)]
+            else:
+                pool = list(self._tutors.values())
+        city_needle = models.normalize_city(city) if city else None
+        results = []
+        for t in pool:
+            if city_needle and not (t.city_normalized or "").startswith(city_needle):
+                continue
+            if max_hourly_rate is not None and not (t.hourly_rate is not None and t.hourly_rate <= max_hourly_rate):
+                continue
+            if min_rating is not None and not (t.overall_rating is not None and t.overall_rating >= min_rating):
+                continue
+            if teaching_mode and (t.teaching_mode is None or t.teaching_mode.value != teaching_mode):
+                continue
+            dist = None
+            if origin:
+                dist = None if t.latitude is None or t.longitude is None else \
+                    scoring.distance_km(origin, t.latitude, t.longitude)
+                if radius_km is not None and (dist is None or dist > radius_km):
+                    continue
+            results.append((t, dist))
+        key = lambda x: pagination.tutor_search_key(sort_by, x[0], x[1], origin is not None)
+        if after is not None:
+            after = tuple(after)
+            results = [r for r in results if key(r) > after]
+        results.sort(key=key)
+        return results[:limit] if limit is not None else results
+
+    def similar(self, tutor_id: int, limit: int = 6):
+        with self._lock:
+            base = self._tutors.get(tutor_id)
+            if not base:
+                return []
+            ids = self._with_subjects(base.subject_ids)
+            ids.discard(tutor_id)
+            pool = sorted((self._tutors[i] for i in ids), key=lambda t: t.id)
+        pool = [t for t in pool if t.overall_rating is not None and t.overall_rating >= 3.5]
+        ranked = scoring.rank_similar(self._candidates(pool), list(base.subject_ids), base.hourly_rate, limit)
+        return self._records(ranked)
+
+    def recommend(self, student, pref_ids: List[int], origin, limit: int = 8):
+        with self._lock:
+            if pref_ids:
+                pool = [self._tutors[i] for i in self._with_subjects(pref_ids)]
+            else:
+                pool = list(self._tutors.values())
+        city_needle = models.normalize_city(student.city) if student.city else None
+        out = []
+        for t in pool:
+            if city_needle and not (t.city_normalized or "").startswith(city_needle):
+                continue
+            if student.max_hourly_rate is not None and not (t.hourly_rate is not None and t.hourly_rate <= student.max_hourly_rate):
+                continue
+            if t.overall_rating is None or t.overall_rating < 0.0:
+                continue
+            out.append(t)
+        out.sort(key=lambda t: t.id)
+        ranked = scoring.rank_recommendations(self._candidates(out), pref_ids, origin, limit)
+        return self._records(ranked)
+
+    def _candidates(self, pool):
+        rows = [(t.id, t.overall_rating, t.hourly_rate, t.latitude, t.longitude) for t in pool]
+        memberships = [(t.id, sid) for t in pool for sid in t.subject_ids]
+        return scoring.Candidates(rows, memberships)
+
+    def _records(self, ids):
+        with self._lock:
+            return [self._tutors[i] for i in ids if i in self._tutors]
+
+
+catalog = TutorCatalog()
@@ -1,7 +1,13 @@
-from sqlalchemy.orm import Session
-from . import models
+from sqlalchemy import and_, or_, select, func, case
+from sqlalchemy.orm import Session, selectinload
+from . import models, geo, scoring, pagination, neighbors, precompute
+from .catalog import catalog, SubjectRecord, TutorRecord
+from .reccache import cache as rec_cache
+from .textsearch import text_search
+from .autocomplete import autocomplete
 from typing import List, Optional
 from math import radians, cos, sin, asin, sqrt
+from datetime import datetime
 
 
 def haversine(lat1, lon1, lat2, lon2):
@@ -21,106 +27,367 @@ def get_subject_by_name(db: Session, name: str):
     return db.query(models.Subject).filter(models.Subject.name.ilike(name)).first()
 
 
-def search_tutors(db: Session, subject_name: Optional[str]=None, city: Optional[str]=None,
-                  max_hourly_rate: Optional[float]=None, min_rating: Optional[float]=None,
-                  teaching_mode: Optional[str]=None, student=None, sort_by: Optional[str]=None):
-    q = db.query(models.Tutor)
+# ----- read plans -----
+# The reads with control flow of their own (search, text search, similar tutors, recommendations)
+# are written once, as generators that yield each piece of I/O they need and are sent its result.
+# run() carries a plan out on a sync Session and acrud on an AsyncSession, so the branching, the
+# recommendation cache handling and the ranking live in one place for both paths.
+
+class Scalars:
+    """Step: the ORM entities a select returns, as a list."""
+    __slots__ = ("stmt",)
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+    def sync(self, db: Session):
+        return db.scalars(self.stmt).all()
+
+
+class Rows:
+    """Step: the rows a select returns, as a list."""
+    __slots__ = ("stmt",)
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+    def sync(self, db: Session):
+        return db.execute(self.stmt).all()
+
+
+class Get:
+    """Step: a primary-key lookup; load names the relationships the plan reads from the result."""
+    __slots__ = ("model", "ident", "load")
+
+    def __init__(self, model, ident, *load: str):
+        self.model = model
+        self.ident = ident
+        self.load = load
+
+    def sync(self, db: Session):
+        # identity map first: no SELECT when the route already loaded the row; relationships load lazily
+        return db.get(self.model, self.ident)
+
+
+class Compute:
+    """Step: CPU work, such as scoring or a catalog lookup (acrud runs it in the threadpool)."""
+    __slots__ = ("fn", "args", "kwargs")
+
+    def __init__(self, fn, *args, **kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def sync(self, db: Session):
+        return self.fn(*self.args, **self.kwargs)
+
+
+def run(db: Session, plan):
+    """Carry out a read plan on a sync Session; returns the plan's result."""
+    result = None
+    try:
+        while True:
+            result = plan.send(result).sync(db)
+    except StopIteration as done:
+        return done.value
+
+
+def resolve_origin(lat, lon):
+    # students carry no location, so distances are only known from an explicit lat/lon
+    if lat is not None and lon is not None:
+        return lat, lon
+    return None
+
+
+def _within_cells(q, lat: float, lon: float, radius_km: float):
+    # prune to the geohash cells covering the circle; each cell is an index range scan
+    cells = geo.covering_cells(lat, lon, radius_km)
+    if not cells:
+        return q.filter(models.Tutor.latitude.isnot(None), models.Tutor.longitude.isnot(None))
+    col = models.Tutor.geohash
+    return q.filter(or_(*[and_(col >= c, col < geo.prefix_upper_bound(c)) for c in cells]))
+
+
+def _city_prefix(city: str):
+    # indexed prefix lookup on the normalized column instead of ilike('%city%')
+    norm = models.normalize_city(city)
+    if not norm:
+        return None
+    col = models.Tutor.city_normalized
+    return and_(col >= norm, col < norm + "\uffff")
+
+
+def _distance_expr(lat: float, lon: float):
+    # haversine in SQL; database.py registers the math functions on SQLite connections
+    T = models.Tutor
+    dlat = (func.radians(T.latitude) - radians(lat)) / 2
+    dlon = (func.radians(T.longitude) - radians(lon)) / 2
+    a = func.power(func.sin(dlat), 2) + cos(radians(lat)) * func.cos(func.radians(T.latitude)) * func.power(func.sin(dlon), 2)
+    return 6371 * 2 * func.asin(func.sqrt(a))
+
+
+def _search_order(sort_by: Optional[str], dist_expr):
+    # (expression, descending) pairs matching pagination.tutor_search_key
+    T = models.Tutor
+    if sort_by == "distance_asc":
+        if dist_expr is None:
+            return [(T.id, False)]
+        return [(case((dist_expr.is_(None), 1), else_=0), False), (func.coalesce(dist_expr, 0.0), False), (T.id, False)]
+    if sort_by == "price_asc":
+        return [(T.hourly_rate, False), (T.id, False)]
+    return [(func.coalesce(T.overall_rating, 0.0), True), (T.hourly_rate, False), (T.id, False)]
+
+
+def _seek(order, after):
+    """Keyset predicate: rows strictly after the `after` key in the given ordering."""
+    clause = None
+    for (expr, desc), value in reversed(list(zip(order, after))):
+        if desc:
+            value = -value
+        past = expr < value if desc else expr > value
+        clause = past if clause is None else or_(past, and_(expr == value, clause))
+    return clause
+
+
+def _apply_tutor_filters(q, subject_name=None, city=None, max_hourly_rate=None, min_rating=None, teaching_mode=None):
     if subject_name:
-        q = q.join(models.Tutor.subjects).filter(models.Subject.name.ilike(f"%{subject_name}%"))
-    if city:
-        q = q.filter(models.Tutor.city.ilike(f"%{city}%"))
+        q = q.filter(models.Tutor.subjects.any(models.Subject.name.ilike(f"%{subject_name}%")))
+    if city and _city_prefix(city) is not None:
+        q = q.filter(_city_prefix(city))
     if max_hourly_rate is not None:
         q = q.filter(models.Tutor.hourly_rate <= max_hourly_rate)
     if min_rating is not None:
         q = q.filter(models.Tutor.overall_rating >= min_rating)
     if teaching_mode:
         q = q.filter(models.Tutor.teaching_mode == teaching_mode)
+    return q
+
+
+def search_statement(subject_name=None, city=None, max_hourly_rate=None, min_rating=None, teaching_mode=None,
+                     origin=None, radius_km=None, sort_by=None, limit=None, after=None):
+    """The search_tutors query: Tutor rows, plus distance_km when an origin is given."""
+    # if an origin is given, compute distance in SQL
+    dist_expr = _distance_expr(*origin) if origin else None
+    q = select(models.Tutor, dist_expr.label("distance_km")) if origin else select(models.Tutor)
+    q = q.options(selectinload(models.Tutor.subjects))
+    q = _apply_tutor_filters(q, subject_name, city, max_hourly_rate, min_rating, teaching_mode)
+    if origin and radius_km is not None:
+        q = _within_cells(q, origin[0], origin[1], radius_km)
+        q = q.filter(dist_expr <= radius_km)
+
+    order = _search_order(sort_by, dist_expr)
+    if after is not None:
+        if len(after) != len(order):
+            raise pagination.InvalidCursor("cursor does not belong to this ordering")
+        q = q.filter(_seek(order, after))
+    q = q.order_by(*[expr.desc() if desc else expr for expr, desc in order])
+    if limit is not None:
+        q = q.limit(limit)
+    return q
 
-    tutors = q.all()
 
-    # if student provided with lat/long, compute distance and sort if requested
-    results = []
-    for t in tutors:
-        dist = None
-        results.append((t, dist))
+def search_tutors(db: Session, subject_name: Optional[str]=None, city: Optional[str]=None,
+                  max_hourly_rate: Optional[float]=None, min_rating: Optional[float]=None,
+                  teaching_mode: Optional[str]=None, sort_by: Optional[str]=None,
+                  lat: Optional[float]=None, lon: Optional[float]=None, radius_km: Optional[float]=None,
+                  limit: Optional[int]=None, after: Optional[tuple]=None):
+    return run(db, search_plan(subject_name=subject_name, city=city, max_hourly_rate=max_hourly_rate,
+                               min_rating=min_rating, teaching_mode=teaching_mode, sort_by=sort_by,
+                               origin=resolve_origin(lat, lon), radius_km=radius_km, limit=limit, after=after))
 
-    if sort_by == "distance_asc":
-        results.sort(key=lambda x: (x[1] is None, x[1] if x[1] is not None else 1e9))
-    elif sort_by == "price_asc":
-        results.sort(key=lambda x: x[0].hourly_rate)
-    else:
-        # default: rating desc, then price asc
-        results.sort(key=lambda x: (- (x[0].overall_rating or 0), x[0].hourly_rate))
 
-    return results
+def search_plan(origin=None, **filters):
+    """search_tutors as a read plan; filters are search_statement's other arguments."""
+    if catalog.ready:
+        return (yield Compute(catalog.search, origin=origin, **filters))
+    rows = yield Rows(search_statement(origin=origin, **filters))
+    return [(row[0], row[1] if origin else None) for row in rows]
+
+
+def text_search_statement(subject_name=None, city=None, max_hourly_rate=None, min_rating=None, teaching_mode=None):
+    """Filtered Tutor query that text_search_tutors narrows to the full-text matches."""
+    return _apply_tutor_filters(select(models.Tutor).options(selectinload(models.Tutor.subjects)),
+                                subject_name, city, max_hourly_rate, min_rating, teaching_mode)
+
+
+def fts_statement(q: str, filtered, limit: int):
+    """FTS5 backend: (Tutor, bm25) rows best first, or None when q has no searchable terms."""
+    ranked = text_search.ranked_query(q, filtered)
+    if ranked is None:
+        return None
+    qry, score = ranked
+    return qry.order_by(score, models.Tutor.id).limit(limit)
+
+
+def text_search_tutors(db: Session, q: str, subject_name: Optional[str]=None, city: Optional[str]=None,
+                       max_hourly_rate: Optional[float]=None, min_rating: Optional[float]=None,
+                       teaching_mode: Optional[str]=None, limit: int = 20):
+    """Full-text match over name, bio and subjects, best BM25 score first; returns (tutor, score) pairs."""
+    return run(db, text_search_plan(q, subject_name, city, max_hourly_rate, min_rating, teaching_mode, limit))
+
+
+def text_search_plan(q: str, subject_name=None, city=None, max_hourly_rate=None, min_rating=None,
+                     teaching_mode=None, limit: int = 20):
+    filtered = text_search_statement(subject_name, city, max_hourly_rate, min_rating, teaching_mode)
+    if text_search.backend == "fts5":
+        stmt = fts_statement(q, filtered, limit)
+        if stmt is None:
+            return []
+        # FTS5's bm25() is lower-is-better; report it as a positive relevance score
+        return [(t, -s) for t, s in (yield Rows(stmt))]
+
+    # in-memory index: walk the ranked ids in chunks, letting SQL apply the filters to each chunk
+    ranked = text_search.ranked_ids(q)
+    out = []
+    for start in range(0, len(ranked), 500):
+        chunk = ranked[start:start + 500]
+        found = {t.id: t for t in (yield Scalars(filtered.filter(models.Tutor.id.in_([i for i, _ in chunk]))))}
+        out.extend((found[i], s) for i, s in chunk if i in found)
+        if len(out) >= limit:
+            break
+    return out[:limit]
+
+
+def get_tutor(db: Session, tutor_id: int, with_relations: bool = False):
+    if with_relations:
+        # reviews are not loaded here: detail pages use the maintained summary and latest_reviews()
+        return db.query(models.Tutor).filter(models.Tutor.id == tutor_id) \
+            .options(selectinload(models.Tutor.subjects)).first()
+    # identity-map lookup: no SELECT when the tutor is already loaded in this session
+    return db.get(models.Tutor, tutor_id)
+
+
+def candidates_statement(*criteria):
+    """Scoring columns of the tutors matching criteria, in id order (scoring.Candidates input)."""
+    return select(models.Tutor.id, models.Tutor.overall_rating, models.Tutor.hourly_rate,
+                  models.Tutor.latitude, models.Tutor.longitude).where(*criteria).order_by(models.Tutor.id)
+
+
+def memberships_statement(subject_ids):
+    return select(models.TutorSubject.tutor_id, models.TutorSubject.subject_id) \
+        .where(models.TutorSubject.subject_id.in_(subject_ids))
+
 
+def _candidates_plan(criteria, subject_ids):
+    """(candidate rows, memberships) for scoring.Candidates."""
+    rows = yield Rows(candidates_statement(*criteria))
+    members = (yield Rows(memberships_statement(subject_ids))) if subject_ids else []
+    return rows, members
 
-def get_tutor(db: Session, tutor_id: int):
-    return db.query(models.Tutor).filter(models.Tutor.id == tutor_id).first()
+
+def _tutors_with_any_subject(subject_ids):
+    return models.Tutor.id.in_(
+        select(models.TutorSubject.tutor_id).where(models.TutorSubject.subject_id.in_(subject_ids)))
+
+
+def ranked_statement(ids):
+    return select(models.Tutor).options(selectinload(models.Tutor.subjects)).where(models.Tutor.id.in_(ids))
+
+
+def in_rank_order(tutors, ids):
+    by_id = {t.id: t for t in tutors}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def _ranked_plan(ids):
+    if not ids:
+        return []
+    return in_rank_order((yield Scalars(ranked_statement(ids))), ids)
+
+
+def neighbors_statement(tutor_id: int, limit: int):
+    # materialized neighbours: one read on the (tutor_id, rank) primary key
+    ST = neighbors.ST
+    return select(models.Tutor).join(ST, ST.c.neighbor_id == models.Tutor.id) \
+        .where(ST.c.tutor_id == tutor_id).order_by(ST.c.rank).limit(limit) \
+        .options(selectinload(models.Tutor.subjects))
+
+
+def similar_criteria(tutor_id: int, subject_ids):
+    return (_tutors_with_any_subject(subject_ids), models.Tutor.id != tutor_id, models.Tutor.overall_rating >= 3.5)
 
 
 def get_similar_tutors(db: Session, tutor_id: int, limit: int = 6):
-    base = get_tutor(db, tutor_id)
+    return run(db, similar_plan(tutor_id, limit))
+
+
+def similar_plan(tutor_id: int, limit: int = 6):
+    if catalog.ready:
+        return (yield Compute(catalog.similar, tutor_id, limit))
+    if limit <= neighbors.K:
+        return (yield Scalars(neighbors_statement(tutor_id, limit)))
+    base = yield Get(models.Tutor, tutor_id, "subjects")
     if not base:
         return []
     subject_ids = [s.id for s in base.subjects]
-    q = db.query(models.Tutor).join(models.TutorSubject, models.Tutor.id==models.TutorSubject.tutor_id)
-    q = q.filter(models.Tutor.id != tutor_id)
-    q = q.filter(models.TutorSubject.subject_id.in_(subject_ids))
-    q = q.filter(models.Tutor.overall_rating >= 3.5)
-    candidates = q.all()
+    rows, members = yield from _candidates_plan(similar_criteria(tutor_id, subject_ids), subject_ids)
 
     # score by number of overlapping subjects, rating desc, price closeness
-    def score(t):
-        overlap = len(set([s.id for s in t.subjects]) & set(subject_ids))
-        price_diff = abs((t.hourly_rate or 0) - (base.hourly_rate or 0))
-        rating = t.overall_rating or 0
-        return (-overlap, -rating, price_diff)
-
-    candidates.sort(key=score)
-    return candidates[:limit]
+    ranked = yield Compute(lambda: scoring.rank_similar(scoring.Candidates(rows, members), subject_ids,
+                                                        base.hourly_rate, limit))
+    return (yield from _ranked_plan(ranked))
 
 
 def get_student(db: Session, student_id: int):
-    return db.query(models.Student).filter(models.Student.id == student_id).first()
+    return db.get(models.Student, student_id)
 
 
 def recommend_for_student(db: Session, student_id: int, limit: int = 8):
-    student = get_student(db, student_id)
+    return run(db, recommend_plan(student_id, limit))
+
+
+def recommend_plan(student_id: int, limit: int = 8):
+    key = rec_cache.key(student_id, limit)
+    cached = rec_cache.get(key)
+    if cached is not None:
+        return cached
+    student = yield Get(models.Student, student_id, "subjects")
     if not student:
         return []
-    prefs = []
-    if student.preferred_subjects:
-        prefs = [s.strip() for s in student.preferred_subjects.split(",") if s.strip()]
-
-    q = db.query(models.Tutor)
-    if prefs:
-        # join subjects
-        q = q.join(models.Tutor.subjects).filter(models.Subject.name.in_(prefs))
-    if student.city:
-        q = q.filter(models.Tutor.city.ilike(f"%{student.city}%"))
+    tutors = recommendation_records((yield from _recommend_plan(student, limit)))
+    rec_cache.put(key, tutors)
+    return tutors
+
+
+def recommendation_records(tutors):
+    # cache session-independent snapshots; catalog results already are
+    return [t if isinstance(t, TutorRecord) else TutorRecord(t, [SubjectRecord(s.id, s.name) for s in t.subjects])
+            for t in tutors]
+
+
+def skip_recommendations(student, pref_ids) -> bool:
+    # asked only for subjects nobody teaches
+    return not pref_ids and bool(models.split_subject_names(student.preferred_subjects))
+
+
+def recommend_criteria(student, pref_ids):
+    criteria = []
+    if pref_ids:
+        criteria.append(_tutors_with_any_subject(pref_ids))
+    if student.city and _city_prefix(student.city) is not None:
+        criteria.append(_city_prefix(student.city))
     if student.max_hourly_rate is not None:
-        q = q.filter(models.Tutor.hourly_rate <= student.max_hourly_rate)
-    q = q.filter(models.Tutor.overall_rating >= 0.0)
+        criteria.append(models.Tutor.hourly_rate <= student.max_hourly_rate)
+    criteria.append(models.Tutor.overall_rating >= 0.0)
+    return criteria
 
-    tutors = q.all()
 
-    # score by subject match count, rating desc, distance if available
-    def score(t):
-        sub_names = [s.name for s in t.subjects]
-        overlap = len(set(sub_names) & set(prefs)) if prefs else 0
-        rating = t.overall_rating or 0
-        dist = None
-        stu_lat = getattr(student, "latitude", None)
-        stu_lon = getattr(student, "longitude", None)
+def _recommend(db: Session, student, limit: int):
+    return run(db, _recommend_plan(student, limit))
 
-        if stu_lat is not None and stu_lon is not None and t.latitude is not None and t.longitude is not None:
-            dist = haversine(stu_lat, stu_lon, t.latitude, t.longitude)
 
-        return (-overlap, -rating, dist if dist is not None else 1e6)
+def _recommend_plan(student, limit: int):
+    pref_ids = [s.id for s in student.subjects]
+    if skip_recommendations(student, pref_ids):
+        return []
+    if catalog.ready:
+        return (yield Compute(catalog.recommend, student, pref_ids, None, limit))
+    rows, members = yield from _candidates_plan(recommend_criteria(student, pref_ids), pref_ids)
 
-    tutors.sort(key=score)
-    return tutors[:limit]
+    # score by subject match count, rating desc (students have no location to measure distance from)
+    ranked = yield Compute(lambda: scoring.rank_recommendations(scoring.Candidates(rows, members), pref_ids, None,
+                                                                limit))
+    return (yield from _ranked_plan(ranked))
 
 
 def create_or_get_subject(db: Session, name: str):
@@ -132,26 +399,70 @@ def create_or_get_subject(db: Session, name: str):
         return s
     s = models.Subject(name=name)
     db.add(s)
+    _link_waiting_students(db, s)
     db.commit()
     db.refresh(s)
+    autocomplete.subject_added(s.name)
     return s
 
 
+def create_subjects(db: Session, names: List[str]):
+    """create_or_get_subject for many names at once; the caller resolves existing ones first."""
+    created = [models.Subject(name=n) for n in names]
+    db.add_all(created)
+    db.flush()
+    for s in created:
+        _link_waiting_students(db, s)
+    db.commit()
+    for s in created:
+        autocomplete.subject_added(s.name)
+    return created
+
+
+def _set_student_subjects(db: Session, student):
+    """Point student.subjects at the known subjects named in student.preferred_subjects."""
+    names = models.split_subject_names(student.preferred_subjects)
+    if not names:
+        student.subjects = []
+        return
+    keys = [n.lower() for n in names]
+    by_key = {}
+    for subj in db.query(models.Subject).filter(func.lower(models.Subject.name).in_(keys)):
+        by_key.setdefault(subj.name.lower(), subj)
+    student.subjects = [by_key[k] for k in keys if k in by_key]
+
+
+def _link_waiting_students(db: Session, subject):
+    # students may list a subject before any tutor teaches it; link them once it exists
+    key = subject.name.lower()
+    q = db.query(models.Student).filter(func.lower(models.Student.preferred_subjects).contains(key, autoescape=True))
+    for student in q:
+        if key in (n.lower() for n in models.split_subject_names(student.preferred_subjects)):
+            student.subjects.append(subject)
+
+
 def create_tutor(db: Session, *, name: str, email: str, hourly_rate: float = 0.0, phone: str = None,
                  city: str = None, address: str = None, latitude: float = None, longitude: float = None,
                  teaching_mode: str = None, bio: str = None, subjects: list = None):
-    t = models.Tutor(name=name, email=email, phone=phone, city=city, address=address,
-                     latitude=latitude, longitude=longitude, hourly_rate=hourly_rate,
-                     teaching_mode=teaching_mode, bio=bio)
+    t = models.Tutor(name=name, email=email, phone=phone, city=city, city_normalized=models.normalize_city(city), address=address,
+                     latitude=latitude, longitude=longitude, geohash=geo.encode_or_none(latitude, longitude),
+                     hourly_rate=hourly_rate, teaching_mode=teaching_mode, bio=bio)
     db.add(t)
     db.flush()
     if subjects:
         for sname in subjects:
             s = create_or_get_subject(db, sname)
-            if s:
+            if s and s not in t.subjects:
                 t.subjects.append(s)
+    text_search.index_tutor(db, t)
+    neighbors.refresh(db, t.id)
+    audience = precompute.students_for_subjects(db, [s.id for s in t.subjects])
     db.commit()
     db.refresh(t)
+    catalog.upsert(t)
+    rec_cache.catalog_changed()
+    precompute.enqueue_students(audience)
+    autocomplete.tutor_changed(new_city=t.city, new_subjects=[s.name for s in t.subjects])
     return t
 
 
@@ -159,44 +470,141 @@ def update_tutor(db: Session, tutor_id: int, updates: dict):
     t = db.query(models.Tutor).filter(models.Tutor.id == tutor_id).first()
     if not t:
         return None
+    old_city, old_subjects, old_rate = t.city, [s.name for s in t.subjects], t.hourly_rate
+    old_subject_ids = [s.id for s in t.subjects]
     # simple scalar fields
     fields = ['name','email','phone','city','address','latitude','longitude','hourly_rate','teaching_mode','bio']
     for f in fields:
         if f in updates:
             setattr(t, f, updates.get(f))
+    if 'latitude' in updates or 'longitude' in updates:
+        t.geohash = geo.encode_or_none(t.latitude, t.longitude)
+    if 'city' in updates:
+        t.city_normalized = models.normalize_city(t.city)
     # handle subjects explicitly
     if 'subjects' in updates:
         t.subjects.clear()
         subs = updates.get('subjects') or []
         for sname in subs:
             s = create_or_get_subject(db, sname)
-            if s:
+            if s and s not in t.subjects:
                 t.subjects.append(s)
+        t.updated_at = datetime.utcnow()  # the row itself may be unchanged; exports include subjects
+    text_search.index_tutor(db, t)
+    if 'subjects' in updates or t.hourly_rate != old_rate:
+        neighbors.refresh(db, t.id)
+    audience = precompute.students_for_subjects(db, old_subject_ids + [s.id for s in t.subjects])
     db.commit()
     db.refresh(t)
+    catalog.upsert(t)
+    rec_cache.catalog_changed()
+    precompute.enqueue_students(audience)
+    autocomplete.tutor_changed(old_city, old_subjects, t.city, [s.name for s in t.subjects])
     return t
 
 
+def page_statement(model, limit: Optional[int] = None, after_id: Optional[int] = None):
+    q = select(model)
+    if after_id is not None:
+        q = q.where(model.id > after_id)
+    return q.order_by(model.id).limit(limit)
+
+
+def list_subjects(db: Session, limit: Optional[int] = None, after_id: Optional[int] = None):
+    return db.scalars(page_statement(models.Subject, limit, after_id)).all()
+
+
+def list_students(db: Session, limit: Optional[int] = None, after_id: Optional[int] = None):
+    return db.scalars(page_statement(models.Student, limit, after_id)).all()
+
+
 def delete_tutor(db: Session, tutor_id: int):
     t = db.query(models.Tutor).filter(models.Tutor.id == tutor_id).first()
     if not t:
         return False
+    old_city, old_subjects = t.city, [s.name for s in t.subjects]
+    audience = precompute.students_for_subjects(db, [s.id for s in t.subjects])
     # delete related reviews
     db.query(models.Review).filter(models.Review.tutor_id == tutor_id).delete()
-    # delete tutor_subjects entries
-    db.query(models.TutorSubject).filter(models.TutorSubject.tutor_id == tutor_id).delete()
+    # delete tutor_subjects entries (through the already-loaded collection)
+    t.subjects.clear()
+    text_search.remove_tutor(db, tutor_id)
+    neighbors.refresh(db, tutor_id, deleted=True)
     db.delete(t)
     db.commit()
+    catalog.remove(tutor_id)
+    rec_cache.catalog_changed()
+    precompute.enqueue_students(audience)
+    autocomplete.tutor_changed(old_city, old_subjects)
     return True
 
 
+def _rating_delta(stars: dict) -> dict:
+    """
+    UPDATE values adding stars[rating] reviews of each rating (negative to remove) to a tutor's
+    aggregates. Computed from the stored values in one statement, so concurrent reviews never
+    lose an increment.
+    """
+    T = models.Tutor
+    new_sum = func.coalesce(T.rating_sum, 0.0) + float(sum(r * n for r, n in stars.items()))
+    new_count = func.coalesce(T.number_of_reviews, 0) + sum(stars.values())
+    values = {
+        T.rating_sum: new_sum,
+        T.number_of_reviews: new_count,
+        T.overall_rating: case((new_count > 0, new_sum / new_count), else_=0.0),
+    }
+    for r, n in stars.items():
+        if r in models.STAR_RATINGS:
+            col = getattr(T, f"stars_{r}")
+            values[col] = func.coalesce(col, 0) + n
+    return values
+
+
+def review_histogram(t) -> dict:
+    return {str(r): getattr(t, f"stars_{r}") or 0 for r in models.STAR_RATINGS}
+
+
+def latest_reviews_statement(tutor_id: int, limit: int, before: Optional[tuple] = None):
+    R = models.Review
+    q = select(R).where(R.tutor_id == tutor_id)
+    if before is not None:
+        created_at, review_id = before
+        q = q.where(or_(R.created_at < created_at, and_(R.created_at == created_at, R.id < review_id)))
+    return q.order_by(R.created_at.desc(), R.id.desc()).limit(limit)
+
+
+def latest_reviews(db: Session, tutor_id: int, limit: int, before: Optional[tuple] = None):
+    """Newest reviews first; `before` is the (created_at, id) key of the last review already shown."""
+    return db.scalars(latest_reviews_statement(tutor_id, limit, before)).all()
+
+
+def create_review(db: Session, tutor_id: int, *, student_id: int, rating: int, comment: str = None):
+    t = db.get(models.Tutor, tutor_id)
+    if not t:
+        return None
+    r = models.Review(tutor_id=tutor_id, student_id=student_id, rating=rating, comment=comment)
+    db.add(r)
+    db.query(models.Tutor).filter(models.Tutor.id == tutor_id) \
+        .update(_rating_delta({rating: 1}), synchronize_session=False)
+    neighbors.refresh(db, tutor_id)
+    audience = precompute.students_for_subjects(db, [s.id for s in t.subjects])
+    db.commit()
+    db.refresh(r)
+    catalog.upsert(t)
+    rec_cache.catalog_changed()
+    precompute.enqueue_students(audience)
+    return r
+
+
 def create_student(db: Session, *, name: str, email: str, city: str = None, address: str = None,
                    preferred_subjects: str = None, max_hourly_rate: float = None):
     s = models.Student(name=name, email=email, city=city, address=address,
                        preferred_subjects=preferred_subjects, max_hourly_rate=max_hourly_rate)
+    _set_student_subjects(db, s)
     db.add(s)
     db.commit()
     db.refresh(s)
+    precompute.enqueue_students([s.id])
     return s
 
 
@@ -208,8 +616,12 @@ def update_student(db: Session, student_id: int, updates: dict):
     for f in fields:
         if f in updates:
             setattr(s, f, updates.get(f))
+    if 'preferred_subjects' in updates:
+        _set_student_subjects(db, s)
     db.commit()
     db.refresh(s)
+    rec_cache.student_changed(student_id)
+    precompute.enqueue_students([student_id])
     return s
 
 
@@ -217,9 +629,32 @@ def delete_student(db: Session, student_id: int):
     s = db.query(models.Student).filter(models.Student.id == student_id).first()
     if not s:
         return False
-    # delete related reviews and lesson requests
+    # delete related reviews (taking them out of the tutors' rating aggregates) and lesson requests
+    reviewed = {}
+    for tutor_id, rating, count in db.query(models.Review.tutor_id, models.Review.rating, func.count(models.Review.id)) \
+            .filter(models.Review.student_id == student_id).group_by(models.Review.tutor_id, models.Review.rating):
+        reviewed.setdefault(tutor_id, {})[rating] = -count
+    for tutor_id, stars in reviewed.items():
+        db.query(models.Tutor).filter(models.Tutor.id == tutor_id) \
+            .update(_rating_delta(stars), synchronize_session=False)
     db.query(models.Review).filter(models.Review.student_id == student_id).delete()
     db.query(models.LessonRequest).filter(models.LessonRequest.student_id == student_id).delete()
+    for tutor_id in reviewed:
+        neighbors.refresh(db, tutor_id)
+    audience = precompute.students_for_subjects(
+        db, [sid for (sid,) in db.query(models.TutorSubject.subject_id).filter(models.TutorSubject.tutor_id.in_(list(reviewed)))]
+    ) if reviewed else []
+    s.subjects.clear()
     db.delete(s)
     db.commit()
+    rec_cache.student_changed(student_id)
+    precompute.forget_student(student_id)
+    if reviewed:
+        rec_cache.catalog_changed()
+        precompute.enqueue_students(sid for sid in audience if sid != student_id)
+    if catalog.ready:
+        for tutor_id in reviewed:
+            t = db.get(models.Tutor, tutor_id)
+            if t:
+                catalog.upsert(t)
     return True
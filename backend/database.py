@@ -1,6 +1,9 @@
+import math
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 # Determine a stable absolute path for the default sqlite file (project root/app.db)
 here = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -12,9 +15,113 @@ DATABASE_URL = os.getenv('DATABASE_URL', f'sqlite:///{default_db_path}')
 # If using sqlite, provide the check_same_thread connect arg
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith('sqlite') else {}
 
+# DATABASE_PROFILE=production sizes the connection pool from DB_POOL_SIZE / DB_MAX_OVERFLOW. On a
+# SQLite file it also switches to WAL, so readers never wait for the writer, applies the pragmas
+# below on every connection, and splits the engine in two: a pool of read-only connections for
+# GET routes (read_engine) and a single write connection (engine), so concurrent mutations queue
+# for the pool in-process instead of contending for the file lock. Otherwise both names are the
+# same engine.
+PROFILE = os.getenv('DATABASE_PROFILE', 'default')
+_sqlite_file = DATABASE_URL.startswith('sqlite') and make_url(DATABASE_URL).database not in (None, '', ':memory:')
+split_sqlite = PROFILE == 'production' and _sqlite_file
+
+
+def _pool_args(size: int, overflow: int) -> dict:
+	return {"pool_size": size, "max_overflow": overflow, "pool_timeout": float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '30'))}
+
+
 # echo=True can be enabled for debugging SQL; keep False by default
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+if split_sqlite:
+	engine = create_engine(DATABASE_URL, connect_args=connect_args, **_pool_args(1, 0))
+	read_engine = create_engine(DATABASE_URL, connect_args=connect_args,
+	                            **_pool_args(int(os.getenv('DB_POOL_SIZE', '20')), int(os.getenv('DB_MAX_OVERFLOW', '20'))))
+elif PROFILE == 'production' and not DATABASE_URL.startswith('sqlite'):
+	engine = create_engine(DATABASE_URL, connect_args=connect_args, pool_pre_ping=True,
+	                       **_pool_args(int(os.getenv('DB_POOL_SIZE', '20')), int(os.getenv('DB_MAX_OVERFLOW', '20'))))
+	read_engine = engine
+else:
+	engine = create_engine(DATABASE_URL, connect_args=connect_args)
+	read_engine = engine
+
+
+def _sqlite_math(fn):
+	def wrapped(*args):
+		if None in args:
+			return None
+		try:
+			return fn(*args)
+		except ValueError:
+			return None
+	return wrapped
+
+
+def _register_math_functions(dbapi_conn, _record):
+	# distance queries use sin/cos/asin/...; not every SQLite build ships the math functions
+	for name, fn, nargs in (("sin", math.sin, 1), ("cos", math.cos, 1), ("asin", lambda x: math.asin(min(1.0, x)), 1),
+	                        ("sqrt", math.sqrt, 1), ("radians", math.radians, 1), ("power", math.pow, 2)):
+		dbapi_conn.create_function(name, nargs, _sqlite_math(fn), deterministic=True)
+
+
+def _production_pragmas(read_only: bool):
+	pragmas = [
+		f"busy_timeout = {int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}",
+		"synchronous = NORMAL",  # with WAL: no fsync per commit, still safe against application crashes
+		f"cache_size = -{int(os.getenv('SQLITE_CACHE_MB', '16')) * 1024}",  # per connection
+		f"mmap_size = {int(os.getenv('SQLITE_MMAP_MB', '256')) * 1024 * 1024}",  # shared through the OS page cache
+		"temp_store = MEMORY",
+	]
+	if read_only:
+		pragmas.append("query_only = ON")  # a write on a read session fails instead of taking the lock
+	else:
+		# journal_mode is stored in the file; the writer connects first (create_all at startup)
+		pragmas[:0] = ["journal_mode = WAL", f"journal_size_limit = {64 * 1024 * 1024}"]
+
+	def apply(dbapi_conn, _record):
+		cursor = dbapi_conn.cursor()
+		for pragma in pragmas:
+			cursor.execute(f"PRAGMA {pragma}")
+		cursor.close()
+	return apply
+
+
+# DB_ASYNC=1 serves the read routes from an AsyncSession on an async driver (see acrud): aiosqlite
+# for a SQLite file, or ASYNC_DATABASE_URL for a server database, whose sync driver may have no async
+# counterpart. Writes keep the sync engine above. By default (DB_ASYNC=0), without an async URL or
+# without the driver, reads run on read_engine in the threadpool. aiosqlite runs each connection on
+# a thread of its own, so on SQLite the async path adds thread hops rather than saving any.
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL') or \
+	(str(make_url(DATABASE_URL).set(drivername='sqlite+aiosqlite')) if _sqlite_file else None)
+async_read_engine = None
+if os.getenv('DB_ASYNC', '0').lower() in ('1', 'true', 'yes') and ASYNC_DATABASE_URL:
+	try:
+		from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+		if split_sqlite or PROFILE == 'production':
+			_async_pool = _pool_args(int(os.getenv('DB_POOL_SIZE', '20')), int(os.getenv('DB_MAX_OVERFLOW', '20')))
+		else:
+			_async_pool = {}
+		async_read_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool,
+		                                        pool_pre_ping=PROFILE == 'production' and not _sqlite_file,
+		                                        **_async_pool)
+	except ImportError:  # aiosqlite / the async driver, or greenlet
+		async_read_engine = None
+
+
+if DATABASE_URL.startswith('sqlite'):
+	for _engine in {engine, read_engine}:
+		event.listen(_engine, "connect", _register_math_functions)
+	if split_sqlite:
+		event.listen(engine, "connect", _production_pragmas(read_only=False))
+		event.listen(read_engine, "connect", _production_pragmas(read_only=True))
+if async_read_engine is not None and ASYNC_DATABASE_URL.startswith('sqlite'):
+	event.listen(async_read_engine.sync_engine, "connect", _register_math_functions)
+	if split_sqlite:
+		event.listen(async_read_engine.sync_engine, "connect", _production_pragmas(read_only=True))
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine) if split_sqlite else SessionLocal
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False) \
+	if async_read_engine is not None else None
 Base = declarative_base()
 
 
@@ -25,3 +132,21 @@ def get_db():
 	finally:
 		db.close()
 
+
+def get_read_db():
+	# for routes that only read; with the production SQLite profile these never wait for the writer
+	db = ReadSessionLocal()
+	try:
+		yield db
+	finally:
+		db.close()
+
+
+async def get_async_read_db():
+	# loads nothing lazily: acrud spells out what each read loads
+	async with AsyncReadSessionLocal() as db:
+		yield db
+
+
+# the session the read routes get; acrud accepts either kind
+get_read_session = get_async_read_db if async_read_engine is not None else get_read_db
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable
+
+# Persistent, content-addressed cache of model-written tutor explanations. Each entry is keyed by
+# a SHA-256 of the model id, the prompt version and the exact student/tutor JSON sent to the
+# model, so any change to those inputs simply misses. It lives in a local SQLite file, separate
+# from the application database (which may be Azure SQL), and survives restarts.
+#
+# EXPLANATION_CACHE_PATH (default explanation_cache.db next to app.db; empty disables),
+# EXPLANATION_CACHE_TTL (seconds, default 7 days) and EXPLANATION_CACHE_MAX_ENTRIES (default
+# 50000, least recently used entries are evicted first) are read on use so backend/.env applies.
+
+_default_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "explanation_cache.db"))
+
+
+def path() -> str:
+    return os.getenv("EXPLANATION_CACHE_PATH", _default_path)
+
+
+def ttl_seconds() -> float:
+    return float(os.getenv("EXPLANATION_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def max_entries() -> int:
+    return int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "50000"))
+
+
+def key(model_id: str, prompt_version: int, student: dict, tutor: dict) -> str:
+    payload = json.dumps({"model": model_id, "prompt": prompt_version, "student": student, "tutor": tutor},
+                         sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExplanationCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready_path = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self):
+        p = path()
+        if not p:
+            return None
+        conn = sqlite3.connect(p, timeout=5)
+        if self._ready_path != p:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, explanation TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_explanations_accessed ON explanations (accessed_at)")
+            conn.commit()
+            self._ready_path = p
+        return conn
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Fresh explanations for the given keys; keys that are missing or expired are left out."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        conn = self._connect()
+        if conn is None:
+            return {}
+        now = time.time()
+        try:
+            marks = ",".join("?" * len(keys))
+            found = dict(conn.execute(
+                f"SELECT key, explanation FROM explanations WHERE key IN ({marks}) AND created_at >= ?",
+                [*keys, now - ttl_seconds()]).fetchall())
+            if found:
+                conn.execute(f"UPDATE explanations SET accessed_at = ? WHERE key IN ({','.join('?' * len(found))})",
+                             [now, *found])
+                conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, model_id: str, explanations: Dict[str, str]):
+        if not explanations:
+            return
+        conn = self._connect()
+        if conn is None:
+            return
+        now = time.time()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO explanations (key, model, explanation, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                [(k, model_id, text, now, now) for k, text in explanations.items()])
+            evicted = conn.execute("DELETE FROM explanations WHERE created_at < ?", [now - ttl_seconds()]).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0] - max_entries()
+            if excess > 0:
+                evicted += conn.execute(
+                    "DELETE FROM explanations WHERE key IN "
+                    "(SELECT key FROM explanations ORDER BY accessed_at LIMIT ?)", [excess]).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        with self._lock:
+            self.evictions += evicted
+
+    def clear(self):
+        conn = self._connect()
+        if conn is None:
+            return
+        try:
+            conn.execute("DELETE FROM explanations")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        entries = None
+        if conn is not None:
+            try:
+                entries = conn.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+            finally:
+                conn.close()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": path() or None,
+                "entries": entries,
+                "max_entries": max_entries(),
+                "ttl_seconds": ttl_seconds(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+
+cache = ExplanationCache()
@@ -0,0 +1,110 @@
+# Streaming NDJSON exports for analytics pulls: GET /api/export/{tutors|students|reviews}.
+#
+# Rows are read in id order through a streaming cursor (yield_per) and written out one partition
+# at a time, so memory stays flat whatever the table size; a partition of tutors gets its subject
+# names from one extra query, on a second connection: the streaming cursor still has rows pending,
+# and drivers without multiple active result sets (pyodbc on Azure SQL without MARS) refuse another
+# statement on its connection. The read is split into windows of EXPORT_WINDOW_ROWS rows (default
+# 50000), each its own short transaction resumed after the last id, so a long export never holds a
+# read transaction (on SQLite, the shared lock writers wait on) for its whole duration.
+#
+# ?updated_since= keeps rows changed at or after that time: updated_at for tutors and students
+# (bumped on every write), created_at for reviews, which are never edited. Deletes do not show up
+# in incremental pulls. Responses are gzip-compressed on the fly when the client accepts it.
+import enum
+import json
+import os
+import zlib
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from . import models
+from .database import read_engine
+
+PARTITION = 1000  # rows per cursor fetch and per chunk written to the client
+_CHUNK = 500  # ids per IN list
+
+_T, _S, _R = models.Tutor.__table__, models.Student.__table__, models.Review.__table__
+_TS, _SUBJ = models.TutorSubject.__table__, models.Subject.__table__
+
+# kind -> (table, exported columns, "changed since" column)
+EXPORTS = {
+    "tutors": (_T, [_T.c.id, _T.c.name, _T.c.email, _T.c.phone, _T.c.city, _T.c.address, _T.c.latitude,
+                    _T.c.longitude, _T.c.hourly_rate, _T.c.teaching_mode, _T.c.bio, _T.c.overall_rating,
+                    _T.c.number_of_reviews, _T.c.created_at, _T.c.updated_at], _T.c.updated_at),
+    "students": (_S, [_S.c.id, _S.c.name, _S.c.email, _S.c.city, _S.c.address, _S.c.preferred_subjects,
+                      _S.c.max_hourly_rate, _S.c.created_at, _S.c.updated_at], _S.c.updated_at),
+    "reviews": (_R, [_R.c.id, _R.c.tutor_id, _R.c.student_id, _R.c.rating, _R.c.comment, _R.c.created_at],
+                _R.c.created_at),
+}
+
+
+def window_rows() -> int:
+    return max(int(os.getenv("EXPORT_WINDOW_ROWS", "50000")), PARTITION)
+
+
+def _value(v):
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, enum.Enum):
+        return v.value
+    return v
+
+
+def _subject_names(conn, tutor_ids: List[int]) -> Dict[int, List[str]]:
+    out = defaultdict(list)
+    for i in range(0, len(tutor_ids), _CHUNK):
+        q = select(_TS.c.tutor_id, _SUBJ.c.name).join(_SUBJ, _SUBJ.c.id == _TS.c.subject_id) \
+            .where(_TS.c.tutor_id.in_(tutor_ids[i:i + _CHUNK])).order_by(_TS.c.id)
+        for tid, name in conn.execute(q):
+            out[tid].append(name)
+    return out
+
+
+def partitions(kind: str, updated_since: Optional[datetime] = None) -> Iterator[List[dict]]:
+    """The rows of one export as lists of up to PARTITION records, in id order."""
+    table, columns, changed = EXPORTS[kind]
+    if updated_since is not None and updated_since.tzinfo is not None:
+        updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)  # stored as naive UTC
+    window = window_rows()
+    last_id = 0
+    while True:
+        q = select(*columns).where(table.c.id > last_id)
+        if updated_since is not None:
+            q = q.where(changed >= updated_since)
+        q = q.order_by(table.c.id).limit(window)
+        seen = 0
+        with ExitStack() as stack:
+            conn = stack.enter_context(read_engine.connect())
+            names_conn = stack.enter_context(read_engine.connect()) if kind == "tutors" else None
+            result = conn.execution_options(yield_per=PARTITION).execute(q)
+            for rows in result.partitions():
+                records = [{c.name: _value(v) for c, v in zip(columns, row)} for row in rows]
+                if names_conn is not None:
+                    names = _subject_names(names_conn, [r["id"] for r in records])
+                    for r in records:
+                        r["subjects"] = names.get(r["id"], [])
+                seen += len(rows)
+                last_id = records[-1]["id"]
+                yield records
+        if seen < window:
+            return
+
+
+def ndjson(kind: str, updated_since: Optional[datetime] = None, gzip: bool = False) -> Iterator[bytes]:
+    """Encoded response body: one JSON object per line, optionally as a gzip stream."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if gzip else None
+    for records in partitions(kind, updated_since):
+        chunk = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode("utf-8")
+        if compressor is None:
+            yield chunk
+        else:
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+    if compressor is not None:
+        yield compressor.flush()
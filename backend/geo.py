@@ -0,0 +1,97 @@
+from math import cos, radians
+from typing import List, Optional, Tuple
+
+# Geohash cells used to prune tutor candidates before computing exact distances.
+# A tutor's full-precision hash is stored in Tutor.geohash; every shorter prefix of it
+# is the cell containing the tutor at that precision, so a cell lookup is an index range scan.
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LON = 111.320
+
+
+def encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch = (ch << 1) | 1
+                lon_lo = mid
+            else:
+                ch = ch << 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch = ch << 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def encode_or_none(lat: Optional[float], lon: Optional[float]) -> Optional[str]:
+    if lat is None or lon is None:
+        return None
+    return encode(lat, lon)
+
+
+def cell_size_deg(precision: int) -> Tuple[float, float]:
+    """Return the (lat, lon) extent in degrees of a geohash cell at the given precision."""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def precision_for_radius(lat: float, radius_km: float) -> int:
+    """
+    Pick the finest precision whose cells are at least radius_km on each side, so the
+    cell containing the origin plus its 8 neighbours always covers the search circle.
+    Returns 0 when the radius is too large for any cell to help.
+    """
+    lon_scale = max(cos(radians(lat)), 1e-6)
+    best = 0
+    for p in range(1, GEOHASH_PRECISION + 1):
+        dlat, dlon = cell_size_deg(p)
+        if dlat * KM_PER_DEG_LAT >= radius_km and dlon * KM_PER_DEG_LON * lon_scale >= radius_km:
+            best = p
+        else:
+            break
+    return best
+
+
+def covering_cells(lat: float, lon: float, radius_km: float) -> List[str]:
+    """Return the geohash prefixes whose union covers the circle around (lat, lon)."""
+    p = precision_for_radius(lat, radius_km)
+    if p == 0:
+        return []
+    dlat, dlon = cell_size_deg(p)
+    cells = set()
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            clat = min(max(lat + i * dlat, -90.0), 90.0)
+            clon = lon + j * dlon
+            if clon >= 180.0:
+                clon -= 360.0
+            elif clon < -180.0:
+                clon += 360.0
+            cells.add(encode(clat, clon, p))
+    return sorted(cells)
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every geohash starting with prefix (for range scans)."""
+    return prefix + "~"
@@ -1,10 +1,20 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
-from pydantic import BaseModel, EmailStr, validator
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, conint, validator
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+import anyio.to_thread
 from sqlalchemy.orm import Session
-from . import models, crud, ai
-from .database import engine, get_db, Base
+from . import models, crud, acrud, ai, catalog, pagination, querycount, migrations, ratings, reccache, explaincache, precompute, bulkimport, export, metrics
+from .database import engine, read_engine, async_read_engine, get_db, get_read_db, get_read_session, Base, SessionLocal
+from .textsearch import text_search
+from .autocomplete import autocomplete
 import os
+import io
+import json
+import tempfile
+from datetime import datetime
+from typing import Optional
 
 # Load environment variables from backend/.env if present (supports secrets locally)
 try:
@@ -17,53 +27,143 @@ except Exception:
     pass
 
 Base.metadata.create_all(bind=engine)
+# bring databases created by older versions up to the current columns and indexes
+migrations.upgrade(engine)
+
+with SessionLocal() as _db:
+    text_search.init(_db)
+    autocomplete.rebuild(_db)
+    if catalog.enabled():
+        catalog.catalog.rebuild(_db)
 
 app = FastAPI(title="Tutor Finder API")
 
 
+@app.on_event("startup")
+async def start_explanation_worker():
+    precompute.worker.start()
+
+
+@app.on_event("shutdown")
+async def close_ai_client():
+    await precompute.worker.stop()
+    await ai.provider.aclose()
+    if async_read_engine is not None:
+        await async_read_engine.dispose()  # its driver threads would keep the process alive
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# every engine the routes use; events of the async engine fire on its sync core
+_engines = [engine] if read_engine is engine else [engine, read_engine]
+if async_read_engine is not None:
+    _engines.append(async_read_engine.sync_engine)
+for _engine in _engines:
+    querycount.install(_engine)
+
+
+app.add_middleware(querycount.QueryBudgetMiddleware)
+
+
+# outermost, so the timings include the other middleware and streamed bodies up to their last chunk
+app.add_middleware(metrics.MetricsMiddleware)
+for _engine in _engines:
+    metrics.install(_engine)
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 class ChatMessage(BaseModel):
     student_id: int
     message: str
     use_ai: bool = True  # you can toggle this from the frontend if you want
 
 
+LATEST_REVIEWS = 5  # reviews embedded in /api/tutors/{id}
+
+
+def _decode_cursor(cursor, order):
+    try:
+        return pagination.decode_cursor(cursor, order)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _id_page(response: Response, rows, limit: Optional[int], order: str):
+    # one extra row was fetched to learn whether another page exists; its cursor goes in a header
+    page, next_cursor = pagination.split_page(rows, limit, order, lambda r: (r.id,))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
+
+
 @app.get("/api/subjects")
-def list_subjects(db: Session = Depends(get_db)):
-    subs = db.query(models.Subject).all()
+async def list_subjects(response: Response, limit: int = Query(None, ge=1, le=pagination.MAX_LIMIT),
+                        cursor: str = Query(None), db=Depends(get_read_session)):
+    after = _decode_cursor(cursor, "subjects")
+    limit = pagination.page_size(limit, cursor)
+    subs = await acrud.list_subjects(db, limit=pagination.fetch_size(limit), after_id=after[0] if after else None)
+    subs = _id_page(response, subs, limit, "subjects")
     return [{"id": s.id, "name": s.name} for s in subs]
 
 
 @app.get("/api/students")
-def list_students(db: Session = Depends(get_db)):
-    students = db.query(models.Student).all()
+async def list_students(response: Response, limit: int = Query(None, ge=1, le=pagination.MAX_LIMIT),
+                        cursor: str = Query(None), db=Depends(get_read_session)):
+    after = _decode_cursor(cursor, "students")
+    limit = pagination.page_size(limit, cursor)
+    students = await acrud.list_students(db, limit=pagination.fetch_size(limit), after_id=after[0] if after else None)
+    students = _id_page(response, students, limit, "students")
     return [{"id": s.id, "name": s.name, "email": s.email, "city": s.city, "preferred_subjects": s.preferred_subjects, "max_hourly_rate": s.max_hourly_rate} for s in students]
 
 
 @app.get("/api/cities")
-def list_cities(db: Session = Depends(get_db)):
-    # distinct cities from tutors
-    q = db.query(models.Tutor.city).distinct().all()
-    cities = [c[0] for c in q if c[0]]
-    return cities
+def list_cities():
+    # distinct tutor cities, served from the in-memory autocomplete index
+    return autocomplete.city_names()
+
+
+@app.get("/api/autocomplete")
+def autocomplete_lookup(field: str = Query(..., regex="^(subject|city)$"), prefix: str = Query(""),
+                        limit: int = Query(10, ge=1, le=50)):
+    return autocomplete.lookup(field, prefix, limit)
 
 
 @app.get("/api/tutors/search")
-def tutor_search(subject: str = Query(None), city: str = Query(None), max_hourly_rate: float = Query(None),
-                 min_rating: float = Query(None), teaching_mode: str = Query(None), student_id: int = Query(None),
-                 sort_by: str = Query(None), db: Session = Depends(get_db)):
-    student = None
-    if student_id:
-        student = crud.get_student(db, student_id)
-    results = crud.search_tutors(db, subject_name=subject, city=city, max_hourly_rate=max_hourly_rate,
-                                 min_rating=min_rating, teaching_mode=teaching_mode, student=student, sort_by=sort_by)
+async def tutor_search(response: Response, subject: str = Query(None), city: str = Query(None), max_hourly_rate: float = Query(None),
+                       min_rating: float = Query(None), teaching_mode: str = Query(None), student_id: int = Query(None),
+                       sort_by: str = Query(None), lat: float = Query(None), lon: float = Query(None),
+                       radius_km: float = Query(None, gt=0),
+                       limit: int = Query(None, ge=1, le=pagination.MAX_LIMIT), cursor: str = Query(None),
+                       db=Depends(get_read_session)):
+    # student_id is still accepted from older clients; students have no location to search around
+    origin = crud.resolve_origin(lat, lon)
+    if radius_km is not None and origin is None:
+        raise HTTPException(status_code=400, detail="radius_km needs lat and lon")
+    order = f"tutors:{sort_by or 'default'}"
+    after = _decode_cursor(cursor, order)
+    limit = pagination.page_size(limit, cursor)
+    try:
+        results = await acrud.search_tutors(db, subject_name=subject, city=city, max_hourly_rate=max_hourly_rate,
+                                            min_rating=min_rating, teaching_mode=teaching_mode,
+                                            sort_by=sort_by, lat=lat, lon=lon, radius_km=radius_km, limit=pagination.fetch_size(limit),
+                                            after=after)
+    except pagination.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results, next_cursor = pagination.split_page(
+        results, limit, order, lambda r: pagination.tutor_search_key(sort_by, r[0], r[1], origin is not None))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     out = []
     for t, dist in results:
         out.append({
@@ -80,9 +180,29 @@ def tutor_search(subject: str = Query(None), city: str = Query(None), max_hourly
     return out
 
 
+@app.get("/api/tutors/text-search")
+async def tutor_text_search(q: str = Query(..., min_length=1), subject: str = Query(None), city: str = Query(None),
+                            max_hourly_rate: float = Query(None), min_rating: float = Query(None),
+                            teaching_mode: str = Query(None), limit: int = Query(20, ge=1, le=pagination.MAX_LIMIT),
+                            db=Depends(get_read_session)):
+    results = await acrud.text_search_tutors(db, q, subject_name=subject, city=city, max_hourly_rate=max_hourly_rate,
+                                             min_rating=min_rating, teaching_mode=teaching_mode, limit=limit)
+    return [{
+        "id": t.id,
+        "name": t.name,
+        "city": t.city,
+        "hourly_rate": t.hourly_rate,
+        "teaching_mode": t.teaching_mode.value if t.teaching_mode else None,
+        "overall_rating": t.overall_rating,
+        "number_of_reviews": t.number_of_reviews,
+        "subjects": [s.name for s in t.subjects],
+        "score": round(score, 4),
+    } for t, score in results]
+
+
 @app.get("/api/tutors/{tutor_id}")
-def tutor_details(tutor_id: int, db: Session = Depends(get_db)):
-    t = crud.get_tutor(db, tutor_id)
+async def tutor_details(tutor_id: int, db=Depends(get_read_session)):
+    t = await acrud.get_tutor(db, tutor_id, with_relations=True)
     if not t:
         raise HTTPException(status_code=404, detail="Tutor not found")
     return {
@@ -98,47 +218,182 @@ def tutor_details(tutor_id: int, db: Session = Depends(get_db)):
         "overall_rating": t.overall_rating,
         "number_of_reviews": t.number_of_reviews,
         "subjects": [s.name for s in t.subjects],
-        "reviews": [{"rating": r.rating, "comment": r.comment, "created_at": r.created_at.isoformat()} for r in t.reviews]
+        # maintained aggregates plus the newest few reviews; older ones via /api/tutors/{id}/reviews
+        "review_summary": {
+            "count": t.number_of_reviews,
+            "average": t.overall_rating,
+            "histogram": crud.review_histogram(t),
+        },
+        "reviews": [_review_out(r) for r in await acrud.latest_reviews(db, t.id, LATEST_REVIEWS)],
     }
 
 
+@app.get("/api/tutors/{tutor_id}/reviews")
+async def tutor_reviews(tutor_id: int, response: Response,
+                        limit: int = Query(20, ge=1, le=pagination.MAX_LIMIT), cursor: str = Query(None),
+                        db=Depends(get_read_session)):
+    after = _decode_cursor(cursor, "reviews")
+    if after is not None:
+        try:
+            after = (datetime.fromisoformat(after[0]), int(after[1]))
+        except (TypeError, ValueError, IndexError):
+            raise HTTPException(status_code=400, detail="malformed cursor")
+    if not await acrud.get_tutor(db, tutor_id):
+        raise HTTPException(status_code=404, detail="Tutor not found")
+    rows = await acrud.latest_reviews(db, tutor_id, pagination.fetch_size(limit), before=after)
+    page, next_cursor = pagination.split_page(rows, limit, "reviews", lambda r: (r.created_at.isoformat(), r.id))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [_review_out(r) for r in page]
+
+
+def _review_out(r):
+    return {"id": r.id, "rating": r.rating, "comment": r.comment, "created_at": r.created_at.isoformat()}
+
+
 @app.get("/api/tutors/{tutor_id}/similar")
-def similar_tutors(tutor_id: int, db: Session = Depends(get_db)):
-    sims = crud.get_similar_tutors(db, tutor_id)
+async def similar_tutors(tutor_id: int, db=Depends(get_read_session)):
+    sims = await acrud.get_similar_tutors(db, tutor_id)
     return [{"id": t.id, "name": t.name, "hourly_rate": t.hourly_rate, "overall_rating": t.overall_rating, "number_of_reviews": t.number_of_reviews, "subjects": [s.name for s in t.subjects]} for t in sims]
 
-@app.post("/api/chat")
-def chat_with_recommender(payload: ChatMessage, db: Session = Depends(get_db)):
-    student = crud.get_student(db, payload.student_id)
+@app.get("/api/admin/catalog")
+def catalog_stats(verify: bool = Query(False), db: Session = Depends(get_read_db)):
+    out = catalog.catalog.stats()
+    if verify and catalog.catalog.ready:
+        out["consistency"] = catalog.catalog.verify(db)
+    return out
+
+
+@app.post("/api/admin/catalog/rebuild")
+def catalog_rebuild(db: Session = Depends(get_db)):
+    if not catalog.enabled():
+        raise HTTPException(status_code=400, detail="Tutor catalog is disabled (set TUTOR_CATALOG=1)")
+    catalog.catalog.rebuild(db)
+    return catalog.catalog.stats()
+
+
+@app.get("/api/admin/recommendation-cache")
+def recommendation_cache_stats():
+    return reccache.cache.stats()
+
+
+@app.get("/api/admin/explanation-cache")
+def explanation_cache_stats():
+    return explaincache.cache.stats()
+
+
+@app.get("/api/admin/ai-providers")
+async def ai_provider_stats():
+    # the threadpool runs the blocking DB work of async routes such as /api/chat
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    threadpool = {"limit": limiter.total_tokens, "in_use": limiter.borrowed_tokens}
+    return {**ai.provider_stats(), "threadpool": threadpool}
+
+
+@app.get("/api/admin/explanation-jobs")
+def explanation_job_stats():
+    return precompute.worker.stats()
+
+
+@app.get("/api/admin/ratings")
+def ratings_check(db: Session = Depends(get_read_db)):
+    return ratings.reconcile(db, repair=False)
+
+
+@app.post("/api/admin/ratings/reconcile")
+def ratings_reconcile(db: Session = Depends(get_db)):
+    return ratings.reconcile(db, repair=True)
+
+
+@app.get("/api/export/{kind}")
+def export_rows(kind: str, request: Request, updated_since: datetime = Query(None)):
+    """All tutors, students or reviews as NDJSON (one object per line), streamed in id order."""
+    if kind not in export.EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export {kind!r}; expected one of {', '.join(export.EXPORTS)}")
+    gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {"Vary": "Accept-Encoding", "Content-Disposition": f'attachment; filename="{kind}.ndjson"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    # a sync iterator: Starlette pulls each chunk in the threadpool, so the event loop stays free
+    return StreamingResponse(export.ndjson(kind, updated_since, gzip), media_type="application/x-ndjson", headers=headers)
+
+
+async def _chat_context(db, student_id: int):
+    # acrud loads the student's subjects, which the explanation builders read
+    student = await acrud.get_student(db, student_id)
     if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
+        return None, []
+    with metrics.span("recommend"):
+        tutors = await acrud.recommend_for_student(db, student.id)
+    # hand the pooled connection back before awaiting the model
+    await acrud.close(db)
+    return student, tutors
+
 
+@app.post("/api/chat")
+async def chat_with_recommender(payload: ChatMessage, db=Depends(get_read_session)):
     # 1) Get tutors via your existing recommender
-    tutors = crud.recommend_for_student(db, student.id)
+    student, tutors = await _chat_context(db, payload.student_id)
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
 
-    # 2) Build explanations for CARDS (not for chat reply)
-    explanations = ai.explain_recommendations(student, tutors)
-    tutor_payloads = []
-    for t, ex in zip(tutors, explanations):
-        tutor_payloads.append({
-            "id": t.id,
-            "name": t.name,
-            "city": t.city,
-            "hourly_rate": t.hourly_rate,
-            "overall_rating": t.overall_rating,
-            "number_of_reviews": t.number_of_reviews,
-            "subjects": [s.name for s in t.subjects],
-            "explanation": ex,  # for UI cards, not chat bubbles
-        })
+    # 2) Build explanations for CARDS (not for chat reply); model calls are awaited, not blocking a worker
+    explanations = await ai.explain_recommendations(student, tutors)
+    tutor_payloads = [_chat_card(t, ex) for t, ex in zip(tutors, explanations)]
 
     # 3) ALWAYS generate a chat reply (no model, no None)
-    reply = ai.generate_chat_reply(student, payload.message, tutors)
+    reply = generate_chat_reply(student, payload.message, tutors)
 
     return {
         "reply": reply,      # <- this is what ChatBox should show as the main bot message
         "tutors": tutor_payloads,
     }
 
+
+def _chat_card(t, explanation: str) -> dict:
+    return {
+        "id": t.id,
+        "name": t.name,
+        "city": t.city,
+        "hourly_rate": t.hourly_rate,
+        "overall_rating": t.overall_rating,
+        "number_of_reviews": t.number_of_reviews,
+        "subjects": [s.name for s in t.subjects],
+        "explanation": explanation,  # for UI cards, not chat bubbles
+    }
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_with_recommender_stream(payload: ChatMessage, db=Depends(get_read_session)):
+    """
+    Server-Sent Events variant of /api/chat. The first "message" event carries the reply and the
+    cards with deterministic explanations as soon as the recommender has run; an "explanation"
+    event ({tutor_id, explanation}) follows for each model-written explanation as it arrives, and
+    a final "done" event closes the stream.
+    """
+    student, tutors = await _chat_context(db, payload.student_id)
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    async def events():
+        yield _sse("message", {
+            "reply": generate_chat_reply(student, payload.message, tutors),
+            "tutors": [_chat_card(t, ai._deterministic_explanation(student, t)) for t in tutors],
+        })
+        upgraded = 0
+        async for tutor_id, explanation in ai.stream_explanations(student, tutors):
+            upgraded += 1
+            yield _sse("explanation", {"tutor_id": tutor_id, "explanation": explanation})
+        yield _sse("done", {"tutors": len(tutors), "ai_explanations": upgraded})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 def generate_chat_reply(student, message: str, tutors: list) -> str:
     """
     Simple, deterministic chat reply.
@@ -170,16 +425,17 @@ def generate_chat_reply(student, message: str, tutors: list) -> str:
     )
 
 @app.get("/api/students/{student_id}/recommendations")
-def student_recommendations(student_id: int, db: Session = Depends(get_db)):
-    student = crud.get_student(db, student_id)
+async def student_recommendations(student_id: int, db=Depends(get_read_session)):
+    student = await acrud.get_student(db, student_id)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    recs = crud.recommend_for_student(db, student_id)
+    recs = await acrud.recommend_for_student(db, student_id)
 
     out = []
-    for t in recs:
-        explanation = ai._deterministic_explanation(student, t)
+    # explanations precomputed by the background worker (a cache file lookup), deterministic text for the rest
+    explanations = await run_in_threadpool(ai.ready_explanations, student, recs)
+    for t, explanation in zip(recs, explanations):
         out.append({
             "id": t.id,
             "name": t.name,
@@ -236,6 +492,12 @@ class TutorUpdate(BaseModel):
         return v
 
 
+class ReviewCreate(BaseModel):
+    student_id: int
+    rating: conint(ge=1, le=5)
+    comment: str | None = None
+
+
 class StudentCreate(BaseModel):
     name: str
     email: EmailStr
@@ -260,6 +522,25 @@ def add_tutor(t: TutorCreate, db: Session = Depends(get_db)):
     return {"id": tutor.id, "name": tutor.name, "email": tutor.email, "hourly_rate": tutor.hourly_rate, "subjects": [s.name for s in tutor.subjects]}
 
 
+@app.post("/api/tutors/import")
+async def import_tutors(request: Request, format: str = Query(None, regex="^(csv|jsonl)$"),
+                        batch_size: int = Query(bulkimport.BATCH_SIZE, ge=1, le=50000), db: Session = Depends(get_db)):
+    """
+    Bulk-create tutors from a CSV or JSONL request body (format from ?format= or Content-Type).
+    Invalid rows are listed in the response by line number; the others are imported.
+    """
+    fmt = format or bulkimport.format_for(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=csv|jsonl")
+    # spool the upload (to disk past 8 MB) so the import reads it line by line at its own pace
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        lines = io.TextIOWrapper(spool, encoding="utf-8-sig", errors="replace", newline="")
+        return await run_in_threadpool(bulkimport.import_tutors, db, lines, fmt, batch_size)
+
+
 @app.put("/api/tutors/{tutor_id}")
 def put_tutor(tutor_id: int, updates: TutorUpdate, db: Session = Depends(get_db)):
     u = crud.update_tutor(db, tutor_id, updates.dict(exclude_unset=True))
@@ -276,6 +557,26 @@ def del_tutor(tutor_id: int, db: Session = Depends(get_db)):
     return {"deleted": True}
 
 
+@app.post("/api/tutors/{tutor_id}/reviews", status_code=201)
+def add_review(tutor_id: int, review: ReviewCreate, db: Session = Depends(get_db)):
+    if not crud.get_student(db, review.student_id):
+        raise HTTPException(status_code=404, detail="Student not found")
+    r = crud.create_review(db, tutor_id, **review.dict())
+    if not r:
+        raise HTTPException(status_code=404, detail="Tutor not found")
+    t = r.tutor
+    return {
+        "id": r.id,
+        "tutor_id": r.tutor_id,
+        "student_id": r.student_id,
+        "rating": r.rating,
+        "comment": r.comment,
+        "created_at": r.created_at.isoformat(),
+        "overall_rating": t.overall_rating,
+        "number_of_reviews": t.number_of_reviews,
+    }
+
+
 @app.post("/api/students", status_code=201)
 def add_student(s: StudentCreate, db: Session = Depends(get_db)):
     stu = crud.create_student(db, **s.dict())
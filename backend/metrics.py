@@ -0,0 +1,257 @@
+import logging
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Prometheus metrics, served in the text exposition format at GET /metrics.
+#
+# MetricsMiddleware times every request under its route template (/api/tutors/{tutor_id}, not the
+# raw path). The SQL hooks from install() add each statement's count and time to the request that
+# issued it, through a context variable that follows the request into the threadpool. span() times
+# a named step, such as an AI provider call or the recommender, within the current request.
+#
+# METRICS_ENABLED=0 turns all of it off. METRICS_SLOW_REQUEST_MS=<n> logs requests slower than n ms
+# with their SQL statements and spans. Only a METRICS_SLOW_REQUEST_SAMPLE fraction of requests
+# (default 1.0) keeps its statements, so the log can stay on under load.
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)  # statements per request
+BACKGROUND = "background"  # route label for work outside a request (startup, the explanation worker)
+UNMATCHED = "unmatched"  # route label for requests no route matched
+_MAX_LOGGED_STATEMENTS = 200
+
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+
+
+def slow_request_ms() -> Optional[float]:
+    raw = os.getenv("METRICS_SLOW_REQUEST_MS")
+    return float(raw) if raw else None
+
+
+def slow_request_sample() -> float:
+    return float(os.getenv("METRICS_SLOW_REQUEST_SAMPLE", "1.0"))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(v: float) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1):
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with _lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labels, k)} {_number(v)}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # label values -> [count per bucket..., count above, sum]
+
+    def observe(self, labels: tuple, value: float):
+        i = bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with _lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for k, counts in series:
+            total = 0
+            for le, n in zip(self.buckets + ("+Inf",), counts):
+                total += n
+                bound = 'le="%s"' % le
+                lines.append(f"{self.name}_bucket{_labels(self.labels, k, bound)} {total}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, k)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, k)} {total}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time from request to the last byte of the response.",
+                            ("method", "route"))
+REQUEST_QUERIES = Histogram("http_request_sql_queries", "SQL statements issued per request.", ("method", "route"),
+                            QUERY_BUCKETS)
+SQL_QUERIES = Counter("sql_queries_total", "SQL statements executed, by the route that issued them.", ("method", "route"))
+SQL_SECONDS = Counter("sql_query_seconds_total", "Time spent executing SQL statements, by route.", ("method", "route"))
+SPAN_SECONDS = Histogram("span_duration_seconds", "Duration of named steps (AI calls, the recommender) by route.",
+                         ("method", "route", "span"))
+
+REGISTRY = [REQUESTS, REQUEST_SECONDS, REQUEST_QUERIES, SQL_QUERIES, SQL_SECONDS, SPAN_SECONDS]
+
+
+_routes: Dict[object, str] = {}  # endpoint function -> route path template
+
+
+def _route_path(scope) -> str:
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED
+    path = _routes.get(endpoint)
+    if path is None:
+        app = scope.get("app")
+        path = next((r.path for r in getattr(app, "routes", ()) if getattr(r, "endpoint", None) is endpoint),
+                    getattr(endpoint, "__name__", UNMATCHED))
+        _routes[endpoint] = path
+    return path
+
+
+class RequestStats:
+    """What one request spent: SQL statements and time, plus the statements themselves when sampled."""
+
+    __slots__ = ("scope", "queries", "sql_seconds", "statements", "spans")
+
+    def __init__(self, scope, keep_statements: bool):
+        self.scope = scope
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements: Optional[List[Tuple[str, float]]] = [] if keep_statements else None
+        self.spans: List[Tuple[str, float]] = []
+
+    def labels(self) -> Tuple[str, str]:
+        # resolved lazily: the router only sets the endpoint once the request reaches it
+        return self.scope.get("method", ""), _route_path(self.scope)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_metrics", default=None)
+
+
+def install(engine):
+    if not enabled():
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info["metrics_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("metrics_started", None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        stats = _current.get()
+        if stats is None:
+            SQL_QUERIES.inc(("", BACKGROUND))
+            SQL_SECONDS.inc(("", BACKGROUND), seconds)
+            return
+        stats.queries += 1
+        stats.sql_seconds += seconds
+        if stats.statements is not None and len(stats.statements) < _MAX_LOGGED_STATEMENTS:
+            stats.statements.append((statement, seconds))
+
+
+@contextmanager
+def span(name: str):
+    """Time a named step; recorded under the current request's route (or BACKGROUND)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        stats = _current.get()
+        if stats is None:
+            SPAN_SECONDS.observe(("", BACKGROUND, name), seconds)
+        else:
+            SPAN_SECONDS.observe(stats.labels() + (name,), seconds)
+            stats.spans.append((name, seconds))
+
+
+def _finish(stats: RequestStats, status: int, seconds: float):
+    labels = stats.labels()
+    REQUESTS.inc(labels + (str(status),))
+    REQUEST_SECONDS.observe(labels, seconds)
+    REQUEST_QUERIES.observe(labels, stats.queries)
+    if stats.queries:
+        SQL_QUERIES.inc(labels, stats.queries)
+        SQL_SECONDS.inc(labels, stats.sql_seconds)
+    if stats.statements is None:
+        return
+    threshold = slow_request_ms()
+    if threshold is None or seconds * 1000 < threshold:
+        return
+    spans = ", ".join(f"{name} {s * 1000:.1f} ms" for name, s in stats.spans) or "none"
+    sql = "\n".join(f"  [{s * 1000:.1f} ms] {statement}" for statement, s in stats.statements)
+    if stats.queries > len(stats.statements):
+        sql += f"\n  ... {stats.queries - len(stats.statements)} more"
+    logger.warning("slow request %s %s (%s): %.1f ms, %d SQL statements in %.1f ms; spans: %s\n%s",
+                   labels[0], stats.scope.get("path"), labels[1], seconds * 1000, stats.queries,
+                   stats.sql_seconds * 1000, spans, sql)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the request metrics above; streamed responses count until their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+        keep = slow_request_ms() is not None and random.random() < slow_request_sample()
+        stats = RequestStats(scope, keep)
+        status = 500  # unless the app gets as far as starting a response
+
+        async def send_and_record(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            _current.reset(token)
+            _finish(stats, status, time.perf_counter() - started)
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
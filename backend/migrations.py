@@ -0,0 +1,282 @@
+# Versioned schema migrations.
+#
+# Base.metadata.create_all only creates missing tables, so databases created by an older
+# version of the app never receive new columns or indexes. Each migration below runs once,
+# in its own transaction, and is recorded in the schema_migrations table. Steps are written
+# to be idempotent so they also succeed on a fresh database where create_all already built
+# the current schema. Works on SQLite and on the Azure SQL DATABASE_URL.
+#
+# Migrations never go through models: a column added to a model later would otherwise show up in
+# the statements of every earlier migration (an onupdate default, an ORM load) and fail on the
+# databases those migrations exist for. Each step names the tables, columns and indexes it uses,
+# and copies the helpers whose output it stores, as they were at its version.
+#
+# Run manually with:  python -m backend.migrations [upgrade|status]
+import heapq
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, column, func, inspect, select, table, text
+
+from . import geo, models
+from .database import engine as default_engine
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _meta,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# ----- helpers -----
+
+def _has_column(conn, table: str, column: str) -> bool:
+    return column in [c["name"] for c in inspect(conn).get_columns(table)]
+
+
+def _add_column(conn, table: str, column: str, ddl: str):
+    if _has_column(conn, table, column):
+        return
+    # SQL Server's ALTER TABLE has no COLUMN keyword
+    keyword = "" if conn.dialect.name == "mssql" else "COLUMN "
+    conn.execute(text(f"ALTER TABLE {table} ADD {keyword}{column} {ddl}"))
+
+
+def _ensure_index(conn, table: str, name: str, *columns: str, unique: bool = False):
+    """Create the index if the database does not have it yet."""
+    if name in {ix["name"] for ix in inspect(conn).get_indexes(table)}:
+        return
+    conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(columns)})"))
+
+
+# the columns the data migrations read and write, as of the version that uses them
+_STARS = (1, 2, 3, 4, 5)
+_tutors = table("tutors", column("id"), column("city"), column("latitude"), column("longitude"), column("geohash"),
+                column("city_normalized"), column("overall_rating"), column("hourly_rate"),
+                *(column(f"stars_{r}") for r in _STARS))
+_tutor_subjects = table("tutor_subjects", column("tutor_id"), column("subject_id"))
+_similar_tutors = table("similar_tutors", column("tutor_id"), column("rank"), column("neighbor_id"), column("score"))
+_students = table("students", column("id"), column("preferred_subjects"))
+_subjects = table("subjects", column("id"), column("name"))
+_student_subjects = table("student_subjects", column("student_id"), column("subject_id"))
+_reviews = table("reviews", column("id"), column("tutor_id"), column("rating"))
+
+# the values the data migrations compute, as of the version that stores them
+_GEOHASH_PRECISION = 9  # geohash itself is a fixed encoding; its length is ours
+_FTS_TABLE = "tutor_fts"
+
+
+def _normalize_city(city):
+    # models.normalize_city at version 2
+    if city is None:
+        return None
+    city = " ".join(city.split()).lower()
+    return city or None
+
+
+def _split_subject_names(value):
+    # models.split_subject_names at version 5
+    names, seen = [], set()
+    for name in (value or "").split(","):
+        name = name.strip()
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+
+def _fts5_available(conn) -> bool:
+    # textsearch.fts5_available at version 4
+    if conn.dialect.name != "sqlite":
+        return False
+    try:
+        conn.execute(text("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)"))
+        conn.execute(text("DROP TABLE temp._fts5_probe"))
+        return True
+    except Exception:
+        return False
+
+
+# ----- migrations -----
+
+def _m001_tutor_geohash(conn):
+    _add_column(conn, "tutors", "geohash", "VARCHAR(12)")
+    _ensure_index(conn, "tutors", "ix_tutors_geohash", "geohash")
+    t = _tutors
+    rows = conn.execute(select(t.c.id, t.c.latitude, t.c.longitude)
+                        .where(t.c.geohash.is_(None), t.c.latitude.isnot(None), t.c.longitude.isnot(None))).all()
+    for tid, lat, lon in rows:
+        conn.execute(t.update().where(t.c.id == tid).values(geohash=geo.encode(lat, lon, _GEOHASH_PRECISION)))
+
+
+def _m002_search_indexes(conn):
+    _add_column(conn, "tutors", "city_normalized", "VARCHAR(120)")
+    t = _tutors
+    rows = conn.execute(select(t.c.id, t.c.city).where(t.c.city.isnot(None), t.c.city_normalized.is_(None))).all()
+    for tid, city in rows:
+        conn.execute(t.update().where(t.c.id == tid).values(city_normalized=_normalize_city(city)))
+    _ensure_index(conn, "tutors", "ix_tutors_city_norm_rate", "city_normalized", "hourly_rate")
+    _ensure_index(conn, "tutors", "ix_tutors_rating_rate", "overall_rating", "hourly_rate")
+    _ensure_index(conn, "tutors", "ix_tutors_rate", "hourly_rate")
+    _ensure_index(conn, "tutors", "ix_tutors_mode_rate", "teaching_mode", "hourly_rate")
+
+
+def _m003_unique_tutor_subjects(conn):
+    # drop duplicate (tutor_id, subject_id) rows before the unique index can be built
+    conn.execute(text(
+        "DELETE FROM tutor_subjects WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM tutor_subjects GROUP BY tutor_id, subject_id) AS k)"
+    ))
+    _ensure_index(conn, "tutor_subjects", "uq_tutor_subjects_tutor_subject", "tutor_id", "subject_id", unique=True)
+    _ensure_index(conn, "tutor_subjects", "ix_tutor_subjects_subject_tutor", "subject_id", "tutor_id")
+
+
+def _m004_tutor_fulltext(conn):
+    # SQLite FTS5 index; other databases (and SQLite builds without FTS5) use textsearch's in-memory index
+    if not _fts5_available(conn):
+        return
+    conn.execute(text(f"CREATE VIRTUAL TABLE IF NOT EXISTS {_FTS_TABLE} USING fts5(name, bio, subjects)"))
+    conn.execute(text(f"DELETE FROM {_FTS_TABLE}"))
+    conn.execute(text(
+        f"INSERT INTO {_FTS_TABLE}(rowid, name, bio, subjects) "
+        "SELECT t.id, COALESCE(t.name, ''), COALESCE(t.bio, ''), COALESCE(("
+        "SELECT group_concat(s.name, ' ') FROM tutor_subjects ts JOIN subjects s ON s.id = ts.subject_id "
+        "WHERE ts.tutor_id = t.id), '') FROM tutors t"
+    ))
+
+
+def _m005_student_subjects(conn):
+    # create_all builds student_subjects; link each student's comma-separated preferences to subject ids
+    _ensure_index(conn, "student_subjects", "uq_student_subjects_student_subject", "student_id", "subject_id",
+                  unique=True)
+    _ensure_index(conn, "student_subjects", "ix_student_subjects_subject_student", "subject_id", "student_id")
+    ss, st, subj = _student_subjects, _students, _subjects
+    by_key = {}
+    for sid, name in conn.execute(select(subj.c.id, subj.c.name).order_by(subj.c.id)):
+        by_key.setdefault(name.lower(), sid)
+    linked = set(conn.execute(select(ss.c.student_id, ss.c.subject_id)).all())
+    rows = []
+    for student_id, prefs in conn.execute(select(st.c.id, st.c.preferred_subjects).where(st.c.preferred_subjects.isnot(None))):
+        for name in _split_subject_names(prefs):
+            sid = by_key.get(name.lower())
+            if sid is not None and (student_id, sid) not in linked:
+                linked.add((student_id, sid))
+                rows.append({"student_id": student_id, "subject_id": sid})
+    if rows:
+        conn.execute(ss.insert(), rows)
+
+
+def _m006_tutor_rating_sum(conn):
+    # seed the running sum from the stored aggregates; python -m backend.ratings repair re-derives them from reviews
+    _add_column(conn, "tutors", "rating_sum", "FLOAT")
+    conn.execute(text(
+        "UPDATE tutors SET rating_sum = COALESCE(overall_rating, 0) * COALESCE(number_of_reviews, 0) "
+        "WHERE rating_sum IS NULL"
+    ))
+
+
+def _m007_review_summary(conn):
+    for r in _STARS:
+        _add_column(conn, "tutors", f"stars_{r}", "INTEGER")
+        conn.execute(text(f"UPDATE tutors SET stars_{r} = 0 WHERE stars_{r} IS NULL"))
+    t, rv = _tutors, _reviews
+    rows = conn.execute(select(rv.c.tutor_id, rv.c.rating, func.count(rv.c.id))
+                        .where(rv.c.rating.in_(_STARS)).group_by(rv.c.tutor_id, rv.c.rating)).all()
+    for tid, rating, count in rows:
+        conn.execute(t.update().where(t.c.id == tid).values({f"stars_{rating}": count}))
+    _ensure_index(conn, "reviews", "ix_reviews_tutor_created", "tutor_id", "created_at", "id")
+
+
+def _m008_similar_tutors(conn):
+    # create_all builds the table; fill it for the tutors already in the database with the ranking
+    # as of this version (neighbors K=10, MIN_RATING=3.5): shared subjects desc, rating desc, hourly
+    # rate closeness asc, id asc. Later changes to neighbors must not change what this step writes.
+    _ensure_index(conn, "similar_tutors", "ix_similar_tutors_neighbor", "neighbor_id")
+    k, min_rating = 10, 3.5
+    t, ts, st = _tutors, _tutor_subjects, _similar_tutors
+    conn.execute(st.delete())
+    tutors = {tid: (rating or 0, rate or 0) for tid, rating, rate in
+              conn.execute(select(t.c.id, t.c.overall_rating, t.c.hourly_rate))}
+    subjects_of, by_subject = {}, {}
+    for tid, sid in conn.execute(select(ts.c.tutor_id, ts.c.subject_id)):
+        if tid not in tutors:
+            continue
+        subjects_of.setdefault(tid, set()).add(sid)
+        if tutors[tid][0] >= min_rating:
+            by_subject.setdefault(sid, set()).add(tid)
+    rows = []
+    for tid, subs in subjects_of.items():
+        shared = {}
+        for sid in subs:
+            for n in by_subject.get(sid, ()):
+                if n != tid:
+                    shared[n] = shared.get(n, 0) + 1
+        base_rate = tutors[tid][1]
+        ranked = heapq.nsmallest(k, shared, key=lambda n: (-shared[n], -tutors[n][0], abs(tutors[n][1] - base_rate), n))
+        rows.extend({"tutor_id": tid, "rank": rank, "neighbor_id": n, "score": float(shared[n])}
+                    for rank, n in enumerate(ranked, start=1))
+    if rows:
+        conn.execute(st.insert(), rows)
+
+
+def _m009_updated_at(conn):
+    for table in ("tutors", "students"):
+        _add_column(conn, table, "updated_at", "DATETIME")
+        conn.execute(text(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL"))
+    _ensure_index(conn, "tutors", "ix_tutors_updated", "updated_at", "id")
+    _ensure_index(conn, "students", "ix_students_updated", "updated_at", "id")
+    _ensure_index(conn, "reviews", "ix_reviews_created", "created_at", "id")
+
+
+MIGRATIONS = [
+    (1, "tutor geohash cell column", _m001_tutor_geohash),
+    (2, "normalized city column and search filter indexes", _m002_search_indexes),
+    (3, "unique (tutor_id, subject_id) on tutor_subjects", _m003_unique_tutor_subjects),
+    (4, "tutor full-text index", _m004_tutor_fulltext),
+    (5, "student_subjects association backfilled from preferred_subjects", _m005_student_subjects),
+    (6, "tutor rating_sum running aggregate", _m006_tutor_rating_sum),
+    (7, "tutor star histogram and (tutor_id, created_at, id) review index", _m007_review_summary),
+    (8, "materialized similar_tutors neighbour table", _m008_similar_tutors),
+    (9, "updated_at on tutors and students, indexes for incremental exports", _m009_updated_at),
+]
+
+
+def applied_versions(bind=None) -> set:
+    bind = bind or default_engine
+    _meta.create_all(bind=bind)
+    with bind.connect() as conn:
+        return {v for (v,) in conn.execute(select(schema_migrations.c.version))}
+
+
+def upgrade(bind=None) -> list:
+    """Apply pending migrations in order; returns the versions that were applied."""
+    bind = bind or default_engine
+    done = applied_versions(bind)
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        with bind.begin() as conn:
+            step(conn)
+            conn.execute(schema_migrations.insert().values(version=version, name=name, applied_at=datetime.utcnow()))
+        applied.append(version)
+    return applied
+
+
+def status(bind=None) -> list:
+    done = applied_versions(bind)
+    return [(version, name, version in done) for version, name, _ in MIGRATIONS]
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if cmd == "status":
+        for version, name, is_applied in status():
+            print(f"{version:04d} {'applied' if is_applied else 'pending'}  {name}")
+    elif cmd == "upgrade":
+        models.Base.metadata.create_all(bind=default_engine)
+        print("Applied:", upgrade() or "nothing to do")
+    else:
+        sys.exit(f"unknown command {cmd!r} (expected upgrade or status)")
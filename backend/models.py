@@ -1,9 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 import enum
-from typing import Optional
+from typing import List, Optional
 
 
 class TeachingModeEnum(str, enum.Enum):
@@ -12,6 +12,28 @@ class TeachingModeEnum(str, enum.Enum):
     hybrid = "hybrid"
 
 
+def normalize_city(city: Optional[str]) -> Optional[str]:
+    # lower-cased, trimmed copy of a city name used for indexed equality/prefix lookups
+    if city is None:
+        return None
+    city = " ".join(city.split()).lower()
+    return city or None
+
+
+STAR_RATINGS = (1, 2, 3, 4, 5)
+
+
+def split_subject_names(value: Optional[str]) -> List[str]:
+    # Student.preferred_subjects as entered: comma-separated, de-duplicated case-insensitively
+    names, seen = [], set()
+    for name in (value or "").split(","):
+        name = name.strip()
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+
 class Student(Base):
     __tablename__ = "students"
     id = Column(Integer, primary_key=True, index=True)
@@ -19,9 +41,16 @@ class Student(Base):
     email = Column(String, nullable=False, unique=True)
     city = Column(String, nullable=True)
     address = Column(String, nullable=True)
-    preferred_subjects = Column(String, nullable=True)  # comma-separated subject names or ids
+    preferred_subjects = Column(String, nullable=True)  # comma-separated subject names, as entered
     max_hourly_rate = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # incremental exports
+    # the known subjects among preferred_subjects, kept in sync by crud; used for matching
+    subjects = relationship("Subject", secondary="student_subjects", order_by="StudentSubject.id")
+
+    __table_args__ = (
+        Index("ix_students_updated", "updated_at", "id"),
+    )
 
 
 class Tutor(Base):
@@ -31,18 +60,37 @@ class Tutor(Base):
     email = Column(String, nullable=False)
     phone = Column(String, nullable=True)
     city = Column(String, nullable=True)
+    city_normalized = Column(String(120), nullable=True)  # normalize_city(city), kept in sync by crud
     address = Column(String, nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True, index=True)  # kept in sync with latitude/longitude by crud
     hourly_rate = Column(Float, nullable=False, default=0.0)
     teaching_mode = Column(Enum(TeachingModeEnum), default=TeachingModeEnum.online)
     bio = Column(Text, nullable=True)
-    overall_rating = Column(Float, default=0.0)
+    overall_rating = Column(Float, default=0.0)  # rating_sum / number_of_reviews
     number_of_reviews = Column(Integer, default=0)
+    rating_sum = Column(Float, default=0.0)  # running sum of review ratings, maintained by crud
+    # number of reviews per star rating, maintained by crud with rating_sum
+    stars_1 = Column(Integer, default=0)
+    stars_2 = Column(Integer, default=0)
+    stars_3 = Column(Integer, default=0)
+    stars_4 = Column(Integer, default=0)
+    stars_5 = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
-    subjects = relationship("Subject", secondary="tutor_subjects", back_populates="tutors")
+    # bumped by every UPDATE of the row (rating aggregates included); crud bumps it for subject changes
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    subjects = relationship("Subject", secondary="tutor_subjects", back_populates="tutors", order_by="TutorSubject.id")
     reviews = relationship("Review", back_populates="tutor")
 
+    __table_args__ = (
+        Index("ix_tutors_city_norm_rate", "city_normalized", "hourly_rate"),
+        Index("ix_tutors_rating_rate", "overall_rating", "hourly_rate"),
+        Index("ix_tutors_rate", "hourly_rate"),
+        Index("ix_tutors_mode_rate", "teaching_mode", "hourly_rate"),
+        Index("ix_tutors_updated", "updated_at", "id"),
+    )
+
 
 class Subject(Base):
     __tablename__ = "subjects"
@@ -57,6 +105,36 @@ class TutorSubject(Base):
     tutor_id = Column(Integer, ForeignKey("tutors.id"))
     subject_id = Column(Integer, ForeignKey("subjects.id"))
 
+    __table_args__ = (
+        Index("uq_tutor_subjects_tutor_subject", "tutor_id", "subject_id", unique=True),
+        Index("ix_tutor_subjects_subject_tutor", "subject_id", "tutor_id"),
+    )
+
+
+class StudentSubject(Base):
+    __tablename__ = "student_subjects"
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), nullable=False)
+
+    __table_args__ = (
+        Index("uq_student_subjects_student_subject", "student_id", "subject_id", unique=True),
+        Index("ix_student_subjects_subject_student", "subject_id", "student_id"),
+    )
+
+
+class SimilarTutor(Base):
+    # materialized top-k neighbours per tutor, maintained by backend/neighbors.py
+    __tablename__ = "similar_tutors"
+    tutor_id = Column(Integer, ForeignKey("tutors.id"), primary_key=True, autoincrement=False)
+    rank = Column(Integer, primary_key=True, autoincrement=False)
+    neighbor_id = Column(Integer, ForeignKey("tutors.id"), nullable=False)
+    score = Column(Float, nullable=False)  # number of shared subjects
+
+    __table_args__ = (
+        Index("ix_similar_tutors_neighbor", "neighbor_id"),
+    )
+
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -68,6 +146,11 @@ class Review(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     tutor = relationship("Tutor", back_populates="reviews")
 
+    __table_args__ = (
+        Index("ix_reviews_tutor_created", "tutor_id", "created_at", "id"),
+        Index("ix_reviews_created", "created_at", "id"),
+    )
+
 
 class LessonRequest(Base):
     __tablename__ = "lesson_requests"
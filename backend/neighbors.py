@@ -0,0 +1,281 @@
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from . import models, scoring
+
+# Materialized similar tutors: similar_tutors holds the best K neighbours of every tutor under the
+# rank_similar ordering (shared subjects desc, rating desc, hourly rate closeness asc), so
+# /api/tutors/{id}/similar is one indexed read. crud's write functions call refresh() inside their
+# transaction whenever a tutor's subjects, rate or rating change; only the tutors whose lists can
+# actually change are recomputed. python -m backend.neighbors rebuilds the whole table.
+
+K = 10
+MIN_RATING = 3.5  # neighbours below this rating are never suggested
+_CHUNK = 500  # base tutors per batch; keeps IN lists under SQL Server's parameter limit
+_WRITE_BATCH = 20000  # tutors per insert during a full rebuild
+
+ST = models.SimilarTutor.__table__
+
+
+def _chunks(ids: List[int]) -> Iterable[List[int]]:
+    for i in range(0, len(ids), _CHUNK):
+        yield ids[i:i + _CHUNK]
+
+
+def _rank(db: Session, base_ids: Optional[List[int]], exclude: Set[int] = frozenset()) -> Dict[int, List[Tuple[int, int]]]:
+    """Top-K [(neighbor_id, shared_subjects)] for each base tutor (all tutors when base_ids is None)."""
+    T, TS = models.Tutor, models.TutorSubject
+    bases = db.query(T.id, T.hourly_rate)
+    members = db.query(TS.tutor_id, TS.subject_id)
+    if base_ids is not None:
+        bases = bases.filter(T.id.in_(base_ids))
+        members = members.filter(TS.tutor_id.in_(base_ids))
+    base_rate = dict(bases.all())
+    base_subjects: Dict[int, Set[int]] = {}
+    for tid, sid in members:
+        base_subjects.setdefault(tid, set()).add(sid)
+
+    wanted = set().union(*base_subjects.values()) if base_subjects else set()
+    pool = db.query(T.id, T.overall_rating, T.hourly_rate).filter(T.overall_rating >= MIN_RATING)
+    pool_members = db.query(TS.tutor_id, TS.subject_id)
+    if base_ids is not None:
+        if not wanted:
+            return {tid: [] for tid in base_rate}
+        pool = pool.filter(T.id.in_(select(TS.tutor_id).where(TS.subject_id.in_(wanted))))
+        pool_members = pool_members.filter(TS.subject_id.in_(wanted))
+    rows = {r[0]: r for r in pool if r[0] not in exclude}
+    subjects_of: Dict[int, Set[int]] = {}
+    by_subject: Dict[int, Set[int]] = {}
+    for tid, sid in pool_members:
+        if tid in rows:
+            subjects_of.setdefault(tid, set()).add(sid)
+            by_subject.setdefault(sid, set()).add(tid)
+
+    out = {}
+    for tid, rate in base_rate.items():
+        subs = base_subjects.get(tid, set())
+        cand = set().union(*(by_subject.get(s, ()) for s in subs)) if subs else set()
+        cand.discard(tid)
+        cand = sorted(cand)
+        c = scoring.Candidates([(i, rows[i][1], rows[i][2], None, None) for i in cand],
+                               [(i, s) for i in cand for s in subjects_of[i] & subs])
+        ranked = scoring.rank_similar(c, list(subs), rate, K)
+        out[tid] = [(n, len(subjects_of[n] & subs)) for n in ranked]
+    return out
+
+
+def _write(db: Session, lists: Dict[int, List[Tuple[int, int]]], replace: bool = True):
+    if replace and lists:
+        db.execute(ST.delete().where(ST.c.tutor_id.in_(list(lists))))
+    rows = [{"tutor_id": tid, "rank": rank, "neighbor_id": n, "score": float(score)}
+            for tid, ranked in lists.items() for rank, (n, score) in enumerate(ranked, start=1)]
+    if rows:
+        db.execute(ST.insert(), rows)
+
+
+def _rank_all(db: Session, base_ids: Optional[Set[int]] = None) -> Iterator[Tuple[int, List[Tuple[int, int]]]]:
+    """
+    _rank(db, base_ids) for large tables, yielded tutor by tutor (every tutor when base_ids is None). Tutors teaching the same set of subjects share one candidate
+    pool, so overlaps and the (overlap, rating) cut-off of the top K+1 are computed once per
+    distinct set; each tutor then orders the few candidates above the cut-off and picks the rest
+    from those tied at it by hourly rate closeness (ties by id, as in rank_similar).
+    """
+    np = scoring.np
+    T, TS = models.Tutor, models.TutorSubject
+    rows = db.query(T.id, T.overall_rating, T.hourly_rate).order_by(T.id).all()
+    ids = [r[0] for r in rows]
+    pos = {tid: i for i, tid in enumerate(ids)}  # positions follow id order
+    rating = np.nan_to_num(np.array([r[1] for r in rows], dtype=np.float64), nan=0.0)
+    rate = np.nan_to_num(np.array([r[2] for r in rows], dtype=np.float64), nan=0.0)
+    in_pool = np.array([r[1] is not None and r[1] >= MIN_RATING for r in rows], dtype=bool)
+
+    subjects_of: Dict[int, Set[int]] = defaultdict(set)
+    members: Dict[int, List[int]] = defaultdict(list)
+    for tid, sid in db.query(TS.tutor_id, TS.subject_id):
+        i = pos.get(tid)
+        if i is None:
+            continue
+        subjects_of[i].add(sid)
+        if in_pool[i]:
+            members[sid].append(i)
+    members = {sid: np.array(m, dtype=np.int64) for sid, m in members.items()}
+    groups: Dict[frozenset, List[int]] = defaultdict(list)
+    for i in (range(len(ids)) if base_ids is None else sorted(pos[t] for t in base_ids if t in pos)):
+        groups[frozenset(subjects_of.get(i, ()))].append(i)
+
+    for subs, bases in groups.items():
+        pools = [members[sid] for sid in subs if sid in members]
+        if not pools:
+            for b in bases:
+                yield ids[b], []
+            continue
+        cand, overlap = np.unique(np.concatenate(pools), return_counts=True)
+        primary = overlap * 10.0 + rating[cand]  # overlap desc, then rating desc (ratings are below 10)
+        if len(cand) > K + 1:
+            cut = np.partition(primary, len(cand) - K - 1)[len(cand) - K - 1]
+            head, tied = primary > cut, primary == cut
+        else:
+            head, tied = np.ones(len(cand), dtype=bool), np.zeros(len(cand), dtype=bool)
+        head_rows = list(zip(cand[head].tolist(), overlap[head].tolist()))
+        # tutors tied at the cut-off share overlap and rating: group them by rate, ids ascending
+        tied_pos = cand[tied]
+        tied_pos = tied_pos[np.lexsort((tied_pos, rate[tied_pos]))]
+        tied_overlap = int(overlap[tied][0]) if len(tied_pos) else 0
+        rate_values, starts = np.unique(rate[tied_pos], return_index=True)
+        rate_values = rate_values.tolist()
+        by_rate = np.split(tied_pos, starts[1:]) if len(tied_pos) else []
+        by_rate = [g.tolist() for g in by_rate]
+
+        for b in bases:
+            base_rate = rate[b]
+            ranked = sorted(((i, ov) for i, ov in head_rows if i != b),
+                            key=lambda r: (-r[1], -rating[r[0]], abs(rate[r[0]] - base_rate), r[0]))[:K]
+            picked = [(ids[i], ov) for i, ov in ranked]
+            if len(picked) < K and rate_values:
+                picked.extend((ids[i], tied_overlap) for i in _nearest(rate_values, by_rate, base_rate, K - len(picked), b))
+            yield ids[b], picked
+
+
+def _nearest(rate_values: List[float], by_rate: List[List[int]], base_rate: float, need: int, skip: int) -> List[int]:
+    # walk outwards from base_rate; groups at equal distance on both sides merge in id order
+    out = []
+    r = bisect_left(rate_values, base_rate)
+    l = r - 1
+    while len(out) < need and (l >= 0 or r < len(rate_values)):
+        dl = base_rate - rate_values[l] if l >= 0 else float("inf")
+        dr = rate_values[r] - base_rate if r < len(rate_values) else float("inf")
+        if dl < dr:
+            batch = by_rate[l]
+            l -= 1
+        elif dr < dl:
+            batch = by_rate[r]
+            r += 1
+        else:
+            batch = sorted(by_rate[l] + by_rate[r])
+            l -= 1
+            r += 1
+        out.extend(i for i in batch if i != skip)
+    return out[:need]
+
+
+def rebuild(db: Session) -> int:
+    """Recompute every tutor's neighbours. The caller commits."""
+    db.execute(ST.delete())
+    ranked = _rank_all(db) if scoring.np is not None else _rank(db, None).items()
+    n, batch = 0, {}
+    for tid, picked in ranked:
+        batch[tid] = picked
+        if len(batch) >= _WRITE_BATCH:
+            _write(db, batch, replace=False)
+            n, batch = n + len(batch), {}
+    _write(db, batch, replace=False)
+    return n + len(batch)
+
+
+def fill(db: Session, tutor_ids: List[int]) -> int:
+    """
+    Compute the lists of tutors that no list can hold yet: new tutors without reviews are below
+    MIN_RATING, so only their own lists change. Used by bulk imports instead of one refresh() per
+    tutor. The caller commits.
+    """
+    if not tutor_ids:
+        return 0
+    if scoring.np is None:
+        for chunk in _chunks(sorted(tutor_ids)):
+            _write(db, _rank(db, chunk))
+        return len(tutor_ids)
+    n, batch = 0, {}
+    for tid, picked in _rank_all(db, set(tutor_ids)):
+        batch[tid] = picked
+        if len(batch) >= _CHUNK:
+            _write(db, batch)
+            n, batch = n + len(batch), {}
+    _write(db, batch)
+    return n + len(batch)
+
+
+def _listing(db: Session, tutor_id: int) -> Set[int]:
+    # tutors whose stored list contains tutor_id (ix_similar_tutors_neighbor)
+    return {tid for (tid,) in db.query(ST.c.tutor_id).filter(ST.c.neighbor_id == tutor_id).distinct()}
+
+
+def _would_enter(db: Session, tutor_id: int, skip: Set[int]) -> Set[int]:
+    """Tutors not listing tutor_id whose top-K it now belongs in."""
+    T, TS = models.Tutor, models.TutorSubject
+    me = db.query(T.overall_rating, T.hourly_rate).filter(T.id == tutor_id).first()
+    if me is None or me.overall_rating is None or me.overall_rating < MIN_RATING:
+        return set()
+    mine = [sid for (sid,) in db.query(TS.subject_id).filter(TS.tutor_id == tutor_id)]
+    if not mine:
+        return set()
+    sharing = db.query(TS.tutor_id, func.count(TS.subject_id), T.hourly_rate) \
+        .join(T, T.id == TS.tutor_id).filter(TS.subject_id.in_(mine), TS.tutor_id != tutor_id) \
+        .group_by(TS.tutor_id, T.hourly_rate).all()
+    # the current K-th neighbour of every sharing tutor that has a full list
+    N = models.Tutor.__table__.alias("n")
+    worst = {r.tutor_id: r for r in db.execute(
+        select(ST.c.tutor_id, ST.c.score, ST.c.neighbor_id, N.c.overall_rating, N.c.hourly_rate)
+        .join(N, N.c.id == ST.c.neighbor_id)
+        .where(ST.c.rank == K, ST.c.tutor_id.in_(select(TS.tutor_id).where(TS.subject_id.in_(mine))))
+    )}
+    out = set()
+    for tid, shared, rate in sharing:
+        if tid in skip:
+            continue
+        w = worst.get(tid)
+        if w is None:
+            out.add(tid)
+            continue
+        rate = rate or 0
+        mine_key = (-shared, -(me.overall_rating or 0), abs((me.hourly_rate or 0) - rate), tutor_id)
+        worst_key = (-w.score, -(w.overall_rating or 0), abs((w.hourly_rate or 0) - rate), w.neighbor_id)
+        if mine_key < worst_key:
+            out.add(tid)
+    return out
+
+
+def refresh(db: Session, tutor_id: int, deleted: bool = False):
+    """
+    Recompute the lists a change to one tutor can affect: its own, every list that holds it, and
+    the lists it now ranks into. Call inside the write transaction, after the change is flushed.
+    """
+    db.flush()
+    affected = _listing(db, tutor_id)
+    if deleted:
+        db.execute(ST.delete().where(ST.c.tutor_id == tutor_id))
+        affected.discard(tutor_id)
+    else:
+        affected |= _would_enter(db, tutor_id, affected)
+        affected.add(tutor_id)
+    exclude = {tutor_id} if deleted else set()
+    for chunk in _chunks(sorted(affected)):
+        _write(db, _rank(db, chunk, exclude))
+
+
+def refresh_many(db: Session, tutor_ids: Iterable[int]):
+    """
+    refresh() for several changed tutors at once (none deleted): the lists each change can affect
+    are collected first, so a list touched by several of them is recomputed once.
+    """
+    db.flush()
+    tutor_ids = sorted(set(tutor_ids))
+    affected = set(tutor_ids)
+    for tid in tutor_ids:
+        affected |= _listing(db, tid)
+    for tid in tutor_ids:
+        affected |= _would_enter(db, tid, affected)
+    for chunk in _chunks(sorted(affected)):
+        _write(db, _rank(db, chunk))
+
+
+if __name__ == "__main__":
+    # python -m backend.neighbors : rebuild the similar_tutors table from scratch
+    from .database import SessionLocal
+    with SessionLocal() as db:
+        n = rebuild(db)
+        db.commit()
+    print(f"Rebuilt similar tutors for {n} tutors.")
@@ -0,0 +1,95 @@
+import base64
+import json
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# Opaque keyset cursors: the sort key of the last row of a page, tagged with the ordering it
+# belongs to. The next page is fetched with a seek predicate on that key instead of OFFSET.
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _is_id(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _is_str(v) -> bool:
+    return isinstance(v, str)
+
+
+def _key_shapes(order: str) -> List[Tuple[Callable, ...]]:
+    """The element checks a cursor key may match for an ordering (see tutor_search_key)."""
+    if order == "reviews":
+        return [(_is_str, _is_id)]  # (created_at isoformat, id)
+    if order == "tutors:distance_asc":
+        return [(_is_id,), (_is_id, _is_number, _is_id)]  # without / with an origin
+    if order == "tutors:price_asc":
+        return [(_is_number, _is_id)]
+    if order.startswith("tutors:"):
+        return [(_is_number, _is_number, _is_id)]
+    return [(_is_id,)]  # id-ordered lists
+
+
+def encode_cursor(order: str, key: Sequence) -> str:
+    raw = json.dumps({"o": order, "k": list(key)}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], order: str) -> Optional[Tuple]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        key = data["k"]
+        if data["o"] != order or not isinstance(key, list):
+            raise InvalidCursor("cursor does not belong to this ordering")
+        valid = any(len(key) == len(shape) and all(check(v) for check, v in zip(shape, key))
+                    for shape in _key_shapes(order))
+        if not valid:
+            raise InvalidCursor("malformed cursor")
+        return tuple(key)
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor("malformed cursor")
+
+
+def page_size(limit: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """Rows per page; None (the whole list, as before paging existed) when neither limit nor cursor is given."""
+    if limit is None and not cursor:
+        return None
+    return limit or DEFAULT_LIMIT
+
+
+def fetch_size(size: Optional[int]) -> Optional[int]:
+    # one extra row tells split_page whether another page exists
+    return None if size is None else size + 1
+
+
+def split_page(rows: List, limit: Optional[int], order: str, key: Callable) -> Tuple[List, Optional[str]]:
+    """Trim rows fetched with limit + 1 to one page and build the cursor for the next one."""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(order, key(page[-1]))
+
+
+def tutor_search_key(sort_by: Optional[str], tutor, dist: Optional[float], has_origin: bool) -> Tuple:
+    """Ascending sort key for one /api/tutors/search row; also what the cursor stores."""
+    if sort_by == "distance_asc":
+        if not has_origin:
+            return (tutor.id,)
+        return (1, 0.0, tutor.id) if dist is None else (0, dist, tutor.id)
+    if sort_by == "price_asc":
+        return (tutor.hourly_rate, tutor.id)
+    # default: rating desc, then price asc
+    return (-(tutor.overall_rating or 0), tutor.hourly_rate, tutor.id)
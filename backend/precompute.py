@@ -0,0 +1,303 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import time
+from typing import Iterable, List, Optional
+
+from . import ai, crud, explaincache, models
+from .database import ReadSessionLocal, SessionLocal
+
+# Explanations computed ahead of time. Writes that change a student's recommendation inputs
+# (create/update_student, tutor writes and reviews for the students who share a subject with the
+# tutor) enqueue that student in a job queue kept in the explanation cache's SQLite file. A worker
+# task in the API process (or `python -m backend.precompute run`) takes due jobs, computes the
+# student's current recommendations and fills the explanation cache through the provider chain,
+# so /api/chat and /api/students/{id}/recommendations find explanations ready. Without a model
+# provider (or without the cache file) nothing is enqueued, since no worker could ever drain it.
+#
+# There is at most one pending job per student: enqueueing again bumps its version instead, and a
+# run only deletes the job if the version it started from is still current. Failed runs are
+# retried with exponential backoff (EXPLANATION_JOB_BACKOFF_SECONDS, doubling up to an hour) and
+# dropped after EXPLANATION_JOB_MAX_ATTEMPTS. Claims are leases taken in one immediate
+# transaction, so several API processes can share the queue. EXPLANATION_WORKER=0 disables the
+# in-process worker; EXPLANATION_WORKER_CONCURRENCY and EXPLANATION_WORKER_POLL_SECONDS tune it.
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300  # a claimed job becomes due again if its worker died
+MAX_BACKOFF_SECONDS = 3600
+_CHUNK = 500
+
+
+def max_attempts() -> int:
+    return int(os.getenv("EXPLANATION_JOB_MAX_ATTEMPTS", "5"))
+
+
+def backoff_seconds(attempts: int) -> float:
+    base = float(os.getenv("EXPLANATION_JOB_BACKOFF_SECONDS", "30"))
+    return min(base * 2 ** max(attempts - 1, 0), MAX_BACKOFF_SECONDS)
+
+
+class JobQueue:
+    def __init__(self):
+        self._ready_path = None
+
+    def _connect(self):
+        p = explaincache.path()
+        if not p:
+            return None
+        conn = sqlite3.connect(p, timeout=5, isolation_level=None)
+        if self._ready_path != p:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS explanation_jobs ("
+                "student_id INTEGER PRIMARY KEY, version INTEGER NOT NULL DEFAULT 1, "
+                "attempts INTEGER NOT NULL DEFAULT 0, run_after REAL NOT NULL, last_error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_explanation_jobs_run_after ON explanation_jobs (run_after)")
+            self._ready_path = p
+        return conn
+
+    def enqueue(self, student_ids: Iterable[int]):
+        ids = sorted(set(student_ids))
+        if not ids:
+            return
+        conn = self._connect()
+        if conn is None:
+            return
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO explanation_jobs (student_id, run_after) VALUES (?, ?) "
+                "ON CONFLICT (student_id) DO UPDATE SET version = version + 1, attempts = 0, "
+                "run_after = excluded.run_after, last_error = NULL",
+                [(sid, now) for sid in ids])
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def discard(self, student_id: int):
+        conn = self._connect()
+        if conn is None:
+            return
+        try:
+            conn.execute("DELETE FROM explanation_jobs WHERE student_id = ?", [student_id])
+        finally:
+            conn.close()
+
+    def claim(self, limit: int, skip: Iterable[int] = ()) -> List[tuple]:
+        """Lease up to `limit` due jobs: [(student_id, version, attempts)]."""
+        conn = self._connect()
+        if conn is None:
+            return []
+        skip = set(skip)
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT student_id, version, attempts FROM explanation_jobs WHERE run_after <= ? "
+                "ORDER BY run_after LIMIT ?", [now, limit + len(skip)]).fetchall()
+            rows = [r for r in rows if r[0] not in skip][:limit]
+            conn.executemany("UPDATE explanation_jobs SET run_after = ? WHERE student_id = ?",
+                             [(now + LEASE_SECONDS, r[0]) for r in rows])
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return rows
+
+    def complete(self, student_id: int, version: int):
+        conn = self._connect()
+        if conn is None:
+            return
+        try:
+            # a newer enqueue (version bump) keeps the job so the new inputs are computed too
+            conn.execute("DELETE FROM explanation_jobs WHERE student_id = ? AND version = ?", [student_id, version])
+        finally:
+            conn.close()
+
+    def fail(self, student_id: int, version: int, attempts: int, error: str) -> bool:
+        """Schedule a retry with backoff; returns False once the job has used up its attempts."""
+        attempts += 1
+        conn = self._connect()
+        if conn is None:
+            return False
+        try:
+            if attempts >= max_attempts():
+                conn.execute("DELETE FROM explanation_jobs WHERE student_id = ? AND version = ?",
+                             [student_id, version])
+                return False
+            conn.execute(
+                "UPDATE explanation_jobs SET attempts = ?, run_after = ?, last_error = ? "
+                "WHERE student_id = ? AND version = ?",
+                [attempts, time.time() + backoff_seconds(attempts), error[:500], student_id, version])
+            return True
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        if conn is None:
+            return {"pending": None, "due": None, "retrying": None}
+        try:
+            pending, due, retrying = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(run_after <= ?), 0), COALESCE(SUM(attempts > 0), 0) "
+                "FROM explanation_jobs", [time.time()]).fetchone()
+        finally:
+            conn.close()
+        return {"pending": pending, "due": due, "retrying": retrying}
+
+
+queue = JobQueue()
+
+
+def accepting_jobs() -> bool:
+    return bool(explaincache.path()) and ai.providers_configured()
+
+
+def enqueue_students(student_ids: Iterable[int]):
+    """Queue explanation refreshes; never lets a queue problem fail the write that triggered it."""
+    if not accepting_jobs():
+        return
+    try:
+        queue.enqueue(student_ids)
+    except Exception:
+        logger.exception("could not enqueue explanation jobs")
+
+
+def forget_student(student_id: int):
+    try:
+        queue.discard(student_id)
+    except Exception:
+        logger.exception("could not discard explanation job")
+
+
+def students_for_subjects(db, subject_ids: Iterable[int]) -> List[int]:
+    """Students with any of these subjects among their preferences (ix_student_subjects_subject_student)."""
+    if not accepting_jobs():
+        return []  # the audience of a write is only ever enqueued; skip the query
+    subject_ids = sorted(set(subject_ids))
+    SS = models.StudentSubject
+    out = set()
+    for i in range(0, len(subject_ids), _CHUNK):
+        chunk = subject_ids[i:i + _CHUNK]
+        out.update(sid for (sid,) in db.query(SS.student_id).filter(SS.subject_id.in_(chunk)).distinct())
+    return sorted(out)
+
+
+def enabled() -> bool:
+    return os.getenv("EXPLANATION_WORKER", "1") != "0" and bool(explaincache.path())
+
+
+def _load(student_id: int):
+    with ReadSessionLocal() as db:
+        student = crud.get_student(db, student_id)
+        if student is None:
+            return None, []
+        student.subjects  # load now: explanations are built after the session is closed
+        return student, crud.recommend_for_student(db, student_id)
+
+
+class Worker:
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._inflight = set()
+        self.completed = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def start(self):
+        if enabled() and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        poll = float(os.getenv("EXPLANATION_WORKER_POLL_SECONDS", "2"))
+        while True:
+            try:
+                done = await self.run_once()
+            except Exception:
+                logger.exception("explanation worker iteration failed")
+                done = 0
+            if not done:
+                await asyncio.sleep(poll)
+
+    async def run_once(self) -> int:
+        """Process one batch of due jobs; returns how many were taken."""
+        if not ai.providers_configured():
+            return 0  # nothing could be computed; leave jobs queued until a provider is set up
+        limit = int(os.getenv("EXPLANATION_WORKER_CONCURRENCY", "2"))
+        jobs = await asyncio.to_thread(queue.claim, limit, self._inflight)
+        await asyncio.gather(*(self._process(*job) for job in jobs))
+        return len(jobs)
+
+    async def _process(self, student_id: int, version: int, attempts: int):
+        self._inflight.add(student_id)
+        try:
+            error = None
+            try:
+                student, tutors = await asyncio.to_thread(_load, student_id)
+                ok = student is None or await ai.precompute_explanations(student, tutors)
+                if not ok:
+                    error = "no provider produced explanations"
+            except Exception as e:
+                error = repr(e)
+            if error is None:
+                await asyncio.to_thread(queue.complete, student_id, version)
+                self.completed += 1
+            elif await asyncio.to_thread(queue.fail, student_id, version, attempts, error):
+                self.retried += 1
+            else:
+                self.dropped += 1
+                logger.warning("dropping explanation job for student %s after %d attempts: %s",
+                               student_id, attempts + 1, error)
+        finally:
+            self._inflight.discard(student_id)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "in_flight": len(self._inflight),
+            "completed": self.completed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            **queue.stats(),
+        }
+
+
+worker = Worker()
+
+
+if __name__ == "__main__":
+    # python -m backend.precompute run        : process jobs until interrupted
+    # python -m backend.precompute enqueue-all : queue every student
+    # python -m backend.precompute status      : queue counts
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if cmd == "enqueue-all":
+        with SessionLocal() as db:
+            ids = [sid for (sid,) in db.query(models.Student.id)]
+        queue.enqueue(ids)
+        print(f"Queued {len(ids)} students.")
+    elif cmd == "run":
+        async def _main():
+            try:
+                await worker._run()
+            finally:
+                await ai.provider.aclose()
+        try:
+            asyncio.run(_main())
+        except KeyboardInterrupt:
+            pass
+    elif cmd == "status":
+        print(queue.stats())
+    else:
+        sys.exit(f"unknown command {cmd!r} (expected run, enqueue-all or status)")
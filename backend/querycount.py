@@ -0,0 +1,118 @@
+import logging
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from starlette.responses import JSONResponse
+
+# Debug/test aid: counts the SQL statements issued while handling one request.
+# SQL_QUERY_BUDGET=<n> turns it on; SQL_QUERY_BUDGET_MODE=raise makes an over-budget request
+# fail with a 500 instead of only logging a warning (useful in tests to catch N+1 regressions).
+# The count runs until the last body chunk is sent, so streamed responses are checked too: their
+# status is already out by then, so in raise mode an over-budget stream is aborted instead.
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["QueryCounter"]] = ContextVar("query_counter", default=None)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class QueryCounter:
+    __slots__ = ("count", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.statements: List[str] = []
+
+
+def budget() -> Optional[int]:
+    raw = os.getenv("SQL_QUERY_BUDGET")
+    return int(raw) if raw else None
+
+
+def raise_on_exceed() -> bool:
+    return os.getenv("SQL_QUERY_BUDGET_MODE", "log").lower() == "raise"
+
+
+def install(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter = _current.get()
+        if counter is not None:
+            counter.count += 1
+            counter.statements.append(statement)
+
+
+@contextmanager
+def track():
+    counter = QueryCounter()
+    token = _current.set(counter)
+    try:
+        yield counter
+    finally:
+        _current.reset(token)
+
+
+def over_budget(route: str, counter: QueryCounter, limit: int) -> bool:
+    if counter.count <= limit:
+        return False
+    logger.warning("%s issued %d SQL statements (budget %d):\n%s", route, counter.count, limit,
+                   "\n".join(counter.statements))
+    return True
+
+
+class QueryBudgetMiddleware:
+    """ASGI middleware enforcing budget(); responses sent in one body message get an X-SQL-Queries header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = budget()
+        if scope["type"] != "http" or limit is None:
+            await self.app(scope, receive, send)
+            return
+        route = f"{scope['method']} {scope['path']}"
+        held, aborted = None, False
+
+        async def send_counted(message):
+            nonlocal held, aborted
+            if message["type"] == "http.response.start":
+                held = message  # until the first body chunk shows whether the response is streamed
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            last = not message.get("more_body", False)
+            if held is not None:
+                start, held = held, None
+                if last:
+                    # the whole body in one message: the handler is done, so the count is final
+                    if over_budget(route, counter, limit) and raise_on_exceed():
+                        await _exceeded(scope, receive, send, counter, limit)
+                        return
+                    headers = list(start.get("headers", [])) + [(b"x-sql-queries", str(counter.count).encode())]
+                    await send({**start, "headers": headers})
+                    await send(message)
+                    return
+                await send(start)
+            if last and over_budget(route, counter, limit) and raise_on_exceed():
+                aborted = True  # the stream never completes; raised below, outside the response's task group
+                return
+            await send(message)
+
+        with track() as counter:
+            await self.app(scope, receive, send_counted)
+        if aborted:
+            raise QueryBudgetExceeded(f"{route} streamed past the SQL query budget: {counter.count} > {limit}")
+
+
+async def _exceeded(scope, receive, send, counter: QueryCounter, limit: int):
+    response = JSONResponse(status_code=500, content={"detail": f"SQL query budget exceeded: {counter.count} > {limit}"},
+                            headers={"X-SQL-Queries": str(counter.count)})
+    await response(scope, receive, send)
@@ -0,0 +1,84 @@
+# Tutor rating aggregates.
+#
+# overall_rating, number_of_reviews, rating_sum and the stars_1..stars_5 histogram are maintained
+# incrementally by crud when a review is added or a student's reviews are removed, so reads never
+# aggregate the reviews table.
+# This job recomputes them from reviews with one GROUP BY, reports tutors whose stored values
+# drifted (rows written outside the API, older databases, seed data) and repairs them in bulk.
+#
+# Run manually with:  python -m backend.ratings [check|repair]
+import sys
+
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.orm import Session
+
+from . import models, neighbors
+from .catalog import catalog
+from .reccache import cache as rec_cache
+
+TOLERANCE = 1e-6
+REBUILD_FRACTION = 0.1  # past this share of drifted tutors a full neighbour rebuild is cheaper than refreshes
+
+
+def _expected(db: Session) -> dict:
+    """tutor_id -> (count, sum, {stars: count}) recomputed from the reviews table."""
+    R = models.Review
+    out = {}
+    for tid, rating, count in db.query(R.tutor_id, R.rating, func.count(R.id)).group_by(R.tutor_id, R.rating):
+        total_count, total, stars = out.get(tid, (0, 0.0, {}))
+        if rating in models.STAR_RATINGS:
+            stars[rating] = count
+        out[tid] = (total_count + count, total + float(rating) * count, stars)
+    return out
+
+
+def find_drift(db: Session) -> list:
+    """Tutors whose stored aggregates differ from their reviews, with the values they should have."""
+    expected = _expected(db)
+    T = models.Tutor
+    star_cols = [getattr(T, f"stars_{r}") for r in models.STAR_RATINGS]
+    drift = []
+    for tid, stored_count, stored_sum, stored_rating, *stored_stars in \
+            db.query(T.id, T.number_of_reviews, T.rating_sum, T.overall_rating, *star_cols):
+        count, total, stars = expected.get(tid, (0, 0.0, {}))
+        rating = total / count if count else 0.0
+        histogram = [stars.get(r, 0) for r in models.STAR_RATINGS]
+        if (stored_count != count or stored_stars != histogram
+                or stored_sum is None or abs(stored_sum - total) > TOLERANCE
+                or stored_rating is None or abs(stored_rating - rating) > TOLERANCE):
+            row = {"tid": tid, "count": count, "total": total, "rating": rating}
+            row.update({f"n{r}": n for r, n in zip(models.STAR_RATINGS, histogram)})
+            drift.append(row)
+    return drift
+
+
+def reconcile(db: Session, repair: bool = False) -> dict:
+    drift = find_drift(db)
+    if repair and drift:
+        t = models.Tutor.__table__
+        values = {"number_of_reviews": bindparam("count"), "rating_sum": bindparam("total"),
+                  "overall_rating": bindparam("rating")}
+        values.update({f"stars_{r}": bindparam(f"n{r}") for r in models.STAR_RATINGS})
+        db.connection().execute(update(t).where(t.c.id == bindparam("tid")).values(**values), drift)
+        # ratings decide which tutors qualify as neighbours
+        ids = [row["tid"] for row in drift]
+        if len(ids) > REBUILD_FRACTION * db.query(func.count(models.Tutor.id)).scalar():
+            neighbors.rebuild(db)
+        else:
+            neighbors.refresh_many(db, ids)
+        db.commit()
+        rec_cache.catalog_changed()
+        if catalog.ready:
+            catalog.rebuild(db)
+    return {"drifted": [row["tid"] for row in drift], "repaired": bool(repair and drift)}
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if cmd not in ("check", "repair"):
+        sys.exit(f"unknown command {cmd!r} (expected check or repair)")
+    from .database import SessionLocal
+    with SessionLocal() as db:
+        result = reconcile(db, repair=cmd == "repair")
+    print(f"{len(result['drifted'])} tutor(s) with drifted rating aggregates"
+          + (" repaired." if result["repaired"] else "."))
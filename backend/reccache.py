@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+# Recommendation lists cached per student. A list only changes when the student's profile or
+# the tutor catalog changes, so entries are keyed by (student id, profile version, catalog
+# version, limit): update_student/delete_student bump the student's profile version and every
+# tutor, review and rating write bumps the catalog version, which makes older entries unreachable
+# (they age out through the LRU bound or the TTL). Versions live in this process, like the
+# in-memory catalog.
+#
+# RECOMMENDATION_CACHE_SIZE (default 1024 entries, 0 disables) and RECOMMENDATION_CACHE_TTL
+# (default 300 seconds) are read on use so backend/.env applies.
+
+
+def capacity() -> int:
+    return int(os.getenv("RECOMMENDATION_CACHE_SIZE", "1024"))
+
+
+def ttl_seconds() -> float:
+    return float(os.getenv("RECOMMENDATION_CACHE_TTL", "300"))
+
+
+class RecommendationCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, tutors)
+        self._profile_versions: Dict[int, int] = {}
+        self.catalog_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # dropped to stay within capacity
+        self.expirations = 0  # dropped because the TTL passed
+
+    def key(self, student_id: int, limit: int) -> tuple:
+        with self._lock:
+            return (student_id, self._profile_versions.get(student_id, 0), self.catalog_version, limit)
+
+    def get(self, key) -> Optional[List]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, tutors: List):
+        size = capacity()
+        if size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds(), tutors)
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def student_changed(self, student_id: int):
+        with self._lock:
+            self._profile_versions[student_id] = self._profile_versions.get(student_id, 0) + 1
+
+    def catalog_changed(self):
+        with self._lock:
+            self.catalog_version += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "capacity": capacity(),
+                "ttl_seconds": ttl_seconds(),
+                "catalog_version": self.catalog_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+cache = RecommendationCache()
@@ -7,24 +7,45 @@ CREATE TABLE students (
   address TEXT,
   preferred_subjects TEXT,
   max_hourly_rate REAL,
-  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX ix_students_updated ON students (updated_at, id);
+
 CREATE TABLE tutors (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   name TEXT NOT NULL,
   email TEXT NOT NULL,
   phone TEXT,
   city TEXT,
+  city_normalized VARCHAR(120),
   address TEXT,
+  latitude REAL,
+  longitude REAL,
+  geohash TEXT,
   hourly_rate REAL NOT NULL DEFAULT 0.0,
   teaching_mode TEXT,
   bio TEXT,
   overall_rating REAL DEFAULT 0.0,
   number_of_reviews INTEGER DEFAULT 0,
-  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+  rating_sum REAL DEFAULT 0.0,
+  stars_1 INTEGER DEFAULT 0,
+  stars_2 INTEGER DEFAULT 0,
+  stars_3 INTEGER DEFAULT 0,
+  stars_4 INTEGER DEFAULT 0,
+  stars_5 INTEGER DEFAULT 0,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX ix_tutors_geohash ON tutors (geohash);
+CREATE INDEX ix_tutors_city_norm_rate ON tutors (city_normalized, hourly_rate);
+CREATE INDEX ix_tutors_rating_rate ON tutors (overall_rating, hourly_rate);
+CREATE INDEX ix_tutors_rate ON tutors (hourly_rate);
+CREATE INDEX ix_tutors_mode_rate ON tutors (teaching_mode, hourly_rate);
+CREATE INDEX ix_tutors_updated ON tutors (updated_at, id);
+
 CREATE TABLE subjects (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   name TEXT NOT NULL UNIQUE
@@ -36,6 +57,18 @@ CREATE TABLE tutor_subjects (
   subject_id INTEGER REFERENCES subjects(id)
 );
 
+CREATE UNIQUE INDEX uq_tutor_subjects_tutor_subject ON tutor_subjects (tutor_id, subject_id);
+CREATE INDEX ix_tutor_subjects_subject_tutor ON tutor_subjects (subject_id, tutor_id);
+
+CREATE TABLE student_subjects (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  student_id INTEGER NOT NULL REFERENCES students(id),
+  subject_id INTEGER NOT NULL REFERENCES subjects(id)
+);
+
+CREATE UNIQUE INDEX uq_student_subjects_student_subject ON student_subjects (student_id, subject_id);
+CREATE INDEX ix_student_subjects_subject_student ON student_subjects (subject_id, student_id);
+
 CREATE TABLE reviews (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   student_id INTEGER REFERENCES students(id),
@@ -45,6 +78,15 @@ CREATE TABLE reviews (
   created_at DATETIME DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX ix_reviews_tutor_created ON reviews (tutor_id, created_at, id);
+CREATE INDEX ix_reviews_created ON reviews (created_at, id);
+
+CREATE TABLE schema_migrations (
+  version INTEGER PRIMARY KEY,
+  name VARCHAR(200) NOT NULL,
+  applied_at DATETIME NOT NULL
+);
+
 CREATE TABLE lesson_requests (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   student_id INTEGER REFERENCES students(id),
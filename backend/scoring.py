@@ -0,0 +1,149 @@
+from math import radians, cos, sin, asin, sqrt
+from typing import List, Optional, Sequence, Tuple
+import heapq
+
+# numpy is optional: with it every candidate is scored in one vectorized pass and the
+# top-k is selected with argpartition; without it the same keys are computed per row.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MISSING_DISTANCE_KM = 1e6
+
+
+class Candidates:
+    """Column batch for scoring: one entry per tutor plus (tutor_id, subject_id) membership pairs."""
+    __slots__ = ("ids", "ratings", "rates", "lats", "lons", "memberships")
+
+    def __init__(self, rows: Sequence[Tuple], memberships: Sequence[Tuple[int, int]]):
+        # rows are (id, overall_rating, hourly_rate, latitude, longitude), ordered by id
+        self.ids = [r[0] for r in rows]
+        self.ratings = [r[1] for r in rows]
+        self.rates = [r[2] for r in rows]
+        self.lats = [r[3] for r in rows]
+        self.lons = [r[4] for r in rows]
+        self.memberships = list(memberships)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def rank_recommendations(c: Candidates, pref_subject_ids: Sequence[int], origin: Optional[Tuple[float, float]],
+                         limit: int) -> List[int]:
+    """Tutor ids ordered by subject overlap desc, rating desc, distance to origin asc."""
+    if not len(c):
+        return []
+    if np is None:
+        overlap = _py_overlap(c, pref_subject_ids)
+        dist = [distance_km(origin, lat, lon) for lat, lon in zip(c.lats, c.lons)]
+        keys = [(-overlap[i], -(c.ratings[i] or 0), dist[i]) for i in range(len(c))]
+        return _py_top_k(c.ids, keys, limit)
+    overlap = _overlap(c, pref_subject_ids)
+    rating = np.nan_to_num(np.asarray(c.ratings, dtype=np.float64), nan=0.0)
+    dist = _distance(origin, c.lats, c.lons)
+    return _top_k(c.ids, [-overlap, -rating, dist], limit)
+
+
+def rank_similar(c: Candidates, subject_ids: Sequence[int], base_rate: Optional[float], limit: int) -> List[int]:
+    """Tutor ids ordered by subject overlap desc, rating desc, hourly rate closeness asc."""
+    if not len(c):
+        return []
+    base_rate = base_rate or 0
+    if np is None:
+        overlap = _py_overlap(c, subject_ids)
+        keys = [(-overlap[i], -(c.ratings[i] or 0), abs((c.rates[i] or 0) - base_rate)) for i in range(len(c))]
+        return _py_top_k(c.ids, keys, limit)
+    overlap = _overlap(c, subject_ids)
+    rating = np.nan_to_num(np.asarray(c.ratings, dtype=np.float64), nan=0.0)
+    rate = np.nan_to_num(np.asarray(c.rates, dtype=np.float64), nan=0.0)
+    return _top_k(c.ids, [-overlap, -rating, np.abs(rate - base_rate)], limit)
+
+
+def _overlap(c: Candidates, subject_ids: Sequence[int]):
+    n = len(c)
+    bit_of = {sid: i for i, sid in enumerate(sorted(set(subject_ids)))}
+    if not bit_of or not c.memberships:
+        return np.zeros(n, dtype=np.int64)
+    pairs = np.asarray(c.memberships, dtype=np.int64)
+    ids = np.asarray(c.ids, dtype=np.int64)
+    rows = np.searchsorted(ids, pairs[:, 0])
+    rows_clipped = np.minimum(rows, n - 1)
+    keep = (rows < n) & (ids[rows_clipped] == pairs[:, 0]) & np.isin(pairs[:, 1], list(bit_of))
+    rows = rows[keep]
+    bits = np.fromiter((bit_of[s] for s in pairs[keep, 1].tolist()), dtype=np.int64, count=int(keep.sum()))
+    if len(bit_of) > 64:
+        # too many reference subjects for one word; count distinct (row, subject) pairs instead
+        uniq = np.unique(rows * len(bit_of) + bits)
+        return np.bincount(uniq // len(bit_of), minlength=n).astype(np.int64)
+    # subject-membership bitmask per candidate; duplicate association rows collapse naturally
+    mask = np.zeros(n, dtype=np.uint64)
+    np.bitwise_or.at(mask, rows, np.left_shift(np.uint64(1), bits.astype(np.uint64)))
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(mask).astype(np.int64)
+    counts = np.zeros(n, dtype=np.int64)
+    for b in range(len(bit_of)):
+        counts += ((mask >> np.uint64(b)) & np.uint64(1)).astype(np.int64)
+    return counts
+
+
+def _distance(origin, lats, lons):
+    n = len(lats)
+    if origin is None:
+        return np.full(n, MISSING_DISTANCE_KM)
+    lat = np.asarray(lats, dtype=np.float64)
+    lon = np.asarray(lons, dtype=np.float64)
+    lat1, lon1 = np.radians(origin[0]), np.radians(origin[1])
+    lat2, lon2 = np.radians(lat), np.radians(lon)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    km = 6371 * 2 * np.arcsin(np.sqrt(a))
+    return np.where(np.isnan(km), MISSING_DISTANCE_KM, km)
+
+
+def _top_k(ids, keys, limit: int) -> List[int]:
+    """Exact lexicographic top-k over ascending keys, ties broken by candidate order."""
+    n = len(ids)
+    keys = keys + [np.arange(n)]
+    chosen = _select(keys, np.arange(n), min(limit, n))
+    order = np.lexsort([k[chosen] for k in reversed(keys)])
+    id_arr = np.asarray(ids)
+    return id_arr[chosen[order]].tolist()
+
+
+def _select(keys, idx, k: int):
+    # argpartition on the leading key; only rows tied at the k-th value fall through to the next key
+    if k <= 0:
+        return idx[:0]
+    if len(idx) <= k:
+        return idx
+    primary = keys[0][idx]
+    kth = primary[np.argpartition(primary, k - 1)[k - 1]]
+    better = idx[primary < kth]
+    tied = idx[primary == kth]
+    if len(keys) == 1:
+        return np.concatenate([better, tied[:k - len(better)]])
+    return np.concatenate([better, _select(keys[1:], tied, k - len(better))])
+
+
+def _py_overlap(c: Candidates, subject_ids: Sequence[int]) -> List[int]:
+    wanted = set(subject_ids)
+    row_of = {tid: i for i, tid in enumerate(c.ids)}
+    seen = [set() for _ in c.ids]
+    for tid, sid in c.memberships:
+        i = row_of.get(tid)
+        if i is not None and sid in wanted:
+            seen[i].add(sid)
+    return [len(s) for s in seen]
+
+
+def distance_km(origin, lat, lon) -> float:
+    if origin is None or lat is None or lon is None:
+        return MISSING_DISTANCE_KM
+    lat1, lon1, lat2, lon2 = map(radians, [origin[0], origin[1], lat, lon])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * asin(sqrt(a))
+
+
+def _py_top_k(ids, keys, limit: int) -> List[int]:
+    best = heapq.nsmallest(limit, range(len(ids)), key=lambda i: keys[i])
+    return [ids[i] for i in best]
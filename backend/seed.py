@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from .database import engine, SessionLocal
-from . import models
+from . import models, geo, ratings, neighbors
+from .textsearch import text_search
+from .autocomplete import autocomplete
 
 
 def seed():
@@ -20,7 +22,9 @@ def seed():
             models.Student(name="Alice", email="alice@example.com", city="Beirut", address="Hamra", preferred_subjects="Math,Physics", max_hourly_rate=30.0, ),
             models.Student(name="Bob", email="bob@example.com", city="Beirut", address="Antelias", preferred_subjects="Programming,Math", max_hourly_rate=40.0),
         ]
+        by_name = {s.name: s for s in subject_objs}
         for s in students:
+            s.subjects = [by_name[n] for n in models.split_subject_names(s.preferred_subjects)]
             db.add(s)
         db.commit()
 
@@ -41,7 +45,7 @@ def seed():
         ]
 
         for name,email,city,address,lat,lng,rate,mode,bio,subs in tutor_data:
-            t = models.Tutor(name=name, email=email, city=city, address=address, latitude=lat, longitude=lng, hourly_rate=rate, teaching_mode=mode, bio=bio, overall_rating=4.0, number_of_reviews=5)
+            t = models.Tutor(name=name, email=email, city=city, city_normalized=models.normalize_city(city), address=address, latitude=lat, longitude=lng, geohash=geo.encode(lat, lng), hourly_rate=rate, teaching_mode=mode, bio=bio)
             db.add(t)
             db.commit()
             # attach subjects
@@ -63,6 +67,17 @@ def seed():
                 db.add(r)
             db.commit()
 
+        # reviews were inserted directly, so derive the rating aggregates from them
+        # (a repair also rebuilds the similar-tutor table)
+        if not ratings.reconcile(db, repair=True)["repaired"]:
+            neighbors.rebuild(db)
+            db.commit()
+
+        # tutors were inserted directly, so refresh the search indexes
+        text_search.init(db)
+        text_search.rebuild(db)
+        autocomplete.rebuild(db)
+
         print("Seeding done.")
     finally:
         db.close()
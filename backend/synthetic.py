@@ -0,0 +1,232 @@
+# Synthetic data at scale, for benchmarks and load tests.
+#
+# Generates N tutors plus students, subjects and reviews with plausible distributions: tutors
+# cluster around weighted city centres, hourly rates are log-normal, subject popularity follows a
+# Zipf curve with 1-4 subjects per tutor, and review counts and star ratings are skewed the way
+# real marketplaces are. Rows go in with batched executemany inserts (one transaction per batch),
+# with every column crud would maintain filled in directly: city_normalized, geohash, the rating
+# aggregates and star histogram, student_subjects and the FTS rows. similar_tutors is rebuilt at
+# the end unless --no-neighbors is given.
+#
+# Run with:  python -m backend.synthetic --tutors 100000 [--students N] [--seed 7]
+# Data is appended to DATABASE_URL; point it at an empty file for a clean set. dataset() keeps
+# one generated file per size for the benchmarks, which work on copies of it.
+import argparse
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Engine
+
+from . import geo, migrations, models, neighbors, textsearch
+from .database import Base, engine as default_engine
+
+BATCH = 5000
+
+# (city, latitude, longitude, weight)
+CITIES = [
+    ("Beirut", 33.8938, 35.5018, 40), ("Tripoli", 34.4367, 35.8497, 12), ("Jounieh", 34.3250, 35.6167, 8),
+    ("Saida", 33.5630, 35.3689, 7), ("Zahle", 33.8463, 35.9020, 6), ("Antelias", 33.9140, 35.5930, 5),
+    ("Byblos", 34.1230, 35.6519, 5), ("Tyre", 33.2705, 35.2038, 5), ("Baabda", 33.8339, 35.5442, 4),
+    ("Nabatieh", 33.3772, 35.4836, 3), ("Batroun", 34.2553, 35.6581, 2), ("Aley", 33.8100, 35.6000, 2),
+    ("Dubai", 25.2048, 55.2708, 1), ("Paris", 48.8566, 2.3522, 1), ("Montreal", 45.5019, -73.5674, 1),
+]
+SUBJECTS = [
+    "Math", "Physics", "Chemistry", "Programming", "English", "Biology", "Economics", "French", "Arabic",
+    "History", "Geography", "Statistics", "Calculus", "Algebra", "Geometry", "Accounting", "Finance",
+    "Marketing", "Philosophy", "Psychology", "Sociology", "Music", "Piano", "Guitar", "Art", "Drawing",
+    "Spanish", "German", "Italian", "Computer Science", "Data Science", "Machine Learning", "Web Development",
+    "Databases", "Networking", "Electronics", "Mechanics", "Thermodynamics", "Organic Chemistry",
+    "Literature", "Writing", "SAT Prep", "IELTS", "TOEFL", "Public Speaking", "Law", "Medicine",
+    "Nursing", "Architecture", "Graphic Design", "Photography", "Chess", "Robotics", "Astronomy",
+    "Environmental Science", "Political Science", "Business", "Entrepreneurship", "Latin", "Chinese",
+]
+FIRST = ["Adam", "Lea", "Karim", "Nour", "Omar", "Maya", "Rami", "Sara", "Hadi", "Lina", "Ziad", "Rita",
+         "Fadi", "Yara", "Tarek", "Joelle", "Samir", "Dana", "Elie", "Mira", "Jad", "Carla", "Nadim", "Hiba"]
+LAST = ["Haddad", "Khoury", "Nassar", "Saad", "Aoun", "Salameh", "Fares", "Hajj", "Karam", "Daher",
+        "Mansour", "Rizk", "Harb", "Jaber", "Azar", "Chami", "Tannous", "Sleiman", "Nader", "Bitar"]
+TOPICS = ["exam preparation", "homework help", "university courses", "beginners", "advanced students",
+          "school curriculum", "competitions", "adult learners"]
+MODES = [models.TeachingModeEnum.online, models.TeachingModeEnum.in_person, models.TeachingModeEnum.hybrid]
+MODE_WEIGHTS = [45, 35, 20]
+SUBJECT_COUNT_WEIGHTS = [50, 30, 15, 5]  # tutors teaching 1, 2, 3, 4 subjects
+STAR_WEIGHTS = [4, 6, 15, 30, 45]  # 1 to 5 stars
+
+
+class Generator:
+    def __init__(self, seed: int, subject_ids: List[int], subject_names: Dict[int, str]):
+        self.rnd = random.Random(seed)
+        self.subject_ids = subject_ids
+        self.subject_names = subject_names
+        # Zipf popularity: the k-th subject is chosen with weight 1/k
+        self.subject_weights = [1.0 / (k + 1) for k in range(len(subject_ids))]
+        self.city_weights = [c[3] for c in CITIES]
+
+    def name(self) -> str:
+        return f"{self.rnd.choice(FIRST)} {self.rnd.choice(LAST)}"
+
+    def place(self):
+        city, lat, lon, _ = self.rnd.choices(CITIES, self.city_weights)[0]
+        return city, round(self.rnd.gauss(lat, 0.03), 6), round(self.rnd.gauss(lon, 0.03), 6)
+
+    def subjects(self, max_count: int = 4) -> List[int]:
+        k = self.rnd.choices(range(1, len(SUBJECT_COUNT_WEIGHTS) + 1), SUBJECT_COUNT_WEIGHTS)[0]
+        chosen = []
+        while len(chosen) < min(k, max_count, len(self.subject_ids)):
+            sid = self.rnd.choices(self.subject_ids, self.subject_weights)[0]
+            if sid not in chosen:
+                chosen.append(sid)
+        return chosen
+
+    def rate(self) -> float:
+        return round(min(max(self.rnd.lognormvariate(math.log(28), 0.45), 8.0), 150.0) * 2) / 2
+
+    def review_count(self, mean: float) -> int:
+        # most tutors have a handful of reviews, a few have many
+        if mean <= 0:
+            return 0
+        return int(self.rnd.expovariate(1.0 / mean))
+
+    def stars(self) -> int:
+        return self.rnd.choices(models.STAR_RATINGS, STAR_WEIGHTS)[0]
+
+    def moment(self, days: int = 730) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.rnd.randint(0, days * 86400))
+
+
+def _next_id(conn, table) -> int:
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def _ensure_subjects(conn, count: int):
+    subj = models.Subject.__table__
+    existing = {name.lower(): sid for sid, name in conn.execute(select(subj.c.id, subj.c.name))}
+    wanted = SUBJECTS[:count] + [f"Subject {i}" for i in range(len(SUBJECTS), count)]
+    new = [{"name": n} for n in wanted if n.lower() not in existing]
+    if new:
+        conn.execute(insert(subj), new)
+    rows = conn.execute(select(subj.c.id, subj.c.name)).all()
+    by_key = {name.lower(): (sid, name) for sid, name in rows}
+    ids = [by_key[n.lower()][0] for n in wanted]
+    return ids, {sid: name for sid, name in rows}
+
+
+def generate(tutors: int, students: int = None, subjects: int = 40, reviews_per_tutor: float = 6.0,
+             seed: int = 7, bind: Engine = None, rebuild_neighbors: bool = True, log=print) -> dict:
+    bind = bind or default_engine
+    students = tutors // 4 if students is None else students
+    Base.metadata.create_all(bind=bind)
+    migrations.upgrade(bind)
+    T, S, R = models.Tutor.__table__, models.Student.__table__, models.Review.__table__
+    TS, SS = models.TutorSubject.__table__, models.StudentSubject.__table__
+    started = time.perf_counter()
+
+    with bind.begin() as conn:
+        subject_ids, subject_names = _ensure_subjects(conn, subjects)
+        use_fts = conn.dialect.name == "sqlite" and \
+            conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :n"), {"n": textsearch.FTS_TABLE}).first() is not None
+        first_student = _next_id(conn, S)
+    gen = Generator(seed, subject_ids, subject_names)
+
+    # students first, so reviews can reference them
+    for lo in range(0, students, BATCH):
+        rows, links = [], []
+        for sid in range(first_student + lo, first_student + min(lo + BATCH, students)):
+            city, _, _ = gen.place()
+            prefs = gen.subjects(max_count=3)
+            row = {"id": sid, "name": gen.name(), "email": f"student{sid}@example.com", "city": city,
+                   "address": None, "preferred_subjects": ",".join(subject_names[p] for p in prefs),
+                   "max_hourly_rate": float(gen.rnd.choice([20, 25, 30, 40, 50, 75])), "created_at": gen.moment()}
+            row["updated_at"] = row["created_at"]
+            rows.append(row)
+            links.extend({"student_id": sid, "subject_id": p} for p in prefs)
+        with bind.begin() as conn:
+            conn.execute(insert(S), rows)
+            conn.execute(insert(SS), links)
+    student_range = (first_student, first_student + students - 1)
+    log(f"{students} students in {time.perf_counter() - started:.1f}s")
+
+    with bind.begin() as conn:
+        first_tutor = _next_id(conn, T)
+    reviews_total = 0
+    for lo in range(0, tutors, BATCH):
+        rows, links, reviews, docs = [], [], [], []
+        for tid in range(first_tutor + lo, first_tutor + min(lo + BATCH, tutors)):
+            city, lat, lon = gen.place()
+            subs = gen.subjects()
+            name = gen.name()
+            bio = f"{name.split()[0]} teaches {', '.join(subject_names[s] for s in subs)} for {gen.rnd.choice(TOPICS)}."
+            hist = [0] * len(models.STAR_RATINGS)
+            if student_range[1] >= student_range[0]:
+                for _ in range(gen.review_count(reviews_per_tutor)):
+                    stars = gen.stars()
+                    hist[stars - 1] += 1
+                    reviews.append({"student_id": gen.rnd.randint(*student_range), "tutor_id": tid, "rating": stars,
+                                    "comment": "Great session" if stars >= 4 else "It was okay", "created_at": gen.moment()})
+            count = sum(hist)
+            total = float(sum(r * n for r, n in zip(models.STAR_RATINGS, hist)))
+            row = {"id": tid, "name": name, "email": f"tutor{tid}@example.com", "phone": None, "city": city,
+                   "city_normalized": models.normalize_city(city), "address": None, "latitude": lat, "longitude": lon,
+                   "geohash": geo.encode(lat, lon), "hourly_rate": gen.rate(),
+                   "teaching_mode": gen.rnd.choices(MODES, MODE_WEIGHTS)[0].name, "bio": bio,
+                   "overall_rating": total / count if count else 0.0, "number_of_reviews": count, "rating_sum": total,
+                   "created_at": gen.moment()}
+            row["updated_at"] = row["created_at"]
+            row.update({f"stars_{r}": n for r, n in zip(models.STAR_RATINGS, hist)})
+            rows.append(row)
+            links.extend({"tutor_id": tid, "subject_id": s} for s in subs)
+            docs.append({"id": tid, "name": name, "bio": bio, "subjects": " ".join(subject_names[s] for s in subs)})
+        with bind.begin() as conn:
+            conn.execute(insert(T), rows)
+            conn.execute(insert(TS), links)
+            if reviews:
+                conn.execute(insert(R), reviews)
+            if use_fts:
+                conn.execute(text(f"INSERT INTO {textsearch.FTS_TABLE}(rowid, name, bio, subjects) "
+                                  "VALUES (:id, :name, :bio, :subjects)"), docs)
+        reviews_total += len(reviews)
+        if (lo // BATCH) % 20 == 19:
+            log(f"{lo + len(rows)} tutors ...")
+    log(f"{tutors} tutors, {reviews_total} reviews in {time.perf_counter() - started:.1f}s")
+
+    if rebuild_neighbors:
+        from .database import SessionLocal
+        with SessionLocal(bind=bind) as db:
+            neighbors.rebuild(db)
+            db.commit()
+        log(f"similar tutors rebuilt in {time.perf_counter() - started:.1f}s")
+    return {"tutors": tutors, "students": students, "reviews": reviews_total, "subjects": len(subject_ids),
+            "seconds": round(time.perf_counter() - started, 1)}
+
+
+def dataset(data_dir: str, tutors: int) -> str:
+    """Path of a SQLite file with `tutors` synthetic tutors, generated into data_dir on first use."""
+    path = os.path.join(data_dir, f"tutors_{tutors}.db")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"generating {tutors} tutors into {path} ...", flush=True)
+        # a child process: the engine binds DATABASE_URL at import
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{path}.tmp")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, "-m", "backend.synthetic", "--tutors", str(tutors)], cwd=root, env=env, check=True)
+        os.replace(f"{path}.tmp", path)
+    return path
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Append synthetic tutors, students and reviews to DATABASE_URL.")
+    p.add_argument("--tutors", type=int, default=1000)
+    p.add_argument("--students", type=int, default=None, help="default: a quarter of --tutors")
+    p.add_argument("--subjects", type=int, default=40)
+    p.add_argument("--reviews-per-tutor", type=float, default=6.0, help="mean; the count is exponentially distributed")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--no-neighbors", action="store_true", help="skip rebuilding similar_tutors")
+    args = p.parse_args()
+    print(generate(args.tutors, args.students, args.subjects, args.reviews_per_tutor, args.seed,
+                   rebuild_neighbors=not args.no_neighbors))
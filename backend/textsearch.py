@@ -0,0 +1,215 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import column, event, func, inspect, literal_column, table, text
+from sqlalchemy.orm import Session, selectinload
+
+from . import models
+
+# Full-text search over tutor name, bio and subject names with BM25 ranking.
+# On SQLite builds with FTS5 the tutor_fts virtual table (created by migration 4) is used;
+# otherwise, e.g. on Azure SQL, an in-process inverted index is built at startup.
+# Both are kept in sync by crud's tutor write functions through index_tutor()/remove_tutor(): FTS5
+# rows are written in the tutor's own transaction, and in-memory index changes are queued on the
+# session and applied once it commits (dropped if it rolls back), so search never returns a tutor
+# the database does not have.
+
+FTS_TABLE = "tutor_fts"
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_PENDING = "text_search_pending"  # Session.info key: in-memory index changes awaiting commit
+
+fts = table(FTS_TABLE, column("rowid"))
+_fts_match = literal_column(FTS_TABLE)
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    return _TOKEN.findall(value.lower()) if value else []
+
+
+def fts5_available(conn) -> bool:
+    if conn.dialect.name != "sqlite":
+        return False
+    try:
+        conn.execute(text("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)"))
+        conn.execute(text("DROP TABLE temp._fts5_probe"))
+        return True
+    except Exception:
+        return False
+
+
+def _document(t) -> Tuple[str, str, str]:
+    return t.name or "", t.bio or "", " ".join(s.name for s in t.subjects)
+
+
+class InvertedIndex:
+    """Pure-Python BM25 index: term -> {tutor_id: term frequency}."""
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._terms: Dict[int, Counter] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def add(self, tutor_id: int, fields):
+        counts = Counter(tok for f in fields for tok in tokenize(f))
+        with self._lock:
+            self.remove(tutor_id)
+            self._terms[tutor_id] = counts
+            length = sum(counts.values())
+            self._lengths[tutor_id] = length
+            self._total_length += length
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[tutor_id] = tf
+
+    def remove(self, tutor_id: int):
+        with self._lock:
+            counts = self._terms.pop(tutor_id, None)
+            if counts is None:
+                return
+            self._total_length -= self._lengths.pop(tutor_id, 0)
+            for term in counts:
+                docs = self._postings.get(term)
+                if docs is not None:
+                    docs.pop(tutor_id, None)
+                    if not docs:
+                        del self._postings[term]
+
+    def search(self, terms: List[str]) -> List[Tuple[int, float]]:
+        """Tutors containing every term, best BM25 score first."""
+        with self._lock:
+            n = len(self._lengths)
+            if not terms or not n:
+                return []
+            lists = [self._postings.get(t, {}) for t in set(terms)]
+            if not all(lists):
+                return []
+            lists.sort(key=len)
+            avg = self._total_length / n
+            scores = {}
+            for doc in lists[0]:
+                if all(doc in p for p in lists[1:]):
+                    score = 0.0
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / avg)
+                    for p in lists:
+                        idf = math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+                        tf = p[doc]
+                        score += idf * tf * (self.k1 + 1) / (tf + norm)
+                    scores[doc] = score
+        return sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+
+    def __len__(self):
+        return len(self._lengths)
+
+
+class TextSearch:
+    def __init__(self):
+        self.backend: Optional[str] = None  # "fts5" or "memory"
+        self.index = InvertedIndex()
+
+    def init(self, db: Session):
+        conn = db.connection()
+        if inspect(conn).has_table(FTS_TABLE):
+            self.backend = "fts5"
+            return
+        self.backend = "memory"
+        self.rebuild(db)
+
+    def rebuild(self, db: Session):
+        tutors = db.query(models.Tutor).options(selectinload(models.Tutor.subjects)).all()
+        if self.backend == "fts5":
+            db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+            for t in tutors:
+                self._write_fts(db, t)
+            db.commit()
+            return
+        index = InvertedIndex()
+        for t in tutors:
+            index.add(t.id, _document(t))
+        self.index = index
+
+    def index_tutor(self, db: Session, t):
+        # called inside the tutor write transaction, before commit
+        if self.backend == "fts5":
+            db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": t.id})
+            self._write_fts(db, t)
+        elif self.backend == "memory":
+            _defer(db, "add", t.id, _document(t))
+
+    def index_new(self, db: Session, docs: List[Tuple[int, str, str, str]]):
+        # bulk imports: [(tutor_id, name, bio, subject names)] for tutors not indexed yet, in one executemany
+        if not docs:
+            return
+        if self.backend == "fts5":
+            db.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, name, bio, subjects) VALUES (:id, :name, :bio, :subjects)"),
+                       [{"id": tid, "name": name, "bio": bio, "subjects": subjects} for tid, name, bio, subjects in docs])
+        elif self.backend == "memory":
+            for tid, name, bio, subjects in docs:
+                _defer(db, "add", tid, (name, bio, subjects))
+
+    def remove_tutor(self, db: Session, tutor_id: int):
+        if self.backend == "fts5":
+            db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": tutor_id})
+        elif self.backend == "memory":
+            _defer(db, "remove", tutor_id)
+
+    def _write_fts(self, db: Session, t):
+        name, bio, subjects = _document(t)
+        db.execute(text(f"INSERT INTO {FTS_TABLE}(rowid, name, bio, subjects) VALUES (:id, :name, :bio, :subjects)"),
+                   {"id": t.id, "name": name, "bio": bio, "subjects": subjects})
+
+    def match_query(self, q: str) -> Optional[str]:
+        # quote every token so user input can never be parsed as FTS5 query syntax
+        terms = tokenize(q)
+        return " ".join(f'"{t}"' for t in terms) if terms else None
+
+    def ranked_query(self, q: str, filtered):
+        """
+        Apply the text match to a filtered Tutor query (FTS5 backend). Returns (query, score_expr)
+        where lower scores rank first, or None when the query has no searchable terms.
+        """
+        match = self.match_query(q)
+        if match is None:
+            return None
+        score = func.bm25(_fts_match)
+        qry = filtered.add_columns(score.label("score")).join(fts, fts.c.rowid == models.Tutor.id) \
+            .filter(_fts_match.op("MATCH")(match))
+        return qry, score
+
+    def ranked_ids(self, q: str) -> List[Tuple[int, float]]:
+        return self.index.search(tokenize(q))
+
+
+text_search = TextSearch()
+
+
+def _defer(db: Session, op: str, *args):
+    db.info.setdefault(_PENDING, []).append((op, args))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    for op, args in session.info.pop(_PENDING, ()):
+        getattr(text_search.index, op)(*args)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+if __name__ == "__main__":
+    # python -m backend.textsearch : rebuild the full-text index from the tutors table
+    from .database import SessionLocal
+    with SessionLocal() as db:
+        text_search.init(db)
+        if text_search.backend == "fts5":
+            text_search.rebuild(db)
+        print(f"Rebuilt {text_search.backend} full-text index.")
@@ -0,0 +1,186 @@
+"""
+Latency benchmark for POST /api/chat and the AI explanation path behind it.
+
+By default the API runs in this process (httpx ASGI transport) against scripts/mock_llm.py started
+on a free port, with the explanation cache and the precompute worker off so every request reaches
+the model. Each concurrency level sends --requests chats and reports latency percentiles, the
+share of tutor cards that fell back to deterministic text, and the peak use of the provider
+client's slots (AI_MAX_CONCURRENCY) and of the threadpool that runs the route's DB work.
+
+    python scripts/bench_chat.py --concurrency 1,8,32,64 --requests 200 --mock-latency-ms 300
+    python scripts/bench_chat.py --url http://127.0.0.1:8000   # a running server, its own provider setup
+
+DATABASE_URL selects the database as usual; it needs students (python -m backend.seed).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+
+from mock_llm import MARKER, MockLLM  # noqa: E402
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class Sampler:
+    """Polls /api/admin/ai-providers while a level runs and keeps the peaks."""
+
+    def __init__(self, client: httpx.AsyncClient, interval: float = 0.05):
+        self.client = client
+        self.interval = interval
+        self.peak = {"slots": 0, "queued": 0, "threads": 0}
+        self.limits = {"slots": None, "threads": None}
+
+    async def run(self):
+        while True:
+            try:
+                s = (await self.client.get("/api/admin/ai-providers")).json()
+                c, t = s.get("client", {}), s.get("threadpool", {})
+                self.limits = {"slots": c.get("limit"), "threads": t.get("limit")}
+                self.peak["slots"] = max(self.peak["slots"], c.get("in_flight", 0))
+                self.peak["queued"] = max(self.peak["queued"], c.get("waiting", 0))
+                self.peak["threads"] = max(self.peak["threads"], t.get("in_use", 0))
+            except Exception:
+                pass
+            await asyncio.sleep(self.interval)
+
+
+async def run_level(client: httpx.AsyncClient, students, concurrency: int, total: int) -> dict:
+    latencies, errors, cards, fallbacks = [], 0, 0, 0
+    next_index = 0
+
+    async def one(i):
+        nonlocal errors, cards, fallbacks
+        started = time.perf_counter()
+        try:
+            r = await client.post("/api/chat", json={"student_id": students[i % len(students)],
+                                                     "message": "Who should I book?"})
+        except Exception:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - started)
+        if r.status_code != 200:
+            errors += 1
+            return
+        for card in r.json().get("tutors", []):
+            cards += 1
+            if not (card.get("explanation") or "").startswith(MARKER):
+                fallbacks += 1
+
+    async def lane():
+        nonlocal next_index
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            await one(i)
+
+    sampler = Sampler(client)
+    sampling = asyncio.ensure_future(sampler.run())
+    started = time.perf_counter()
+    await asyncio.gather(*(lane() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampling.cancel()
+
+    lat = sorted(latencies)
+    ms = lambda v: round(v * 1000, 1) if v is not None else None  # noqa: E731
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": ms(percentile(lat, 0.50)),
+        "p95_ms": ms(percentile(lat, 0.95)),
+        "p99_ms": ms(percentile(lat, 0.99)),
+        "max_ms": ms(lat[-1] if lat else None),
+        "errors": errors,
+        "cards": cards,
+        "fallback_rate": round(fallbacks / cards, 4) if cards else None,
+        "peak_slots": sampler.peak["slots"],
+        "slot_limit": sampler.limits["slots"],
+        "peak_queued": sampler.peak["queued"],
+        "peak_threads": sampler.peak["threads"],
+        "thread_limit": sampler.limits["threads"],
+    }
+
+
+def print_row(r: dict):
+    print(f"{r['concurrency']:>5} {r['requests']:>6} {r['rps']:>8} {r['p50_ms']!s:>9} {r['p95_ms']!s:>9} "
+          f"{r['p99_ms']!s:>9} {r['errors']:>6} {str(round(r['fallback_rate'] * 100, 1)) + '%' if r['fallback_rate'] is not None else '-':>9} "
+          f"{r['peak_slots']}/{r['slot_limit']} q{r['peak_queued']:<4} {r['peak_threads']}/{r['thread_limit']}")
+
+
+async def bench(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120)
+    else:
+        from backend.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+    async with client:
+        students = [s["id"] for s in (await client.get("/api/students", params={"limit": 500})).json()]
+        if not students:
+            sys.exit("no students in the database; run python -m backend.seed first")
+        print(f"{'conc':>5} {'reqs':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6} "
+              f"{'fallback':>9} slots queued threads")
+        results = []
+        for c in args.concurrency:
+            r = await run_level(client, students, c, args.requests)
+            print_row(r)
+            results.append(r)
+        if not args.url:
+            from backend import ai
+            from backend.database import async_read_engine
+            await ai.provider.aclose()
+            if async_read_engine is not None:
+                await async_read_engine.dispose()
+        return results
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    p.add_argument("--concurrency", default="1,8,32,64", type=lambda v: [int(x) for x in v.split(",")])
+    p.add_argument("--requests", type=int, default=200, help="chats per concurrency level")
+    p.add_argument("--mock-latency-ms", type=float, default=300.0)
+    p.add_argument("--mock-jitter-ms", type=float, default=100.0)
+    p.add_argument("--mock-error-rate", type=float, default=0.0)
+    p.add_argument("--mock-malformed-rate", type=float, default=0.0)
+    p.add_argument("--cache", action="store_true", help="keep the explanation cache on (measures hits after the first level)")
+    p.add_argument("--json", help="also write the results to this file")
+    args = p.parse_args(argv)
+
+    mock = None
+    if not args.url:
+        mock = MockLLM(("127.0.0.1", 0), args.mock_latency_ms, args.mock_jitter_ms,
+                       args.mock_error_rate, args.mock_malformed_rate, seed=1)
+        threading.Thread(target=mock.serve_forever, daemon=True).start()
+        os.environ.update(HF_API_TOKEN="mock", HF_API_BASE=f"http://127.0.0.1:{mock.server_port}",
+                          EXPLANATION_WORKER="0")
+        for var in ("AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_KEY", "AZURE_OPENAI_DEPLOYMENT"):
+            os.environ.pop(var, None)
+        if not args.cache:
+            os.environ["EXPLANATION_CACHE_PATH"] = ""
+
+    results = asyncio.run(bench(args))
+    if mock is not None:
+        with mock.lock:
+            print("mock:", json.dumps(mock.counts))
+        mock.shutdown()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
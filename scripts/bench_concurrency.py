@@ -0,0 +1,197 @@
+"""
+Read latency while bulk writes run, for the default and the production database profiles.
+
+For each profile the API runs in a child process (the engine is configured at import) on a fresh
+copy of a synthetic database from backend.synthetic's cache. --readers concurrent lanes loop over GET
+/api/tutors/{id}, /api/tutors/search and /api/tutors/{id}/similar. They run first on their own,
+then alongside one writer that keeps posting CSV batches of --batch tutors to
+/api/tutors/import. The report shows read throughput, latency percentiles and errors for both
+phases, plus the rows per second the writer managed.
+
+    python scripts/bench_concurrency.py --tutors 100000 --readers 16 --seconds 10
+    python scripts/bench_concurrency.py --profiles production --db-async 1,0
+    python scripts/bench_concurrency.py --url http://127.0.0.1:8000 --tutors 100000
+
+--db-async runs each profile once per DB_ASYNC value, to compare the async read path (AsyncSession)
+with the sync one (threadpool) under the same load.
+
+With --url the running server is measured as is (its own DATABASE_PROFILE), and the imported rows
+stay in its database.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+
+from bench_chat import percentile  # noqa: E402
+
+from backend.synthetic import dataset  # noqa: E402
+
+
+class Lane:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+
+async def reader(client: httpx.AsyncClient, lane: Lane, paths, rnd: random.Random, stop: asyncio.Event):
+    while not stop.is_set():
+        path = rnd.choice(paths)
+        started = time.perf_counter()
+        try:
+            r = await client.get(path)
+            ok = r.status_code == 200
+        except Exception:
+            ok = False
+        lane.latencies.append(time.perf_counter() - started)
+        lane.errors += not ok
+
+
+def csv_batch(seq: int, size: int, subjects, cities, rnd: random.Random) -> bytes:
+    out = io.StringIO()
+    out.write("name,email,city,hourly_rate,subjects\n")
+    for i in range(size):
+        n = seq * size + i
+        out.write(f"Bench Writer {n},bench-writer{n}@example.com,{rnd.choice(cities)},{rnd.randint(15, 90)},"
+                  f"{';'.join(rnd.sample(subjects, 2))}\n")
+    return out.getvalue().encode("utf-8")
+
+
+async def writer(client: httpx.AsyncClient, batch: int, subjects, cities, stop: asyncio.Event) -> dict:
+    rnd = random.Random(2)
+    rows, errors, seq = 0, 0, 0
+    started = time.perf_counter()
+    while not stop.is_set():
+        body = csv_batch(seq, batch, subjects, cities, rnd)
+        seq += 1
+        try:
+            r = await client.post("/api/tutors/import", content=body, headers={"Content-Type": "text/csv"},
+                                  params={"batch_size": batch})
+            if r.status_code == 200:
+                rows += r.json().get("imported", 0)
+            else:
+                errors += 1
+        except Exception:
+            errors += 1
+    elapsed = time.perf_counter() - started
+    return {"rows": rows, "rows_per_s": round(rows / elapsed, 1), "errors": errors}
+
+
+async def phase(client, paths, readers: int, seconds: float, write=None) -> dict:
+    stop = asyncio.Event()
+    lanes = [Lane() for _ in range(readers)]
+    tasks = [asyncio.ensure_future(reader(client, lane, paths, random.Random(i), stop)) for i, lane in enumerate(lanes)]
+    write_task = asyncio.ensure_future(write(stop)) if write else None
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    lat = sorted(x for lane in lanes for x in lane.latencies)
+    out = {
+        "reads": len(lat),
+        "reads_per_s": round(len(lat) / seconds, 1),
+        "read_errors": sum(lane.errors for lane in lanes),
+        **{f"read_{k}_ms": round(percentile(lat, q) * 1000, 1) if lat else None
+           for k, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))},
+    }
+    if write_task is not None:
+        out["writes"] = await write_task
+    return out
+
+
+async def bench(args) -> dict:
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120)
+    else:
+        from backend.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+    async with client:
+        subjects = [s["name"] for s in (await client.get("/api/subjects", params={"limit": 20})).json()]
+        cities = (await client.get("/api/cities")).json()[:10] or ["Boston"]
+        rnd = random.Random(1)
+        ids = [rnd.randint(1, args.tutors) for _ in range(50)]
+        paths = [f"/api/tutors/{i}" for i in ids] + [f"/api/tutors/{i}/similar" for i in ids[:20]] + \
+                [f"/api/tutors/search?subject={s}&city={c}&limit=20" for s in subjects[:5] for c in cities[:4]]
+        for path in paths[:10]:
+            await client.get(path)  # warm-up
+        idle = await phase(client, paths, args.readers, args.seconds)
+        busy = await phase(client, paths, args.readers, args.seconds,
+                           lambda stop: writer(client, args.batch, subjects, cities, stop))
+    if not args.url:
+        from backend.database import async_read_engine
+        if async_read_engine is not None:
+            await async_read_engine.dispose()  # the app's shutdown handler does not run here
+    return {"reads_only": idle, "during_bulk_writes": busy}
+
+
+def print_profile(profile: str, r: dict):
+    print(f"\n== {profile} ==")
+    print(f"{'phase':<20} {'reads/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}  writes")
+    for name, p in r.items():
+        w = p.get("writes")
+        wtext = f"{w['rows_per_s']} rows/s, {w['errors']} errors" if w else ""
+        print(f"{name:<20} {p['reads_per_s']:>9} {p['read_p50_ms']:>9} {p['read_p95_ms']:>9} {p['read_p99_ms']:>9} "
+              f"{p['read_max_ms']:>9} {p['read_errors']:>7}  {wtext}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--profiles", default="default,production", help="DATABASE_PROFILE values to compare")
+    p.add_argument("--db-async", default="0", help="DB_ASYNC values to run each profile with")
+    p.add_argument("--tutors", type=int, default=100000, help="size of the synthetic database")
+    p.add_argument("--data-dir", default=os.path.join(ROOT, "bench_data"))
+    p.add_argument("--readers", type=int, default=16, help="concurrent read lanes")
+    p.add_argument("--seconds", type=float, default=10.0, help="duration of each phase")
+    p.add_argument("--batch", type=int, default=20000, help="tutors per import request")
+    p.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    p.add_argument("--json", help="also write the results to this file")
+    p.add_argument("--run-profile", action="store_true", help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+
+    if args.run_profile or args.url:
+        result = asyncio.run(bench(args))
+        if args.run_profile:
+            print(json.dumps(result))
+            return
+        results = {"server": result}
+    else:
+        source = dataset(args.data_dir, args.tutors)
+        results = {}
+        modes = args.db_async.split(",")
+        for profile in args.profiles.split(","):
+            for mode in modes:
+                name = profile if len(modes) == 1 else f"{profile}, DB_ASYNC={mode}"
+                work = tempfile.mkdtemp(prefix="bench_concurrency_")
+                try:
+                    copy = os.path.join(work, "bench.db")
+                    shutil.copyfile(source, copy)
+                    env = dict(os.environ, DATABASE_URL=f"sqlite:///{copy}", DATABASE_PROFILE=profile, DB_ASYNC=mode,
+                               EXPLANATION_CACHE_PATH="", EXPLANATION_WORKER="0", METRICS_SLOW_REQUEST_MS="")
+                    child = [sys.executable, os.path.abspath(__file__), "--run-profile", "--tutors", str(args.tutors),
+                             "--readers", str(args.readers), "--seconds", str(args.seconds), "--batch", str(args.batch)]
+                    print(f"running {name} ...", flush=True)
+                    out = subprocess.run(child, cwd=ROOT, env=env, check=True, stdout=subprocess.PIPE, text=True).stdout
+                finally:
+                    shutil.rmtree(work, ignore_errors=True)
+                results[name] = json.loads(out.strip().splitlines()[-1])
+    for profile, r in results.items():
+        print_profile(profile, r)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Local stand-in for the model providers used by backend/ai.py.
+
+Answers POSTs on any path in the HuggingFace format (a list of {"generated_text": ...}) or, when
+the request has "messages", in the Azure OpenAI chat format (choices[].message.content). The
+explanation JSON names every tutor_id found in the prompt, prefixed with MARKER so callers can tell
+model text from the deterministic fallback. Latency, jitter, error rate and the share of malformed
+answers are configurable; GET /stats returns request counts.
+
+    python scripts/mock_llm.py --port 8765 --latency-ms 300 --jitter-ms 100 --error-rate 0.05
+
+Point the backend at it with HF_API_TOKEN=x HF_API_BASE=http://127.0.0.1:8765 (and/or
+AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8765 AZURE_OPENAI_KEY=x AZURE_OPENAI_DEPLOYMENT=mock).
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MARKER = "[mock]"
+
+_tutor_ids = re.compile(r'"tutor_id":\s*(\d+)')
+
+
+class MockLLM(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=200.0, jitter_ms=50.0, error_rate=0.0, malformed_rate=0.0, seed=None):
+        super().__init__(address, Handler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "hf": 0, "openai": 0, "errors": 0, "malformed": 0}
+
+    def draw(self):
+        """(delay seconds, outcome, tie-breaker) for one request; outcome is ok, error or malformed."""
+        with self.lock:
+            delay = max(self.random.gauss(self.latency_ms, self.jitter_ms), 0) / 1000 if self.jitter_ms else self.latency_ms / 1000
+            roll = self.random.random()
+            choice = self.random.random()
+        if roll < self.error_rate:
+            return delay, "error", choice
+        if roll < self.error_rate + self.malformed_rate:
+            return delay, "malformed", choice
+        return delay, "ok", choice
+
+    def handle_error(self, request, client_address):
+        # callers that gave up (deadline, latency budget, shutdown) close the socket mid-answer
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, *keys):
+        with self.lock:
+            for k in keys:
+                self.counts[k] += 1
+
+
+def _malformed(ids, choice) -> str:
+    if choice < 0.5:
+        return "Sure! Here are some great tutors for this student."  # no JSON at all
+    text = json.dumps([{"tutor_id": i, "explanation": f"{MARKER} tutor {i}"} for i in ids])
+    return text[: max(len(text) // 2, 1)]  # cut off mid-array
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockLLM
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/stats":
+            return self._send(404, {"error": "not found"})
+        with self.server.lock:
+            counts = dict(self.server.counts)
+        self._send(200, counts)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "body is not JSON"})
+        chat = "messages" in body
+        prompt = "\n".join(m.get("content", "") for m in body["messages"]) if chat else str(body.get("inputs", ""))
+        ids = [int(i) for i in dict.fromkeys(_tutor_ids.findall(prompt))]
+
+        delay, outcome, choice = self.server.draw()
+        self.server.count("requests", "openai" if chat else "hf")
+        time.sleep(delay)
+        if outcome == "error":
+            self.server.count("errors")
+            return self._send(503, {"error": "model is overloaded"})
+        if outcome == "malformed":
+            self.server.count("malformed")
+            text = _malformed(ids, choice)
+        else:
+            text = json.dumps([{"tutor_id": i, "explanation": f"{MARKER} tutor {i} fits this student."} for i in ids])
+        if chat:
+            return self._send(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]})
+        return self._send(200, [{"generated_text": text}])
+
+    def _send(self, status, payload):
+        out = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--latency-ms", type=float, default=200.0, help="mean response time")
+    p.add_argument("--jitter-ms", type=float, default=50.0, help="standard deviation of the response time")
+    p.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with HTTP 503")
+    p.add_argument("--malformed-rate", type=float, default=0.0, help="share of answers that are not a valid JSON array")
+    p.add_argument("--seed", type=int, default=None)
+    args = p.parse_args(argv)
+    server = MockLLM((args.host, args.port), args.latency_ms, args.jitter_ms, args.error_rate, args.malformed_rate, args.seed)
+    print(f"mock LLM listening on http://{args.host}:{server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import itertools
+import json
+import random
+
+import pytest
+
+# Timings of crud's hot reads and of the API routes, with pytest-benchmark. They only run when
+# selected (pytest.ini deselects the benchmark marker):
+#
+#     python -m pytest tests/benchmarks -m benchmark --bench-tutors 100000 \
+#         --benchmark-compare=scripts/bench_baselines.json --benchmark-compare-fail=median:25%
+#
+# --bench-tutors runs on a copy of a generated database of that size (see tests/conftest.py);
+# without it the suite's 300-tutor one is used. The size is part of every benchmark's name, so
+# scripts/bench_baselines.json holds one baseline per size; --benchmark-json onto it replaces
+# this size's entries and keeps the others. The recommendation cache is off so the numbers are
+# the uncached paths.
+
+
+def pytest_generate_tests(metafunc):
+    if "tutors" in metafunc.fixturenames:
+        tutors = metafunc.config.getoption("bench_tutors") or 300
+        metafunc.parametrize("tutors", [tutors], ids=[f"{tutors}-tutors"], scope="session")
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    path = config.getoption("benchmark_json")
+    ran = {b["fullname"] for b in output_json["benchmarks"]}
+    for b in output_json["benchmarks"]:
+        b["stats"].pop("data", None)  # every round's timing; the baselines only need the stats
+    if path is not None and path.exists():
+        kept = [b for b in json.loads(path.read_text(encoding="utf-8"))["benchmarks"] if b["fullname"] not in ran]
+        output_json["benchmarks"] = sorted(kept + output_json["benchmarks"], key=lambda b: b["fullname"])
+
+
+@pytest.fixture(scope="session")
+def samples(client, tutors):
+    """Tutors, students, subjects and cities the benchmarks rotate over, so no single row stays hot."""
+    from sqlalchemy import func
+
+    from backend import models
+    from backend.database import SessionLocal
+
+    rnd = random.Random(1)
+    with SessionLocal() as db:
+        max_tutor = db.query(func.max(models.Tutor.id)).scalar()
+        max_student = db.query(func.max(models.Student.id)).scalar()
+        subjects = [n for (n,) in db.query(models.Subject.name).order_by(models.Subject.id).limit(5)]
+        cities = [c for (c,) in db.query(models.Tutor.city).distinct().limit(5)]
+    students = [rnd.randint(1, max_student) for _ in range(10)]
+    return [{"tutor_id": rnd.randint(1, max_tutor), "student_id": s, "subject": subject, "city": city}
+            for s, subject, city in zip(students * 4, subjects * 8, cities * 8)]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _uncached():
+    with pytest.MonkeyPatch.context() as m:
+        m.setenv("RECOMMENDATION_CACHE_SIZE", "0")
+        yield
+
+
+@pytest.fixture
+def rotate(benchmark, samples):
+    """benchmark(fn) with fn called on the next sample each time."""
+    def run(fn):
+        inputs = itertools.cycle(samples)
+        benchmark(lambda: fn(next(inputs)))
+    return run
@@ -0,0 +1,23 @@
+import pytest
+
+from backend import crud
+from backend.database import SessionLocal
+
+pytestmark = pytest.mark.benchmark(group="crud")
+
+
+@pytest.mark.parametrize("call", [
+    pytest.param(lambda db, x: crud.search_tutors(db, subject_name=x["subject"], limit=50), id="search subject"),
+    pytest.param(lambda db, x: crud.search_tutors(db, subject_name=x["subject"], city=x["city"], max_hourly_rate=40,
+                                                  limit=50), id="search subject+city+rate"),
+    pytest.param(lambda db, x: crud.search_tutors(db, subject_name=x["subject"], lat=33.89, lon=35.50, radius_km=10,
+                                                  sort_by="distance_asc", limit=50), id="search radius 10km"),
+    pytest.param(lambda db, x: crud.text_search_tutors(db, x["subject"].lower(), limit=20), id="text search"),
+    pytest.param(lambda db, x: crud.get_similar_tutors(db, x["tutor_id"]), id="similar"),
+    pytest.param(lambda db, x: crud.recommend_for_student(db, x["student_id"]), id="recommend"),
+])
+def test_crud(rotate, call):
+    def run(x):
+        with SessionLocal() as db:
+            return call(db, x)
+    rotate(run)
@@ -0,0 +1,57 @@
+import itertools
+
+import pytest
+
+pytestmark = pytest.mark.benchmark(group="routes")
+
+_seq = itertools.count()
+
+
+@pytest.mark.parametrize("path, params", [
+    pytest.param("/api/subjects", lambda x: {"limit": 50}, id="subjects"),
+    pytest.param("/api/students", lambda x: {"limit": 50}, id="students"),
+    pytest.param("/api/cities", lambda x: {}, id="cities"),
+    pytest.param("/api/autocomplete", lambda x: {"field": "subject", "prefix": x["subject"][:2]}, id="autocomplete"),
+    pytest.param("/api/tutors/search", lambda x: {"subject": x["subject"], "city": x["city"], "limit": 50}, id="search"),
+    pytest.param("/api/tutors/search", lambda x: {"subject": x["subject"], "student_id": x["student_id"],
+                                                  "sort_by": "distance_asc", "limit": 50}, id="search student"),
+    pytest.param("/api/tutors/text-search", lambda x: {"q": x["subject"].lower()}, id="text search"),
+    pytest.param("/api/tutors/{tutor_id}", lambda x: {}, id="tutor"),
+    pytest.param("/api/tutors/{tutor_id}/reviews", lambda x: {}, id="reviews"),
+    pytest.param("/api/tutors/{tutor_id}/similar", lambda x: {}, id="similar"),
+    pytest.param("/api/students/{student_id}/recommendations", lambda x: {}, id="recommendations"),
+    pytest.param("/api/admin/ratings", lambda x: {}, id="admin ratings"),
+])
+def test_get(client, rotate, path, params):
+    def run(x):
+        r = client.get(path.format(**x), params=params(x))
+        assert r.status_code == 200, r.text[:200]
+    rotate(run)
+
+
+def test_chat(client, rotate):
+    def run(x):
+        r = client.post("/api/chat", json={"student_id": x["student_id"], "message": "hi", "use_ai": False})
+        assert r.status_code == 200, r.text[:200]
+    rotate(run)
+
+
+@pytest.mark.benchmark(group="writes")
+@pytest.mark.parametrize("method, path, body", [
+    pytest.param("POST", "/api/tutors", lambda x: {
+        "name": "Bench Tutor", "email": f"bench{next(_seq)}@example.com", "city": x["city"], "hourly_rate": 30,
+        "latitude": 33.89, "longitude": 35.5, "subjects": [x["subject"]]}, id="create tutor"),
+    pytest.param("PUT", "/api/tutors/{tutor_id}", lambda x: {"hourly_rate": 20 + next(_seq) % 40}, id="update tutor"),
+    pytest.param("POST", "/api/tutors/{tutor_id}/reviews", lambda x: {
+        "student_id": x["student_id"], "rating": 1 + next(_seq) % 5, "comment": "bench"}, id="review"),
+    pytest.param("POST", "/api/students", lambda x: {
+        "name": "Bench Student", "email": f"bench-student{next(_seq)}@example.com", "city": x["city"],
+        "preferred_subjects": x["subject"], "max_hourly_rate": 40}, id="create student"),
+    pytest.param("PUT", "/api/students/{student_id}", lambda x: {"max_hourly_rate": 20 + next(_seq) % 40},
+                 id="update student"),
+])
+def test_write(client, rotate, method, path, body):
+    def run(x):
+        r = client.request(method, path.format(**x), json=body(x))
+        assert r.status_code < 300, r.text[:200]
+    rotate(run)
@@ -0,0 +1,45 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# backend.database builds its engine at import: point it at a scratch file before any test imports
+# the app, so the suite never touches app.db
+_scratch = tempfile.mkdtemp(prefix="tutor_tests_")
+_scratch_db = os.path.join(_scratch, "app.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch_db}"
+os.environ["EXPLANATION_CACHE_PATH"] = ""
+os.environ["EXPLANATION_WORKER"] = "0"
+os.environ.setdefault("DB_ASYNC", "0")
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import pytest  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption("--bench-tutors", type=int, default=None,
+                     help="run on a copy of a generated database of this many tutors instead of the 300-tutor one")
+    parser.addoption("--bench-data", default=os.path.join(ROOT, "bench_data"),
+                     help="where --bench-tutors databases are generated and kept")
+
+
+def pytest_configure(config):
+    tutors = config.getoption("bench_tutors")
+    if tutors:
+        from backend import synthetic
+        shutil.copyfile(synthetic.dataset(config.getoption("bench_data"), tutors), _scratch_db)
+
+
+@pytest.fixture(scope="session")
+def client(request):
+    """TestClient over the app, on a scratch database of synthetic tutors, students and reviews."""
+    from backend import synthetic
+    if not request.config.getoption("bench_tutors"):
+        synthetic.generate(300, seed=7, log=lambda *_: None)
+
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    with TestClient(app) as c:
+        yield c
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+
+from backend import acrud, catalog, database  # noqa: E402
+from backend.reccache import cache as rec_cache  # noqa: E402
+from backend.textsearch import text_search  # noqa: E402
+
+
+def _both(call):
+    """call(db) awaited on a sync read session (threadpool path) and on an AsyncSession (aiosqlite)."""
+    async def run():
+        with database.ReadSessionLocal() as db:
+            rec_cache.clear()
+            sync = await call(db)
+        engine = create_async_engine(database.ASYNC_DATABASE_URL)
+        event.listen(engine.sync_engine, "connect", database._register_math_functions)
+        try:
+            async with AsyncSession(engine, autoflush=False) as db:
+                rec_cache.clear()
+                return sync, await call(db)
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+
+def _ids(rows):
+    return [r[0].id if isinstance(r, tuple) else r.id for r in rows]
+
+
+READS = [
+    lambda db: acrud.list_students(db, limit=20),
+    lambda db: acrud.search_tutors(db, subject_name="Math", max_hourly_rate=40, sort_by="price_asc"),
+    lambda db: acrud.search_tutors(db, lat=33.9, lon=35.5, radius_km=30, sort_by="distance_asc"),
+    lambda db: acrud.text_search_tutors(db, "math"),
+    lambda db: acrud.get_similar_tutors(db, 5),
+    lambda db: acrud.get_similar_tutors(db, 5, limit=30),
+    lambda db: acrud.recommend_for_student(db, 4),
+]
+
+
+@pytest.mark.parametrize("call", READS)
+def test_async_reads_match_the_sync_path(client, call):
+    sync, async_ = _both(call)
+    assert sync and _ids(async_) == _ids(sync)
+
+
+def test_async_search_keeps_distances(client):
+    sync, async_ = _both(lambda db: acrud.search_tutors(db, lat=33.9, lon=35.5, sort_by="distance_asc"))
+    assert [round(d, 6) for _, d in async_] == [round(d, 6) for _, d in sync]
+
+
+@pytest.mark.parametrize("call", READS[1:])
+def test_async_reads_match_the_sync_path_from_memory(client, call):
+    # the other branches of crud's read plans: the tutor catalog and the in-memory text index
+    try:
+        with database.SessionLocal() as db:
+            catalog.catalog.rebuild(db)
+            text_search.backend = "memory"
+            text_search.rebuild(db)
+        sync, async_ = _both(call)
+    finally:
+        catalog.catalog.ready = False
+        text_search.backend = "fts5"
+    assert sync and _ids(async_) == _ids(sync)
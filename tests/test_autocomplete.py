@@ -0,0 +1,12 @@
+from backend import autocomplete
+
+
+def test_lookup_cache_is_bounded():
+    index = autocomplete.PrefixIndex(keep_empty=False)
+    index.load([("Beirut", 5), ("Byblos", 2), ("Tripoli", 1)])
+    assert [e["name"] for e in index.lookup("b", 10)] == ["Beirut", "Byblos"]
+    for i in range(autocomplete.CACHE_SIZE * 3):
+        index.lookup(f"prefix-{i}", 10)
+    assert len(index._cache) == autocomplete.CACHE_SIZE
+    index.adjust("Byblos", 4)
+    assert [e["name"] for e in index.lookup("b", 10)] == ["Byblos", "Beirut"]
@@ -0,0 +1,50 @@
+import pytest
+
+from backend import catalog
+from backend.database import SessionLocal
+
+
+@pytest.fixture
+def live_catalog(client):
+    with SessionLocal() as db:
+        catalog.catalog.rebuild(db)
+    yield catalog.catalog
+    catalog.catalog.ready = False
+
+
+def _consistency(client):
+    return client.get("/api/admin/catalog", params={"verify": True}).json()["consistency"]
+
+
+def test_catalog_agrees_with_the_database_after_writes(client, live_catalog):
+    assert _consistency(client)["consistent"]
+
+    tid = client.post("/api/tutors", json={"name": "Catalog Test", "email": "catalog-test@example.com", "city": "Beirut",
+                                           "hourly_rate": 40, "subjects": ["Math", "Catalog Sculpture"]}).json()["id"]
+    assert _consistency(client)["consistent"]
+    assert [s.name for s in live_catalog._tutors[tid].subjects] == ["Math", "Catalog Sculpture"]
+
+    client.put(f"/api/tutors/{tid}", json={"hourly_rate": 25, "city": "Tripoli", "subjects": ["Physics"]})
+    assert _consistency(client)["consistent"]
+    assert tid not in live_catalog._with_subjects([s.id for s in live_catalog._subjects.values() if s.name == "Math"])
+
+    assert client.post(f"/api/tutors/{tid}/reviews", json={"student_id": 1, "rating": 2}).status_code == 201
+    assert _consistency(client)["consistent"]
+    assert live_catalog._tutors[tid].number_of_reviews == 1
+
+    client.post("/api/tutors/import", params={"format": "jsonl"},
+                content='{"name": "Catalog Import", "email": "catalog-import@example.com", "subjects": ["Chemistry"]}\n')
+    assert _consistency(client)["consistent"]
+
+    client.delete(f"/api/tutors/{tid}")
+    assert _consistency(client)["consistent"] and tid not in live_catalog._tutors
+
+
+def test_catalog_reads_match_the_database(client, live_catalog):
+    queries = [{}, {"subject": "Math"}, {"city": "beirut", "sort_by": "price_asc"},
+               {"max_hourly_rate": 30, "min_rating": 4}, {"teaching_mode": "online", "limit": 10}]
+    from_memory = [client.get("/api/tutors/search", params=q).json() for q in queries]
+    similar = client.get("/api/tutors/5/similar").json()
+    live_catalog.ready = False
+    assert [client.get("/api/tutors/search", params=q).json() for q in queries] == from_memory
+    assert client.get("/api/tutors/5/similar").json() == similar
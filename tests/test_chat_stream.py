@@ -0,0 +1,47 @@
+import json
+
+from backend import ai
+
+
+def _events(body: str):
+    out = []
+    for block in body.split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            assert event.startswith("event: ") and data.startswith("data: ")
+            out.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return out
+
+
+def _stream(client, student_id=2):
+    r = client.post("/api/chat/stream", json={"student_id": student_id, "message": "who can help me?"})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/event-stream")
+    return _events(r.text)
+
+
+def test_message_comes_first_then_explanations_then_done(client, monkeypatch):
+    async def explain(student, tutors):
+        for t in reversed(tutors):  # in whatever order they arrive
+            yield t.id, f"model text for {t.id}"
+
+    monkeypatch.setattr(ai, "stream_explanations", explain)
+    events = _stream(client)
+    cards = events[0][1]["tutors"]
+    assert len(cards) > 1 and all(c["explanation"] for c in cards)  # deterministic text before any model answer
+    assert [e for e, _ in events] == ["message"] + ["explanation"] * len(cards) + ["done"]
+    assert [d for _, d in events[1:-1]] == [{"tutor_id": c["id"], "explanation": f"model text for {c['id']}"}
+                                            for c in reversed(cards)]
+    assert events[-1][1] == {"tutors": len(cards), "ai_explanations": len(cards)}
+
+
+def test_without_a_provider_the_stream_is_message_then_done(client, monkeypatch):
+    for name in ("HF_API_TOKEN", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_KEY", "AZURE_OPENAI_DEPLOYMENT"):
+        monkeypatch.delenv(name, raising=False)
+    events = _stream(client)
+    assert [e for e, _ in events] == ["message", "done"]
+    assert events[-1][1]["ai_explanations"] == 0
+
+
+def test_unknown_student_is_404(client):
+    r = client.post("/api/chat/stream", json={"student_id": 10 ** 9, "message": "hi"})
+    assert r.status_code == 404
@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import pytest
+
+from backend import ai
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"now": 500.0}
+    monkeypatch.setattr(ai.time, "monotonic", lambda: now["now"])
+    monkeypatch.setenv("AI_BREAKER_FAILURES", "2")
+    monkeypatch.setenv("AI_BREAKER_COOLDOWN_SECONDS", "30")
+    return now
+
+
+def test_breaker_opens_then_half_opens_after_the_cooldown(clock):
+    b = ai.CircuitBreaker()
+    b.record(False)
+    assert b.state == "closed" and b.allow()
+    b.record(False)
+    assert b.state == "open" and not b.allow()
+    clock["now"] += 29
+    assert b.state == "open" and not b.allow()
+    clock["now"] += 1
+    assert b.state == "half_open"
+    assert b.allow() and not b.allow()  # a single trial call at a time
+    b.record(True)
+    assert b.state == "closed" and b.failures == 0 and b.allow()
+
+
+def test_a_failed_trial_reopens_for_a_full_cooldown(clock):
+    b = ai.CircuitBreaker()
+    b.record(False)
+    b.record(False)
+    clock["now"] += 30
+    assert b.allow()
+    b.record(False)  # one failure is enough while half open
+    assert b.state == "open" and not b.allow()
+    clock["now"] += 29
+    assert not b.allow()
+    clock["now"] += 1
+    assert b.allow()
+
+
+def _provider(name, answers):
+    calls = []
+
+    async def call(prompt):
+        calls.append(prompt)
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    return ai.Provider(name, call, lambda: name, lambda: True), calls
+
+
+def test_an_open_provider_is_skipped_in_the_chain(clock):
+    row = {"tutor_id": 7, "name": "Tutor 7"}
+    ok = json.dumps([{"tutor_id": 7, "explanation": "Good fit."}])
+    first, first_calls = _provider("first", [RuntimeError("down"), RuntimeError("down"), ok])
+    second, second_calls = _provider("second", [ok, ok, ok])
+
+    def run():
+        return asyncio.run(ai._run_chain([first, second], {"id": 1}, [(row, {"first": "k1", "second": "k2"})]))
+
+    assert run() == {7: "Good fit."} and run() == {7: "Good fit."}
+    assert first.breaker.state == "open" and (len(first_calls), len(second_calls)) == (2, 2)
+    run()
+    assert (len(first_calls), len(second_calls), first.short_circuits) == (2, 3, 1)
+    clock["now"] += 30
+    run()
+    assert (len(first_calls), len(second_calls)) == (3, 3) and first.breaker.state == "closed"
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+from backend import database
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def engines(tmp_path):
+    url = f"sqlite:///{tmp_path / 'production.db'}"
+    writer = create_engine(url, connect_args={"check_same_thread": False}, **database._pool_args(1, 0))
+    reader = create_engine(url, connect_args={"check_same_thread": False}, **database._pool_args(4, 0))
+    event.listen(writer, "connect", database._production_pragmas(read_only=False))
+    event.listen(reader, "connect", database._production_pragmas(read_only=True))
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)"))
+        conn.execute(text("INSERT INTO t (v) VALUES ('a')"))
+    yield writer, reader
+    writer.dispose()
+    reader.dispose()
+
+
+def test_pragmas_are_applied_on_connect(engines):
+    writer, reader = engines
+    with writer.connect() as w, reader.connect() as r:
+        assert w.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert w.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert r.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert (w.execute(text("PRAGMA query_only")).scalar(), r.execute(text("PRAGMA query_only")).scalar()) == (0, 1)
+
+
+def test_read_connections_refuse_writes(engines):
+    _, reader = engines
+    with reader.connect() as r, pytest.raises(OperationalError, match="readonly"):
+        r.execute(text("INSERT INTO t (v) VALUES ('b')"))
+
+
+def test_reads_proceed_while_a_write_is_open(engines):
+    writer, reader = engines
+    with writer.connect() as w:
+        w.execute(text("BEGIN EXCLUSIVE"))
+        w.execute(text("INSERT INTO t (v) VALUES ('uncommitted')"))
+        with reader.connect() as r:  # in rollback-journal mode this waits out busy_timeout, then fails
+            assert r.execute(text("SELECT v FROM t")).scalars().all() == ["a"]
+        w.execute(text("COMMIT"))
+    with reader.connect() as r:
+        assert r.execute(text("SELECT count(*) FROM t")).scalar() == 2
+
+
+def test_production_profile_splits_the_sqlite_engine(tmp_path):
+    script = ("import json; from backend import database as d; "
+              "print(json.dumps([d.split_sqlite, d.engine is d.read_engine, d.engine.pool.size(), "
+              "d.read_engine.pool.size(), d.ReadSessionLocal is d.SessionLocal]))")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path / 'split.db'}", "DATABASE_PROFILE": "production",
+           "DB_POOL_SIZE": "7", "DB_ASYNC": "0"}
+    out = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout) == [True, False, 1, 7, False]
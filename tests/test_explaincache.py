@@ -0,0 +1,57 @@
+import pytest
+
+from backend import explaincache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"now": 1000.0}
+    monkeypatch.setattr(explaincache.time, "time", lambda: now["now"])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch, clock):
+    monkeypatch.setenv("EXPLANATION_CACHE_PATH", str(tmp_path / "explanations.db"))
+    monkeypatch.setenv("EXPLANATION_CACHE_TTL", "100")
+    monkeypatch.setenv("EXPLANATION_CACHE_MAX_ENTRIES", "3")
+    return explaincache.ExplanationCache()
+
+
+def test_entries_expire_after_the_ttl(cache, clock):
+    cache.put_many("model", {"a": "A"})
+    clock["now"] += 100
+    assert cache.get_many(["a", "b"]) == {"a": "A"}
+    clock["now"] += 1
+    assert cache.get_many(["a"]) == {}
+    # a read does not extend the lifetime, a write does
+    cache.put_many("model", {"a": "A2"})
+    clock["now"] += 50
+    assert cache.get_many(["a"]) == {"a": "A2"}
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 2)
+
+
+def test_least_recently_used_entries_are_evicted(cache, clock):
+    for k in "abc":
+        cache.put_many("model", {k: k.upper()})
+        clock["now"] += 1
+    assert cache.get_many(["a"]) == {"a": "A"}  # a is now the most recently used
+    clock["now"] += 1
+    cache.put_many("model", {"d": "D"})
+    assert cache.get_many("abcd") == {"a": "A", "c": "C", "d": "D"}
+    assert cache.stats()["entries"] == 3 and cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_go_before_recent_ones(cache, clock):
+    cache.put_many("model", {"old": "O"})
+    clock["now"] += 101
+    cache.put_many("model", {"x": "X", "y": "Y"})
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+
+
+def test_keys_change_with_any_input():
+    base = explaincache.key("m", 1, {"id": 1}, {"tutor_id": 2})
+    assert base == explaincache.key("m", 1, {"id": 1}, {"tutor_id": 2})
+    assert len({base, explaincache.key("m2", 1, {"id": 1}, {"tutor_id": 2}),
+                explaincache.key("m", 2, {"id": 1}, {"tutor_id": 2}),
+                explaincache.key("m", 1, {"id": 1, "city": "x"}, {"tutor_id": 2})}) == 4
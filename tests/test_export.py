@@ -0,0 +1,74 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from backend import export, models
+from backend.database import SessionLocal
+
+
+def _lines(body: bytes):
+    return [json.loads(line) for line in body.decode("utf-8").splitlines()]
+
+
+def test_tutors_export_is_ndjson_in_id_order(client):
+    r = client.get("/api/export/tutors", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson") and "content-encoding" not in r.headers
+    rows = _lines(r.content)
+    with SessionLocal() as db:
+        tutors = db.query(models.Tutor).order_by(models.Tutor.id).all()
+        assert [row["id"] for row in rows] == [t.id for t in tutors]
+        first = tutors[0]
+        assert rows[0]["subjects"] == [s.name for s in first.subjects]
+        assert rows[0]["email"] == first.email and rows[0]["hourly_rate"] == first.hourly_rate
+
+
+def test_gzip_export_decompresses_to_the_same_rows(client):
+    plain = client.get("/api/export/reviews", headers={"Accept-Encoding": "identity"}).content
+    with client.stream("GET", "/api/export/reviews", headers={"Accept-Encoding": "gzip"}) as r:
+        assert r.headers["content-encoding"] == "gzip" and r.headers["vary"] == "Accept-Encoding"
+        raw = b"".join(r.iter_raw())
+    assert raw != plain and gzip.decompress(raw) == plain
+
+
+def test_updated_since_keeps_only_changed_rows(client):
+    since = datetime.utcnow() - timedelta(seconds=1)
+    with SessionLocal() as db:
+        tid = db.query(models.Tutor.id).order_by(models.Tutor.id.desc()).first()[0]
+    assert client.put(f"/api/tutors/{tid}", json={"hourly_rate": 33}).status_code == 200
+    rows = _lines(client.get("/api/export/tutors", params={"updated_since": since.isoformat()},
+                             headers={"Accept-Encoding": "identity"}).content)
+    assert [row["id"] for row in rows] == [tid] and rows[0]["hourly_rate"] == 33
+    later = (datetime.utcnow() + timedelta(minutes=1)).isoformat()
+    assert client.get("/api/export/students", params={"updated_since": later}).content == b""
+
+
+def test_unknown_export_is_404(client):
+    assert client.get("/api/export/teachers").status_code == 404
+
+
+def test_windows_resume_after_the_last_id(client, monkeypatch):
+    whole = client.get("/api/export/tutors", headers={"Accept-Encoding": "identity"}).content
+    monkeypatch.setattr(export, "PARTITION", 40)
+    monkeypatch.setenv("EXPORT_WINDOW_ROWS", "100")
+    assert client.get("/api/export/tutors", headers={"Accept-Encoding": "identity"}).content == whole
+
+
+def test_subject_names_are_read_on_another_connection(client, monkeypatch):
+    # the streaming cursor is still open; drivers without multiple active result sets allow no other statement
+    statements = []
+
+    def record(conn, cursor, statement, *_):
+        statements.append((conn.connection.dbapi_connection, statement))
+
+    event.listen(export.read_engine, "before_cursor_execute", record)
+    try:
+        monkeypatch.setattr(export, "PARTITION", 40)
+        assert sum(len(p) for p in export.partitions("tutors")) > 40
+    finally:
+        event.remove(export.read_engine, "before_cursor_execute", record)
+    streaming = {c for c, s in statements if "FROM tutors" in s and "tutor_subjects" not in s}
+    names = {c for c, s in statements if "tutor_subjects" in s}
+    assert len(streaming) == 1 and names and not streaming & names
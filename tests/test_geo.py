@@ -0,0 +1,80 @@
+import math
+import random
+
+import pytest
+
+from backend import crud, geo, models, scoring
+from backend.database import SessionLocal
+
+ORIGIN = (33.9, 35.5)
+
+
+def _cell_corner(lat, lon, precision):
+    """North-east corner of the geohash cell holding (lat, lon): cells form a regular grid per precision."""
+    dlat, dlon = geo.cell_size_deg(precision)
+    return (-90 + (math.floor((lat + 90) / dlat) + 1) * dlat,
+            -180 + (math.floor((lon + 180) / dlon) + 1) * dlon)
+
+
+def _offset(lat, lon, north_km, east_km):
+    return lat + north_km / geo.KM_PER_DEG_LAT, lon + east_km / (geo.KM_PER_DEG_LON * math.cos(math.radians(lat)))
+
+
+@pytest.mark.parametrize("radius_km", [0.5, 3, 20, 150])
+def test_covering_cells_hold_every_point_in_the_circle(radius_km):
+    rnd = random.Random(radius_km)
+    p = geo.precision_for_radius(ORIGIN[0], radius_km)
+    for _ in range(200):
+        # origins a hair inside a cell corner, points anywhere on the circle around them
+        corner = _cell_corner(ORIGIN[0] + rnd.uniform(-1, 1), ORIGIN[1] + rnd.uniform(-1, 1), p)
+        origin = (corner[0] - rnd.choice([1e-9, 1e-5]), corner[1] - rnd.choice([1e-9, 1e-5]))
+        cells = geo.covering_cells(*origin, radius_km)
+        angle = rnd.uniform(0, 2 * math.pi)
+        point = _offset(*origin, 0.999 * radius_km * math.sin(angle), 0.999 * radius_km * math.cos(angle))
+        assert any(geo.encode(*point).startswith(c) for c in cells)
+
+
+def test_radius_search_finds_tutors_across_cell_edges(client):
+    radius = 5.0
+    corner = _cell_corner(*ORIGIN, geo.precision_for_radius(ORIGIN[0], radius))
+    origin = (corner[0] - 1e-6, corner[1] - 1e-6)
+    inside = [_offset(*origin, 0, 1), _offset(*origin, 1, 0), _offset(*origin, 1, 1), _offset(*origin, -4.9, 0)]
+    outside = [_offset(*origin, 0, 5.2), _offset(*origin, 4, 4)]
+    with SessionLocal() as db:
+        added = []
+        for i, (lat, lon) in enumerate(inside + outside):
+            t = models.Tutor(name=f"Edge {i}", email=f"edge{i}@example.com", hourly_rate=30, latitude=lat,
+                             longitude=lon, geohash=geo.encode(lat, lon), overall_rating=4.0)
+            db.add(t)
+            added.append(t)
+        db.flush()
+        found = {t.id for t, _ in crud.search_tutors(db, lat=origin[0], lon=origin[1], radius_km=radius)}
+        db.rollback()
+    assert {t.id for t in added[:len(inside)]} <= found
+    assert not {t.id for t in added[len(inside):]} & found
+
+
+def test_radius_search_matches_brute_force(client):
+    params = {"lat": ORIGIN[0], "lon": ORIGIN[1]}
+    everyone = client.get("/api/tutors/search", params=params).json()
+    expected = {t["id"] for t in everyone if t["distance_km"] is not None and t["distance_km"] <= 30}
+    within = client.get("/api/tutors/search", params={**params, "radius_km": 30}).json()
+    assert expected and {t["id"] for t in within} == expected
+    assert all(t["distance_km"] <= 30 for t in within)
+
+
+def test_distance_asc_orders_by_distance_then_id(client):
+    rows = client.get("/api/tutors/search", params={"lat": ORIGIN[0], "lon": ORIGIN[1], "sort_by": "distance_asc"}).json()
+    located = [r for r in rows if r["distance_km"] is not None]
+    assert located and rows[:len(located)] == located  # tutors without coordinates come last
+    assert [r["distance_km"] for r in located] == sorted(r["distance_km"] for r in located)
+    with SessionLocal() as db:
+        tutors = {t.id: t for t in db.query(models.Tutor).filter(models.Tutor.id.in_([r["id"] for r in located[:20]]))}
+    for r in located[:20]:
+        t = tutors[r["id"]]
+        assert r["distance_km"] == pytest.approx(scoring.distance_km(ORIGIN, t.latitude, t.longitude), abs=0.01)
+
+
+def test_radius_without_an_origin_is_400(client):
+    assert client.get("/api/tutors/search", params={"radius_km": 10}).status_code == 400
+    assert client.get("/api/tutors/search", params={"radius_km": 10, "lat": 33.9}).status_code == 400
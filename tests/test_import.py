@@ -0,0 +1,61 @@
+import json
+
+from backend import models
+from backend.database import SessionLocal
+
+CSV = """name,email,city,hourly_rate,teaching_mode,subjects
+Import Ana,import-ana@example.com,Beirut,30,online,Math;Import Astronomy
+Import Bad Email,not-an-email,Beirut,30,online,Math
+Import Negative,import-neg@example.com,Beirut,-5,online,Math
+Import Mode,import-mode@example.com,Beirut,30,by_owl,Math
+Import Extra,import-extra@example.com,Beirut,30,online,Math,surplus
+,import-noname@example.com,Beirut,30,online,Math
+Import Ben,import-ben@example.com,Tripoli,25,hybrid,Physics|Import Astronomy
+"""
+
+
+def _tutors_by_email(prefix):
+    with SessionLocal() as db:
+        tutors = db.query(models.Tutor).filter(models.Tutor.email.like(f"{prefix}%")).order_by(models.Tutor.id).all()
+        return [(t.id, t.name, t.email, t.city, t.hourly_rate, [s.name for s in t.subjects]) for t in tutors]
+
+
+def test_invalid_rows_are_reported_by_line_and_skipped(client):
+    r = client.post("/api/tutors/import", content=CSV, headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200
+    report = r.json()
+    assert (report["imported"], report["failed"]) == (2, 5)
+    errors = {e["line"]: e["error"] for e in report["errors"]}
+    assert sorted(errors) == [3, 4, 5, 6, 7]
+    assert errors[3].startswith("email") and errors[4].startswith("hourly_rate")
+    assert errors[5].startswith("teaching_mode") and "fields, the header has 6" in errors[6]
+    assert errors[7].startswith("name")
+    assert report["subjects_created"] == ["Import Astronomy"]
+    assert [t[1:] for t in _tutors_by_email("import-")] == [
+        ("Import Ana", "import-ana@example.com", "Beirut", 30.0, ["Math", "Import Astronomy"]),
+        ("Import Ben", "import-ben@example.com", "Tripoli", 25.0, ["Physics", "Import Astronomy"]),
+    ]
+
+
+def test_ids_are_matched_back_to_their_rows(client):
+    # every row in one batch: unique (name, email) pairs come back from INSERT ... RETURNING in no set
+    # order, and the repeated pair goes in on its own in order
+    rows = [{"name": f"Match {i}", "email": f"match-{i}@example.com", "city": f"City {i}", "hourly_rate": 20 + i,
+             "subjects": ["Math"] if i % 2 else ["Physics", "Chemistry"]} for i in range(30)]
+    rows += [{"name": "Match Twin", "email": "match-twin@example.com", "hourly_rate": rate, "subjects": [subject]}
+             for rate, subject in [(41, "Math"), (42, "Physics")]]
+    body = "\n".join(json.dumps(r) for r in rows) + "\n{broken\n"
+    r = client.post("/api/tutors/import", params={"format": "jsonl"}, content=body)
+    report = r.json()
+    assert (report["imported"], report["failed"]) == (32, 1)
+    assert report["errors"][0]["line"] == 33 and report["errors"][0]["error"].startswith("invalid JSON")
+
+    imported = {t[2]: t for t in _tutors_by_email("match-")}
+    for row in rows[:30]:
+        _, name, _, city, rate, subjects = imported[row["email"]]
+        assert (name, city, rate, subjects) == (row["name"], row["city"], row["hourly_rate"], row["subjects"])
+    twins = [t for t in _tutors_by_email("match-twin")]
+    assert [(t[4], t[5]) for t in twins] == [(41.0, ["Math"]), (42.0, ["Physics"])]
+
+    found = client.get("/api/tutors/text-search", params={"q": "Match Twin"}).json()
+    assert {t["id"] for t in found} >= {t[0] for t in twins}
@@ -0,0 +1,56 @@
+import logging
+import re
+
+from backend import metrics
+
+_SAMPLE = re.compile(r"^(\w+)(\{.*\})? (\S+)$")
+
+
+def _scrape(client):
+    r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in r.text.splitlines():
+        if not line.startswith("#"):
+            name, labels, value = _SAMPLE.match(line).groups()
+            samples[name + (labels or "")] = float(value)
+    return samples
+
+
+def _delta(before, after, series):
+    return after.get(series, 0) - before.get(series, 0)
+
+
+ROUTE = 'method="GET",route="/api/tutors/{tutor_id}"'
+
+
+def test_requests_are_counted_under_their_route_template(client):
+    before = _scrape(client)
+    for tid in (3, 4):
+        client.get(f"/api/tutors/{tid}")
+    client.get("/api/tutors/999999999")
+    after = _scrape(client)
+    assert _delta(before, after, f'http_requests_total{{{ROUTE},status="200"}}') == 2
+    assert _delta(before, after, f'http_requests_total{{{ROUTE},status="404"}}') == 1
+    assert _delta(before, after, f"http_request_duration_seconds_count{{{ROUTE}}}") == 3
+    assert _delta(before, after, f"http_request_sql_queries_count{{{ROUTE}}}") == 3
+    assert _delta(before, after, f"sql_queries_total{{{ROUTE}}}") >= 3
+    assert _delta(before, after, f"sql_queries_total{{{ROUTE}}}") == _delta(
+        before, after, f"http_request_sql_queries_sum{{{ROUTE}}}")
+    buckets = [v for k, v in after.items() if k.startswith(f"http_request_duration_seconds_bucket{{{ROUTE}")]
+    assert buckets == sorted(buckets) and buckets[-1] == after[f"http_request_duration_seconds_count{{{ROUTE}}}"]
+
+
+def test_spans_are_recorded_under_the_calling_route(client):
+    series = 'span_duration_seconds_count{method="POST",route="/api/chat",span="recommend"}'
+    before = _scrape(client)
+    client.post("/api/chat", json={"student_id": 2, "message": "hi", "use_ai": False})
+    assert _delta(before, _scrape(client), series) == 1
+
+
+def test_slow_requests_are_logged_with_their_sql(client, monkeypatch, caplog):
+    monkeypatch.setenv("METRICS_SLOW_REQUEST_MS", "0")
+    with caplog.at_level(logging.WARNING, logger=metrics.logger.name):
+        client.get("/api/tutors/3")
+    logged = [r.getMessage() for r in caplog.records if r.getMessage().startswith("slow request")]
+    assert len(logged) == 1 and "/api/tutors/{tutor_id}" in logged[0] and "SELECT" in logged[0]
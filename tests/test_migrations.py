@@ -0,0 +1,74 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from backend import database, migrations, models, neighbors
+
+# the schema the app shipped with, before the first migration (as in the committed app.db)
+BASELINE_SCHEMA = [
+    """CREATE TABLE students (id INTEGER NOT NULL, name VARCHAR NOT NULL, email VARCHAR NOT NULL, city VARCHAR,
+       address VARCHAR, preferred_subjects VARCHAR, max_hourly_rate FLOAT, created_at DATETIME,
+       PRIMARY KEY (id), UNIQUE (email))""",
+    """CREATE TABLE tutors (id INTEGER NOT NULL, name VARCHAR NOT NULL, email VARCHAR NOT NULL, phone VARCHAR,
+       city VARCHAR, address VARCHAR, latitude FLOAT, longitude FLOAT, hourly_rate FLOAT NOT NULL,
+       teaching_mode VARCHAR(9), bio TEXT, overall_rating FLOAT, number_of_reviews INTEGER, created_at DATETIME,
+       PRIMARY KEY (id))""",
+    "CREATE TABLE subjects (id INTEGER NOT NULL, name VARCHAR NOT NULL, PRIMARY KEY (id), UNIQUE (name))",
+    """CREATE TABLE tutor_subjects (id INTEGER NOT NULL, tutor_id INTEGER, subject_id INTEGER, PRIMARY KEY (id),
+       FOREIGN KEY(tutor_id) REFERENCES tutors (id), FOREIGN KEY(subject_id) REFERENCES subjects (id))""",
+    """CREATE TABLE reviews (id INTEGER NOT NULL, student_id INTEGER NOT NULL, tutor_id INTEGER NOT NULL,
+       rating INTEGER NOT NULL, comment TEXT, created_at DATETIME, PRIMARY KEY (id))""",
+]
+
+ROWS = [
+    "INSERT INTO subjects (id, name) VALUES (1, 'Math'), (2, 'Physics')",
+    """INSERT INTO tutors (id, name, email, city, latitude, longitude, hourly_rate, teaching_mode, overall_rating,
+       number_of_reviews, created_at) VALUES
+       (1, 'Ana', 'ana@example.com', ' Beirut ', 33.89, 35.50, 30, 'online', 4.5, 2, '2024-01-01 10:00:00'),
+       (2, 'Ben', 'ben@example.com', 'Tripoli', 34.43, 35.84, 25, 'in_person', 4.0, 1, '2024-01-02 10:00:00'),
+       (3, 'Cy', 'cy@example.com', NULL, NULL, NULL, 40, NULL, 0, 0, '2024-01-03 10:00:00')""",
+    "INSERT INTO tutor_subjects (id, tutor_id, subject_id) VALUES (1, 1, 1), (2, 1, 1), (3, 2, 1), (4, 2, 2)",
+    """INSERT INTO students (id, name, email, city, preferred_subjects, created_at) VALUES
+       (1, 'Sam', 'sam@example.com', 'Beirut', 'Math, Physics', '2024-02-01 10:00:00')""",
+    """INSERT INTO reviews (id, student_id, tutor_id, rating, created_at) VALUES
+       (1, 1, 1, 5, '2024-03-01'), (2, 1, 1, 4, '2024-03-02'), (3, 1, 2, 4, '2024-03-03')""",
+]
+
+
+def test_upgrade_from_baseline_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA + ROWS:
+            conn.execute(text(ddl))
+
+    # what the app does at startup
+    models.Base.metadata.create_all(bind=engine)
+    applied = migrations.upgrade(engine)
+
+    assert applied == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.upgrade(engine) == []
+    tutor_columns = {c["name"] for c in inspect(engine).get_columns("tutors")}
+    assert {"geohash", "city_normalized", "rating_sum", "stars_5", "updated_at"} <= tutor_columns
+    assert "ix_tutors_updated" in {ix["name"] for ix in inspect(engine).get_indexes("tutors")}
+    with engine.connect() as conn:
+        t1 = conn.execute(text("SELECT geohash, city_normalized, rating_sum, stars_4, stars_5, updated_at "
+                               "FROM tutors WHERE id = 1")).one()
+        assert t1.geohash and t1.city_normalized == "beirut"
+        assert (t1.rating_sum, t1.stars_4, t1.stars_5) == (9.0, 1, 1)
+        assert t1.updated_at is not None
+        assert conn.execute(text("SELECT COUNT(*) FROM tutor_subjects")).scalar() == 3
+        assert conn.execute(text("SELECT COUNT(*) FROM student_subjects")).scalar() == 2
+        assert conn.execute(text("SELECT neighbor_id FROM similar_tutors WHERE tutor_id = 1")).scalars().all() == [2]
+    engine.dispose()
+
+
+def test_similar_tutors_fill_matches_the_neighbour_ranking(client):
+    # migration 8 keeps its own copy of the ranking; on today's schema it must agree with neighbors
+    with database.engine.connect() as conn, conn.begin() as tx:
+        expected = {tid: ranked for tid, ranked in neighbors._rank(Session(bind=conn), None).items() if ranked}
+        migrations._m008_similar_tutors(conn)
+        rows = conn.execute(text("SELECT tutor_id, neighbor_id, score FROM similar_tutors ORDER BY tutor_id, rank"))
+        filled = {}
+        for tid, n, score in rows:
+            filled.setdefault(tid, []).append((n, int(score)))
+        tx.rollback()
+    assert filled == expected
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import select
+
+from backend import models, neighbors, scoring
+from backend.database import SessionLocal
+
+
+def _stored(db):
+    rows = db.execute(select(neighbors.ST.c.tutor_id, neighbors.ST.c.neighbor_id, neighbors.ST.c.score)
+                      .order_by(neighbors.ST.c.tutor_id, neighbors.ST.c.rank)).all()
+    out = {}
+    for tid, n, score in rows:
+        out.setdefault(tid, []).append((n, int(score)))
+    return out
+
+
+def _add_ties(db):
+    """Copies of one listed tutor: exact ties on subjects, rating and rate, and ties on rating at equal
+    rate distance on either side of a base tutor's rate."""
+    base = db.get(models.Tutor, db.execute(select(neighbors.ST.c.neighbor_id).limit(1)).scalar())
+    subjects = list(base.subjects)
+    for i, rate in enumerate([base.hourly_rate] * 3 + [base.hourly_rate - 5, base.hourly_rate + 5] * 2):
+        db.add(models.Tutor(name=f"Tie {i}", email=f"tie{i}@example.com", hourly_rate=rate,
+                            overall_rating=base.overall_rating, subjects=subjects))
+    db.flush()
+
+
+@pytest.mark.skipif(scoring.np is None, reason="rebuild() only has its own ranking with NumPy")
+def test_rebuild_matches_rank(client):
+    with SessionLocal() as db:
+        _add_ties(db)
+        expected = {tid: ranked for tid, ranked in neighbors._rank(db, None).items() if ranked}
+        neighbors.rebuild(db)
+        assert _stored(db) == expected
+        db.rollback()
@@ -0,0 +1,58 @@
+import pytest
+
+from backend import pagination
+
+
+@pytest.mark.parametrize("order, key", [
+    ("subjects", [12]),
+    ("reviews", ["2024-03-01T10:00:00", 7]),
+    ("tutors:default", [-4.5, 30.0, 12]),
+    ("tutors:price_asc", [30, 12]),
+    ("tutors:distance_asc", [12]),
+    ("tutors:distance_asc", [0, 1.25, 12]),
+])
+def test_round_trip(order, key):
+    assert pagination.decode_cursor(pagination.encode_cursor(order, key), order) == tuple(key)
+
+
+@pytest.mark.parametrize("order, key", [
+    ("subjects", ["a"]),
+    ("students", [1, 2]),
+    ("students", [True]),
+    ("reviews", [7, "2024-03-01"]),
+    ("tutors:default", ["x", 1, 2]),
+    ("tutors:default", [None, None, None]),
+    ("tutors:default", [1, 2]),
+    ("tutors:price_asc", [30, 1.5]),
+    ("tutors:distance_asc", [0, 1.25]),
+])
+def test_rejects_malformed_keys(order, key):
+    with pytest.raises(pagination.InvalidCursor):
+        pagination.decode_cursor(pagination.encode_cursor(order, key), order)
+
+
+def test_crafted_cursors_are_400(client):
+    crafted = pagination.encode_cursor("tutors:default", ["x", 1, 2])
+    assert client.get("/api/tutors/search", params={"cursor": crafted}).status_code == 400
+    crafted = pagination.encode_cursor("students", ["a"])
+    assert client.get("/api/students", params={"cursor": crafted}).status_code == 400
+    assert client.get("/api/subjects", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+@pytest.mark.parametrize("sort_by", [None, "price_asc"])
+def test_pages_follow_the_cursor(client, sort_by):
+    params = {"limit": 5, "sort_by": sort_by} if sort_by else {"limit": 5}
+    first = client.get("/api/tutors/search", params=params)
+    second = client.get("/api/tutors/search", params={**params, "cursor": first.headers["X-Next-Cursor"]})
+    assert second.status_code == 200
+    ids = [t["id"] for t in first.json() + second.json()]
+    assert len(ids) == 10 and len(set(ids)) == 10
+
+
+@pytest.mark.parametrize("path", ["/api/tutors/search", "/api/students", "/api/subjects"])
+def test_no_limit_or_cursor_returns_the_whole_list(client, path):
+    everything = client.get(path)
+    assert "X-Next-Cursor" not in everything.headers
+    first = client.get(path, params={"limit": 5})
+    rest = client.get(path, params={"cursor": first.headers["X-Next-Cursor"]})  # pages at DEFAULT_LIMIT
+    assert len(rest.json()) == min(pagination.DEFAULT_LIMIT, len(everything.json()) - 5)
@@ -0,0 +1,36 @@
+import pytest
+
+from backend import precompute
+
+PROVIDER_ENV = ("HF_API_TOKEN", "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_KEY", "AZURE_OPENAI_DEPLOYMENT")
+
+
+@pytest.fixture
+def job_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXPLANATION_CACHE_PATH", str(tmp_path / "explanations.db"))
+    for name in PROVIDER_ENV:
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_nothing_is_queued_without_a_provider(client, job_file):
+    r = client.post("/api/tutors", json={"name": "Queue Test", "email": "queue-test@example.com",
+                                         "hourly_rate": 30, "subjects": ["Math"]})
+    assert r.status_code == 201
+    precompute.enqueue_students([1, 2, 3])
+    assert precompute.queue.stats()["pending"] == 0
+
+
+def test_jobs_coalesce_per_student(job_file, monkeypatch):
+    monkeypatch.setenv("HF_API_TOKEN", "test-token")
+    precompute.enqueue_students([1, 2, 3])
+    precompute.enqueue_students([2, 3, 4])
+    assert precompute.queue.stats()["pending"] == 4
+
+
+def test_finishing_a_job_after_the_cache_is_turned_off(job_file, monkeypatch):
+    monkeypatch.setenv("HF_API_TOKEN", "test-token")
+    precompute.enqueue_students([1])
+    (sid, version, attempts), = precompute.queue.claim(1)
+    monkeypatch.setenv("EXPLANATION_CACHE_PATH", "")
+    precompute.queue.complete(sid, version)
+    assert precompute.queue.fail(sid, version, attempts, "boom") is False
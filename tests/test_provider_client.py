@@ -0,0 +1,72 @@
+import asyncio
+import http.server
+import threading
+import time
+
+import pytest
+
+from backend import ai
+
+pytestmark = pytest.mark.skipif(ai.httpx is None, reason="the provider client needs httpx")
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the pool holds on to the socket
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+
+
+def _sockets(client):
+    return [c._connection._network_stream.get_extra_info("socket") for c in client._transport._pool.connections]
+
+
+async def _post_twice(p, url):
+    await p.post_json(url, {}, {}, 5)
+    await p.post_json(url, {}, {}, 5)
+    await p.aclose()
+
+
+def test_a_client_left_on_a_closed_loop_has_its_sockets_closed(url):
+    p = ai.ProviderClient()
+    asyncio.run(p.post_json(url, {}, {}, 5))
+    old = p._client
+    sockets = _sockets(old)
+    assert sockets and all(s.fileno() != -1 for s in sockets)
+    asyncio.run(_post_twice(p, url))
+    assert all(s.fileno() == -1 for s in sockets)
+
+
+def test_a_client_on_a_running_loop_is_closed_there(url):
+    p = ai.ProviderClient()
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(p.post_json(url, {}, {}, 5), loop).result(5)
+        old = p._client
+        asyncio.run(_post_twice(p, url))
+        deadline = time.monotonic() + 5
+        while not old.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert old.is_closed
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
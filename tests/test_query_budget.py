@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy.orm import lazyload
+
+from backend import crud, database, querycount
+
+BUDGET = 10
+
+ROUTES = [
+    "/api/subjects",
+    "/api/students",
+    "/api/tutors/search?limit=50",
+    "/api/tutors/search?subject=Math&student_id=3",
+    "/api/tutors/search?lat=33.9&lon=35.5&radius_km=30&sort_by=distance_asc",
+    "/api/tutors/text-search?q=math",
+    "/api/tutors/5",
+    "/api/tutors/5/reviews",
+    "/api/tutors/5/similar",
+    "/api/students/4/recommendations",
+]
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setenv("SQL_QUERY_BUDGET", str(BUDGET))
+    monkeypatch.setenv("SQL_QUERY_BUDGET_MODE", "raise")
+
+
+@pytest.mark.parametrize("path", ROUTES)
+def test_routes_stay_within_budget(client, budget, path):
+    r = client.get(path)
+    assert r.status_code == 200, r.text
+    assert 0 < int(r.headers["X-SQL-Queries"]) <= BUDGET
+
+
+@pytest.mark.skipif(database.async_read_engine is not None,
+                    reason="AsyncSession reads cannot lazy-load: an N+1 fails before the budget sees it")
+def test_n_plus_one_trips_the_budget(client, budget, monkeypatch):
+    # crud's eager loads regress to lazy ones: the route then loads subjects once per tutor
+    monkeypatch.setattr(crud, "selectinload", lazyload)
+    r = client.get("/api/tutors/search?limit=50")
+    assert r.status_code == 500
+    assert "SQL query budget exceeded" in r.json()["detail"]
+
+
+def test_streamed_responses_are_counted_to_the_last_chunk(client, monkeypatch):
+    monkeypatch.setenv("SQL_QUERY_BUDGET", "1")
+    monkeypatch.setenv("SQL_QUERY_BUDGET_MODE", "raise")
+    # the export reads its rows inside the stream, after the 200 has gone out
+    with pytest.raises(querycount.QueryBudgetExceeded):
+        client.get("/api/export/tutors")
+    monkeypatch.setenv("SQL_QUERY_BUDGET_MODE", "log")
+    r = client.get("/api/export/tutors")
+    assert r.status_code == 200 and r.text.count("\n") > 1
@@ -0,0 +1,29 @@
+from sqlalchemy import func, select, text
+
+from backend import neighbors, ratings
+from backend.database import SessionLocal
+
+
+def _similar(db):
+    return db.execute(select(neighbors.ST).order_by(neighbors.ST.c.tutor_id, neighbors.ST.c.rank)).all()
+
+
+def test_repair_refreshes_only_the_drifted_tutors(client, monkeypatch):
+    with SessionLocal() as db:
+        before = _similar(db)
+        # the tutor listed most often as a neighbour, knocked below MIN_RATING without its reviews changing
+        tid = db.execute(select(neighbors.ST.c.neighbor_id).group_by(neighbors.ST.c.neighbor_id)
+                         .order_by(func.count().desc(), neighbors.ST.c.neighbor_id).limit(1)).scalar()
+        db.execute(text("UPDATE tutors SET overall_rating = 1.0 WHERE id = :id"), {"id": tid})
+        neighbors.refresh(db, tid)
+        db.commit()
+        assert _similar(db) != before
+
+        def full_rebuild(db):
+            raise AssertionError("one drifted tutor should not rebuild every list")
+        monkeypatch.setattr(neighbors, "rebuild", full_rebuild)
+        result = ratings.reconcile(db, repair=True)
+
+        assert result == {"drifted": [tid], "repaired": True}
+        assert ratings.find_drift(db) == []
+        assert _similar(db) == before
@@ -0,0 +1,73 @@
+import pytest
+
+from backend import models, reccache
+from backend.database import SessionLocal
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"now": 100.0}
+    monkeypatch.setattr(reccache.time, "monotonic", lambda: now["now"])
+    return now
+
+
+def test_entries_are_evicted_least_recently_used_first_and_expire(clock, monkeypatch):
+    monkeypatch.setenv("RECOMMENDATION_CACHE_SIZE", "2")
+    monkeypatch.setenv("RECOMMENDATION_CACHE_TTL", "10")
+    c = reccache.RecommendationCache()
+    c.put("a", [1])
+    c.put("b", [2])
+    assert c.get("a") == [1]
+    c.put("c", [3])  # b is the least recently used
+    assert (c.get("a"), c.get("b"), c.get("c")) == ([1], None, [3])
+    clock["now"] += 10
+    assert c.get("a") is None
+    s = c.stats()
+    assert (s["hits"], s["misses"], s["evictions"], s["expirations"], s["entries"]) == (3, 2, 1, 1, 1)
+
+
+def test_writes_make_cached_lists_unreachable():
+    c = reccache.RecommendationCache()
+    k = c.key(1, 8)
+    c.put(k, [1])
+    assert c.get(c.key(1, 8)) == [1] and c.get(c.key(2, 8)) is None
+    c.student_changed(1)
+    assert c.get(c.key(1, 8)) is None
+    c.put(c.key(1, 8), [2])
+    c.catalog_changed()
+    assert c.get(c.key(1, 8)) is None
+
+
+def _stats(client):
+    return client.get("/api/admin/recommendation-cache").json()
+
+
+def _recommendations(client, student_id):
+    return [t["id"] for t in client.get(f"/api/students/{student_id}/recommendations").json()]
+
+
+def test_repeat_requests_are_served_from_the_cache(client):
+    first = _recommendations(client, 7)
+    before = _stats(client)
+    assert _recommendations(client, 7) == first
+    after = _stats(client)
+    assert (after["hits"] - before["hits"], after["misses"] - before["misses"]) == (1, 0)
+
+
+def test_profile_and_catalog_writes_refresh_the_list(client):
+    with SessionLocal() as db:
+        budget = db.get(models.Student, 13).max_hourly_rate
+        rate = db.get(models.Tutor, 1).hourly_rate
+    assert _recommendations(client, 13)
+    client.put("/api/students/13", json={"max_hourly_rate": 20})
+    misses = _stats(client)["misses"]
+    recs = client.get("/api/students/13/recommendations").json()
+    assert _stats(client)["misses"] == misses + 1 and all(t["hourly_rate"] <= 20 for t in recs)
+
+    version = _stats(client)["catalog_version"]
+    client.put("/api/tutors/1", json={"hourly_rate": 19})
+    assert _stats(client)["catalog_version"] == version + 1
+    _recommendations(client, 13)
+    assert _stats(client)["misses"] == misses + 2
+    client.put("/api/students/13", json={"max_hourly_rate": budget})
+    client.put("/api/tutors/1", json={"hourly_rate": rate})
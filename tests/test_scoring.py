@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from backend import crud, scoring
+from backend.database import SessionLocal
+
+pytestmark = pytest.mark.skipif(scoring.np is None, reason="compares the NumPy path with the pure-Python one")
+
+
+def _candidates(rnd, n, n_subjects):
+    # few distinct values so every key ties often; None where the columns are nullable
+    rows = [(tid, rnd.choice([None, 3.0, 4.0, 4.5, 5.0]), rnd.choice([None, 20.0, 25.0, 30.0, 35.0]),
+             *rnd.choice([(None, None), (33.9, 35.5), (34.4, 35.8), (33.9, 35.6)]))
+            for tid in sorted(rnd.sample(range(1, 10 * n), n))]
+    memberships = [(r[0], rnd.randrange(n_subjects)) for r in rows for _ in range(rnd.randrange(4))]
+    memberships += rnd.sample(memberships, len(memberships) // 5)  # duplicate association rows
+    memberships.append((10 * n + 1, 0))  # a tutor that is not a candidate
+    return scoring.Candidates(rows, memberships)
+
+
+def _both(monkeypatch, rank):
+    vectorized = rank()
+    with monkeypatch.context() as m:
+        m.setattr(scoring, "np", None)
+        return vectorized, rank()
+
+
+@pytest.mark.parametrize("n_subjects", [5, 80])
+@pytest.mark.parametrize("seed", range(5))
+def test_numpy_and_pure_python_rank_identically(monkeypatch, seed, n_subjects):
+    rnd = random.Random(seed)
+    c = _candidates(rnd, 200, n_subjects)
+    wanted = rnd.sample(range(n_subjects), min(n_subjects, 70))
+    for limit in (1, 7, 50, 200, 500):
+        for origin in (None, (33.9, 35.5)):
+            vectorized, pure = _both(monkeypatch, lambda: scoring.rank_recommendations(c, wanted, origin, limit))
+            assert vectorized == pure
+        for base_rate in (None, 27.5, 30.0):
+            vectorized, pure = _both(monkeypatch, lambda: scoring.rank_similar(c, wanted[:3], base_rate, limit))
+            assert vectorized == pure
+
+
+def test_recommendations_and_similar_tutors_rank_identically_without_numpy(client, monkeypatch):
+    # straight through crud: the recommendation cache and the similar_tutors table would hide the scoring path
+    with SessionLocal() as db:
+        def rank():
+            students = [crud._recommend(db, crud.get_student(db, sid), 30) for sid in (2, 4, 11, 38)]
+            similar = [crud.get_similar_tutors(db, tid, limit=40) for tid in (5, 16, 52)]
+            return [[t.id for t in ranked] for ranked in students + similar]
+
+        vectorized, pure = _both(monkeypatch, rank)
+    assert all(vectorized) and vectorized == pure
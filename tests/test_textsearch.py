@@ -0,0 +1,85 @@
+from backend import models
+from backend.database import SessionLocal
+from backend.textsearch import text_search
+
+QUERIES = ["quillon", "harmonica", "quillon harmonica", "math quillon", "physics"]
+
+
+def _hits(client, names):
+    """Ranked hits per query, with this test's tutors shown by name and everyone else by id."""
+    out = {}
+    for q in QUERIES:
+        rows = client.get("/api/tutors/text-search", params={"q": q, "limit": 100}).json()
+        out[q] = [names.get(r["id"], r["id"]) for r in rows]
+    return out
+
+
+def _write_and_search(client, tag):
+    tutors = {"A": {"name": "Quillon Tutor", "bio": "quillon quillon and some harmonica", "subjects": ["Math"]},
+              "B": {"name": "Harmonica Coach", "bio": "quillon", "subjects": ["Music"]},
+              "C": {"name": "Quillon Harmonica", "bio": None, "subjects": ["Math", "Physics"]}}
+    ids = {}
+    for label, body in tutors.items():
+        ids[label] = client.post("/api/tutors", json={**body, "email": f"fts-{tag}-{label}@example.com",
+                                                      "hourly_rate": 30}).json()["id"]
+    names = {tid: label for label, tid in ids.items()}
+    steps = [_hits(client, names)]
+    client.put(f"/api/tutors/{ids['A']}", json={"bio": "harmonica only", "subjects": ["Physics"]})
+    steps.append(_hits(client, names))
+    client.delete(f"/api/tutors/{ids['B']}")
+    steps.append(_hits(client, names))
+    for label in "AC":
+        client.delete(f"/api/tutors/{ids[label]}")
+    steps.append(_hits(client, names))
+    return steps
+
+
+def test_fts5_and_the_in_memory_index_find_the_same_tutors(client):
+    assert text_search.backend == "fts5"
+    with_fts5 = _write_and_search(client, "fts5")
+    try:
+        text_search.backend = "memory"
+        with SessionLocal() as db:
+            text_search.rebuild(db)
+        in_memory = _write_and_search(client, "memory")
+    finally:
+        text_search.backend = "fts5"
+
+    assert sorted(with_fts5[0]["quillon"]) == ["A", "B", "C"] and sorted(with_fts5[0]["math quillon"]) == ["A", "C"]
+    assert "A" not in with_fts5[1]["math quillon"] and "A" in with_fts5[1]["physics"]
+    assert "B" not in with_fts5[2]["harmonica"]
+    assert not any(with_fts5[-1][q] for q in QUERIES if q != "physics")
+    for fts5_step, memory_step in zip(with_fts5, in_memory):
+        for q in QUERIES:
+            assert fts5_step[q] == memory_step[q], q
+
+
+def test_in_memory_changes_wait_for_the_commit(client):
+    try:
+        text_search.backend = "memory"
+        with SessionLocal() as db:
+            text_search.rebuild(db)
+            t = models.Tutor(name="Ghost Zanzibarian", email="ghost@example.com", hourly_rate=30)
+            db.add(t)
+            db.flush()
+            text_search.index_tutor(db, t)
+            assert text_search.ranked_ids("zanzibarian") == []  # not before the commit
+            db.rollback()
+            assert text_search.ranked_ids("zanzibarian") == []  # nor after a rollback
+
+            existing = text_search.ranked_ids("math")[0][0]
+            text_search.remove_tutor(db, existing)
+            db.rollback()
+            assert existing in dict(text_search.ranked_ids("math"))
+
+            db.add(t)
+            db.flush()
+            text_search.index_tutor(db, t)
+            db.commit()
+            assert [tid for tid, _ in text_search.ranked_ids("zanzibarian")] == [t.id]
+            text_search.remove_tutor(db, t.id)
+            db.delete(t)
+            db.commit()
+            assert text_search.ranked_ids("zanzibarian") == []
+    finally:
+        text_search.backend = "fts5"